@@ -0,0 +1,227 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Admission control for upstream LLM calls.
+
+Each model endpoint gets a ``FairScheduler`` that bounds in-flight requests and
+orders waiting requests with weighted fair queuing across flows (the supervisor
+agent and each LLM-backed tool), so that a burst from one caller cannot starve
+the others and the endpoint sees orderly queuing instead of 429s.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from logger import logger
+from utils import parse_tool_settings
+
+
+# Maximum in-flight LLM requests per endpoint (0 disables admission control)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "8"))
+# Fair-queuing weight per flow; "agent" is the supervisor, other names are tools that call the LLM
+ADMISSION_WEIGHTS = parse_tool_settings(
+    os.getenv("ADMISSION_WEIGHTS", "agent=4,search_documents=2,write_code=1,explain_image=1"),
+    cast=float,
+)
+AGENT_FLOW = "agent"
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+
+class _Waiter:
+    __slots__ = ("flow", "granted", "moved", "abandoned")
+
+    def __init__(self, flow: str):
+        self.flow = flow
+        self.granted: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.moved = asyncio.Event()
+        self.abandoned = False
+
+
+class FairScheduler:
+    """Concurrency limiter with a weighted fair queue for one model endpoint.
+
+    Waiting requests are tagged with a virtual finish time
+    ``max(virtual_time, last_finish[flow]) + cost / weight`` and dispatched
+    smallest tag first, so each backlogged flow receives slots in proportion
+    to its weight.
+    """
+
+    def __init__(self, endpoint: str, max_concurrency: int = ADMISSION_MAX_CONCURRENCY, weights: Optional[Dict[str, float]] = None):
+        """Initialize the scheduler.
+
+        Args:
+            endpoint: Model endpoint the scheduler guards, used in logs and stats
+            max_concurrency: Maximum in-flight requests
+            weights: Weight per flow; unlisted flows get weight 1
+        """
+        self.endpoint = endpoint
+        self.max_concurrency = max(1, max_concurrency)
+        self.weights = dict(ADMISSION_WEIGHTS if weights is None else weights)
+        self.in_flight = 0
+
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+
+        self.admitted = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._flow_stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def queue_length(self) -> int:
+        return sum(1 for _, _, waiter in self._queue if not waiter.abandoned)
+
+    def _position(self, waiter: _Waiter) -> int:
+        """Return the 1-based position of a waiter among the live queued requests."""
+        key = next(entry[:2] for entry in self._queue if entry[2] is waiter)
+        return 1 + sum(1 for entry in self._queue if entry[:2] < key and not entry[2].abandoned)
+
+    def _enqueue(self, flow: str, cost: float) -> _Waiter:
+        weight = self.weights.get(flow, 1.0) or 1.0
+        finish = max(self._virtual_time, self._last_finish.get(flow, 0.0)) + cost / weight
+        self._last_finish[flow] = finish
+        waiter = _Waiter(flow)
+        heapq.heappush(self._queue, (finish, next(self._sequence), waiter))
+        return waiter
+
+    def _dispatch(self) -> None:
+        while self._queue and self.in_flight < self.max_concurrency:
+            finish, _, waiter = heapq.heappop(self._queue)
+            if waiter.abandoned:
+                continue
+            self._virtual_time = finish
+            self.in_flight += 1
+            waiter.granted.set_result(None)
+        for _, _, waiter in self._queue:
+            waiter.moved.set()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _record(self, flow: str, waited: float) -> None:
+        self.admitted += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        flow_stats = self._flow_stats.setdefault(flow, {"admitted": 0, "wait_seconds": 0.0})
+        flow_stats["admitted"] += 1
+        flow_stats["wait_seconds"] += waited
+
+    @contextlib.asynccontextmanager
+    async def slot(self, flow: str, cost: float = 1.0, on_position: Optional[PositionCallback] = None) -> AsyncIterator[float]:
+        """Hold one in-flight slot of the endpoint for the duration of the block.
+
+        Args:
+            flow: Caller class used for fair queuing, e.g. "agent" or a tool name
+            cost: Relative cost of the request
+            on_position: Awaited with the 1-based queue position whenever it changes while waiting
+
+        Yields:
+            Seconds spent waiting for admission
+        """
+        start = time.monotonic()
+        if self.in_flight < self.max_concurrency and not self.queue_length:
+            self.in_flight += 1
+        else:
+            waiter = self._enqueue(flow, cost)
+            self.queued += 1
+            try:
+                last_position = None
+                while not waiter.granted.done():
+                    position = self._position(waiter)
+                    if on_position is not None and position != last_position:
+                        last_position = position
+                        await on_position(position)
+                        if waiter.granted.done():
+                            break
+                    waiter.moved.clear()
+                    moved = asyncio.ensure_future(waiter.moved.wait())
+                    try:
+                        await asyncio.wait({waiter.granted, moved}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        moved.cancel()
+            except BaseException:
+                if waiter.granted.done():
+                    self._release()
+                else:
+                    waiter.abandoned = True
+                    # Let the requests queued behind it report their new position
+                    self._dispatch()
+                raise
+
+        waited = time.monotonic() - start
+        self._record(flow, waited)
+        if waited > 0.1:
+            logger.info({"message": "LLM request admitted after queuing", "endpoint": self.endpoint, "flow": flow, "wait_ms": round(waited * 1000, 1)})
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_length": self.queue_length,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "avg_wait_ms": round(self.wait_seconds / self.admitted * 1000, 1) if self.admitted else 0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            "flows": {
+                flow: {
+                    "weight": self.weights.get(flow, 1.0),
+                    "admitted": int(values["admitted"]),
+                    "avg_wait_ms": round(values["wait_seconds"] / values["admitted"] * 1000, 1),
+                }
+                for flow, values in self._flow_stats.items()
+            },
+        }
+
+
+_schedulers: Dict[str, FairScheduler] = {}
+
+
+def get_scheduler(endpoint: Optional[str] = None) -> Optional[FairScheduler]:
+    """Return the process-wide scheduler for a model endpoint.
+
+    Args:
+        endpoint: Model endpoint base URL, defaults to OPENAI_BASE_URL
+
+    Returns:
+        The endpoint's scheduler, or None when admission control is disabled
+    """
+    if ADMISSION_MAX_CONCURRENCY <= 0:
+        return None
+    endpoint = str(endpoint or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+    scheduler = _schedulers.get(endpoint)
+    if scheduler is None:
+        scheduler = _schedulers[endpoint] = FairScheduler(endpoint)
+    return scheduler
+
+
+def admission_stats() -> List[Dict[str, Any]]:
+    """Return the stats of every endpoint scheduler created so far."""
+    return [scheduler.stats() for scheduler in _schedulers.values()]
@@ -18,32 +18,70 @@
 
 import asyncio
 import contextlib
+import inspect
 import json
+import os
+import time
 from typing import AsyncIterator, List, Dict, Any, TypedDict, Optional, Callable, Awaitable
 
 from langchain_core.messages import HumanMessage, AIMessage, AnyMessage, SystemMessage, ToolMessage, ToolCall
+from langchain_core.runnables import RunnableConfig
 from langchain_core.utils.function_calling import convert_to_openai_tool
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
-from openai import AsyncOpenAI
 
+from admission import ADMISSION_WEIGHTS, AGENT_FLOW, get_scheduler
+from checkpointing import PostgresCheckpointSaver, create_checkpointer
 from client import MCPClient
+from context_window import ContextWindowManager
+from hedging import StreamHedger, close_stream
+from intent_router import INTENT_ROUTER_MODE, IntentRouter
 from logger import logger
+from metrics import LatencyMetrics, TurnStats
+from openai_clients import get_async_openai_client
 from prompts import Prompts
-from postgres_storage import PostgreSQLConversationStorage
-from utils import convert_langgraph_messages_to_openai
+from semantic_cache import SEMANTIC_CACHE_ENABLED, SemanticResponseCache
+from streaming import EventQueue, StreamQueueMetrics
+from tool_cache import ToolResultCache
+from tool_selection import TOOL_SELECTION_EMBEDDINGS, TOOL_SELECTION_ENABLED, ToolSelector
+from postgres_storage import PostgreSQLConversationStorage, StoredImage
+from utils import convert_langgraph_messages_to_openai, parse_tool_settings
 
 
-memory = MemorySaver()
 SENTINEL = object()
+
+# Serve turns without tools by calling the model directly instead of running the LangGraph graph.
+AGENT_FAST_PATH = os.getenv("AGENT_FAST_PATH", "true").lower() == "true"
+
+# Start executing each tool call as soon as its streamed JSON arguments are complete.
+EAGER_TOOL_DISPATCH = os.getenv("EAGER_TOOL_DISPATCH", "false").lower() == "true"
+
+# Upper bound on simultaneous in-flight calls per tool, shared by every chat served by the agent.
+DEFAULT_TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY_DEFAULT", "4"))
+TOOL_CONCURRENCY_LIMITS = parse_tool_settings(
+    os.getenv("TOOL_CONCURRENCY_LIMITS", "search_documents=2,write_code=2,explain_image=2"),
+    cast=int,
+)
+
+# Tools whose output is already a finished answer; a turn that calls only one of them ends with
+# that output instead of another generate step restating it. Opt-in, e.g. FINAL_TOOLS=search_documents.
+FINAL_TOOLS = {name.strip() for name in os.getenv("FINAL_TOOLS", "").split(",") if name.strip()}
+
 StreamCallback = Callable[[Dict[str, Any]], Awaitable[None]]
 
 
+async def _discard_event(event: Dict[str, Any]) -> None:
+    """Stream callback used when a graph run has no consumer attached."""
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
 class State(TypedDict, total=False):
     iterations: int
     messages: List[AnyMessage]
     chat_id: Optional[str]
-    image_data: Optional[str]
+    image_data: Optional[StoredImage]
 
 
 class ChatAgent:
@@ -71,6 +109,27 @@ class ChatAgent:
         
         self.current_model = None
         self.max_iterations = 3
+        self.tool_concurrency_limits = dict(TOOL_CONCURRENCY_LIMITS)
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.eager_tool_dispatch = EAGER_TOOL_DISPATCH
+        self.final_tools = set(FINAL_TOOLS)
+        self.context_window = ContextWindowManager()
+        self.tool_cache = ToolResultCache()
+        self.semantic_cache = None
+        if SEMANTIC_CACHE_ENABLED and vector_store is not None:
+            self.semantic_cache = SemanticResponseCache(vector_store.embeddings)
+        self.checkpointer = create_checkpointer(postgres_storage)
+        self.stream_metrics = StreamQueueMetrics()
+        self.stream_hedger = StreamHedger()
+        self.latency_metrics = LatencyMetrics()
+        self.fast_path = AGENT_FAST_PATH
+        self.tool_selector = None
+        if TOOL_SELECTION_ENABLED:
+            self.tool_selector = ToolSelector(
+                embeddings=vector_store.embeddings if TOOL_SELECTION_EMBEDDINGS and vector_store is not None else None,
+                count_tokens=self.context_window.count_text_tokens,
+            )
+        self.intent_router = IntentRouter() if INTENT_ROUTER_MODE in ("shadow", "on") else None
         
         self.mcp_client = None
         self.openai_tools = None
@@ -78,8 +137,6 @@ class ChatAgent:
         self.system_prompt = None
         
         self.graph = self._build_graph()
-        self.stream_callback = None
-        self.last_state = None
 
     @classmethod
     async def create(cls, vector_store, config_manager, postgres_storage: PostgreSQLConversationStorage):
@@ -90,6 +147,8 @@ class ChatAgent:
         is completed before the agent is ready to be used.
         """
         agent = cls(vector_store, config_manager, postgres_storage)
+        if isinstance(agent.checkpointer, PostgresCheckpointSaver):
+            await agent.checkpointer.setup()
         await agent.init_tools()
         
         available_tools = list(agent.tools_by_name.values()) if agent.tools_by_name else []
@@ -152,24 +211,44 @@ class ChatAgent:
         Raises:
             ValueError: If the model is not available
         """
-        import os
         available_models = self.config_manager.get_available_models()
 
         try:
             if model_name in available_models:
                 self.current_model = model_name
                 logger.info(f"Switched to model: {model_name}")
-                # Use OpenAI API instead of local model container
-                self.model_client = AsyncOpenAI(
-                    base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-                    api_key=os.getenv("OPENAI_API_KEY")
-                )
+                # Use OpenAI API instead of local model container; the pooled client is shared process-wide.
+                # Retries are left to the stream hedger, whose timing would otherwise include SDK backoff.
+                self.model_client = get_async_openai_client().with_options(max_retries=0)
             else:
                 raise ValueError(f"Model {model_name} is not available. Available models: {available_models}")
         except Exception as e:
             logger.error(f"Error setting current model: {e}")
             raise ValueError(f"Model {model_name} is not available. Available models: {available_models}")
 
+    async def forget_chat(self, chat_id: str) -> None:
+        """Drop the graph checkpoints kept for a chat after it is deleted.
+
+        Args:
+            chat_id: Chat whose checkpoint thread should be removed
+        """
+        if self.checkpointer is None:
+            return
+        try:
+            await self.checkpointer.adelete_thread(chat_id)
+        except Exception as e:
+            logger.warning({"message": "Failed to delete chat checkpoints", "chat_id": chat_id, "error": str(e)})
+
+    def tools_enabled(self) -> bool:
+        """Return whether the current model is offered tools on this turn."""
+        # OpenAI models (gpt-4, gpt-4-turbo, gpt-3.5-turbo) all support tool calling
+        # NVIDIA local models also support tool calling
+        supports_tools = (
+            self.current_model.startswith("gpt-") or  # All OpenAI GPT models
+            self.current_model in {"gpt-oss-20b", "gpt-oss-120b"}  # NVIDIA local models
+        )
+        return bool(supports_tools and self.openai_tools)
+
     def should_continue(self, state: State) -> str:
         """Determine whether to continue the tool calling loop.
         
@@ -211,11 +290,56 @@ class ChatAgent:
         logger.debug({"message": "GRAPH: should_continue → CONTINUE (has tool calls)", "chat_id": state.get("chat_id")})
         return "continue"
 
-    async def tool_node(self, state: State) -> Dict[str, Any]:
+    async def route(self, state: State, config: RunnableConfig) -> Dict[str, Any]:
+        """Emit the tool call of an obvious single-tool request without asking the model.
+        
+        Requests the router is not confident about go on to ``generate``, which
+        scores the router's prediction against the tool calls the model makes.
+        
+        Args:
+            state: Current graph state
+            config: LangGraph run configuration carrying the per-query stream callback
+            
+        Returns:
+            State with the synthesized tool call message, or no update
+        """
+        if not self.tools_enabled():
+            return {}
+        messages = state.get("messages", [])
+        route = self.intent_router.decide(messages, state.get("image_data"), self.tools_by_name)
+        if route is None or not route.routed:
+            pending = self._get_intent_route(config)
+            if pending is not None:
+                pending["route"] = route
+            return {}
+
+        stream_callback = self._get_stream_callback(config)
+        await stream_callback({'type': 'node_start', 'data': 'route'})
+        logger.debug({
+            "message": "GRAPH: route → action (skipping planning generate)",
+            "chat_id": state.get("chat_id"),
+            "tool": route.tool,
+            "rule": route.rule,
+            "confidence": route.confidence
+        })
+        await stream_callback({'type': 'node_end', 'data': 'route'})
+        return {"messages": messages + [route.to_message()]}
+
+    def after_route(self, state: State) -> str:
+        """Continue with the routed tool call, or let the model plan the turn."""
+        last_message = state["messages"][-1] if state.get("messages") else None
+        return "action" if isinstance(last_message, AIMessage) and last_message.tool_calls else "generate"
+
+    async def tool_node(self, state: State, config: RunnableConfig) -> Dict[str, Any]:
         """Execute tools from the last AI message's tool calls.
         
+        Independent calls are dispatched concurrently, bounded by per-tool
+        semaphores; the resulting ToolMessages keep the original call order.
+        Calls already started eagerly by ``generate`` are joined instead of re-run.
+        
         Args:
             state: Current graph state
+            config: LangGraph run configuration carrying the per-query stream callback
             
         Returns:
             Updated state with tool results and incremented iteration count
@@ -225,43 +349,30 @@ class ChatAgent:
             "chat_id": state.get("chat_id"),
             "iterations": state.get("iterations", 0)
         })
-        await self.stream_callback({'type': 'node_start', 'data': 'tool_node'})
+        stream_callback = self._get_stream_callback(config)
+        started = time.perf_counter()
+        await stream_callback({'type': 'node_start', 'data': 'tool_node'})
         
-        outputs = []
         messages = state.get("messages", [])
         last_message = messages[-1]
+        eager_tasks = self._get_eager_tool_tasks(config)
+        pending = []
         for i, tool_call in enumerate(last_message.tool_calls):
-            logger.debug(f'Executing tool {i+1}/{len(last_message.tool_calls)}: {tool_call["name"]} with args: {tool_call["args"]}')
-            await self.stream_callback({'type': 'tool_start', 'data': tool_call["name"]})
-            
-            try:
-                if tool_call["name"] == "explain_image" and state.get("image_data"):
-                    tool_args = tool_call["args"].copy()
-                    tool_args["image"] = state["image_data"]
-                    logger.info(f'Executing tool {tool_call["name"]} with args: {tool_args}')
-                    tool_result = await self.tools_by_name[tool_call["name"]].ainvoke(tool_args)
-                    state["process_image_used"] = True
-                else:
-                    tool_result = await self.tools_by_name[tool_call["name"]].ainvoke(tool_call["args"])
-                if "code" in tool_call["name"]:
-                    content = str(tool_result)
-                elif isinstance(tool_result, str):
-                    content = tool_result
-                else:
-                    content = json.dumps(tool_result)
-            except Exception as e:
-                logger.error(f'Error executing tool {tool_call["name"]}: {str(e)}', exc_info=True)
-                content = f"Error executing tool '{tool_call['name']}': {str(e)}"
-            
-            await self.stream_callback({'type': 'tool_end', 'data': tool_call["name"]})
-
-            outputs.append(
-                ToolMessage(
-                    content=content,
-                    name=tool_call["name"],
-                    tool_call_id=tool_call["id"],
-                )
-            )
+            dispatched = eager_tasks.pop(tool_call["id"], None) if eager_tasks is not None else None
+            if dispatched and dispatched[0]["name"] == tool_call["name"] and dispatched[0]["args"] == tool_call["args"]:
+                pending.append(dispatched[1])
+                continue
+            if dispatched:
+                await self._discard_eager_call(*dispatched, stream_callback)
+            pending.append(self._execute_tool_call(tool_call, i, len(last_message.tool_calls), state, stream_callback))
+        # Calls started for tool call ids the final message does not contain
+        while eager_tasks:
+            await self._discard_eager_call(*eager_tasks.popitem()[1], stream_callback)
+        outputs = list(await asyncio.gather(*pending))
+        final_answer = self._final_answer(last_message, outputs)
+        if final_answer is not None:
+            await stream_callback({'type': 'token', 'data': final_answer.content})
+            outputs.append(final_answer)
 
         state["iterations"] = state.get("iterations", 0) + 1
         
@@ -270,67 +381,266 @@ class ChatAgent:
             "chat_id": state.get("chat_id"),
             "iterations": state.get("iterations"),
             "tools_executed": len(outputs),
-            "next_step": "→ returning to generate"
+            "next_step": "→ END (final tool output)" if final_answer is not None else "→ returning to generate"
         })
-        await self.stream_callback({'type': 'node_end', 'data': 'tool_node'})
+        await stream_callback({'type': 'node_end', 'data': 'tool_node', 'duration_ms': _elapsed_ms(started)})
         return {"messages": messages + outputs, "iterations": state.get("iterations", 0) + 1}
 
-    async def generate(self, state: State) -> Dict[str, Any]:
+    async def _discard_eager_call(self, tool_call: ToolCall, task: asyncio.Task, stream_callback: StreamCallback) -> None:
+        """Cancel an eagerly started tool call that the final AI message did not confirm.
+        
+        The client already received the call's ``tool_start``, so a cancelled call
+        is closed with a ``tool_end`` carrying ``status: cancelled``.
+        
+        Args:
+            tool_call: Tool call as parsed while the model was streaming
+            task: Task executing it
+            stream_callback: Callback for streaming events
+        """
+        started = inspect.getcoroutinestate(task.get_coro()) != inspect.CORO_CREATED
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        if task.cancelled() and started:
+            await stream_callback({'type': 'tool_end', 'data': tool_call["name"], 'status': 'cancelled'})
+        logger.debug({"message": "Discarded eagerly dispatched tool call", "tool": tool_call["name"], "cancelled": task.cancelled()})
+
+    def _final_answer(self, ai_message: AIMessage, outputs: List[ToolMessage]) -> Optional[AIMessage]:
+        """Return the assistant answer made of a final tool's output, if the turn can end with it.
+        
+        Only a step with a single successful call to a tool listed in ``final_tools``
+        qualifies; anything else needs the model to combine or explain the results.
+        
+        Args:
+            ai_message: AI message whose tool calls were executed
+            outputs: Tool messages produced for those calls
+            
+        Returns:
+            AIMessage carrying the tool output, or None to continue with ``generate``
+        """
+        if len(ai_message.tool_calls) != 1 or len(outputs) != 1:
+            return None
+        output = outputs[0]
+        if output.name not in self.final_tools or output.status == "error" or not output.content:
+            return None
+        content = output.content if isinstance(output.content, str) else json.dumps(output.content)
+        logger.debug({"message": "Using final tool output as the answer", "tool": output.name, "answer_length": len(content)})
+        return AIMessage(content=content)
+
+    def after_action(self, state: State) -> str:
+        """End the turn when the tool node already produced the answer, otherwise go back to ``generate``."""
+        last_message = state["messages"][-1] if state.get("messages") else None
+        return "end" if isinstance(last_message, AIMessage) else "generate"
+
+    def _get_tool_semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        """Return the semaphore bounding concurrent calls to a tool.
+        
+        Args:
+            tool_name: Name of the tool
+            
+        Returns:
+            Semaphore shared by all chats for this tool
+        """
+        semaphore = self._tool_semaphores.get(tool_name)
+        if semaphore is None:
+            limit = self.tool_concurrency_limits.get(tool_name, DEFAULT_TOOL_CONCURRENCY)
+            semaphore = self._tool_semaphores[tool_name] = asyncio.Semaphore(max(1, limit))
+        return semaphore
+
+    @contextlib.asynccontextmanager
+    async def _admitted(self, flow: str, endpoint: Optional[str], stream_callback: StreamCallback) -> AsyncIterator[None]:
+        """Hold an admission slot of a model endpoint, reporting the queue position while waiting.
+        
+        Args:
+            flow: Fair-queuing flow, the agent itself or the name of an LLM-backed tool
+            endpoint: Model endpoint base URL, None for the default endpoint
+            stream_callback: Callback receiving ``queue`` events while the request waits
+        """
+        scheduler = get_scheduler(endpoint)
+        if scheduler is None:
+            yield
+            return
+
+        queued = False
+
+        async def on_position(position: int) -> None:
+            nonlocal queued
+            queued = True
+            await stream_callback({'type': 'queue', 'data': {'flow': flow, 'position': position}})
+
+        async with scheduler.slot(flow, on_position=on_position) as waited:
+            if queued:
+                await stream_callback({'type': 'queue', 'data': {'flow': flow, 'position': 0, 'wait_ms': round(waited * 1000, 1)}})
+            yield
+
+    async def _execute_tool_call(self, tool_call: ToolCall, index: int, total: Optional[int], state: State, stream_callback: StreamCallback) -> ToolMessage:
+        """Execute a single tool call under its per-tool concurrency limit.
+        
+        Args:
+            tool_call: Tool call emitted by the model
+            index: Position of the call within the AI message
+            total: Number of tool calls in the AI message, or None while still streaming
+            state: Current graph state
+            stream_callback: Callback for streaming events
+            
+        Returns:
+            ToolMessage holding the tool output or the error raised by the tool
+        """
+        logger.debug(f'Executing tool {index+1}/{total or "?"}: {tool_call["name"]} with args: {tool_call["args"]}')
+        started = time.perf_counter()
+        await stream_callback({'type': 'tool_start', 'data': tool_call["name"]})
+        status = "success"
+        
+        try:
+            uses_image = tool_call["name"] == "explain_image" and state.get("image_data")
+            sources = None
+            if self.tool_cache.depends_on_index(tool_call["name"]):
+                sources = self.config_manager.get_selected_sources()
+            content = None if uses_image else self.tool_cache.get(tool_call["name"], tool_call["args"], sources)
+            # Read before the call so a result racing an index invalidation is not cached as current
+            index_version = self.tool_cache.index_version
+
+            if content is not None:
+                logger.debug({"message": "Tool result served from cache", "tool": tool_call["name"], "chat_id": state.get("chat_id")})
+            else:
+                # Tools that call the LLM themselves share the endpoint's admission queue with the agent
+                admission = (
+                    self._admitted(tool_call["name"], None, stream_callback)
+                    if tool_call["name"] in ADMISSION_WEIGHTS
+                    else contextlib.nullcontext()
+                )
+                async with self._get_tool_semaphore(tool_call["name"]), admission:
+                    if uses_image:
+                        tool_args = tool_call["args"].copy()
+                        # The data URI only exists for the duration of the tool call
+                        tool_args["image"] = state["image_data"].to_data_uri()
+                        logger.info(f'Executing tool {tool_call["name"]} with args: {tool_call["args"]} and a {state["image_data"].size} byte {state["image_data"].mime_type} image')
+                        tool_result = await self.tools_by_name[tool_call["name"]].ainvoke(tool_args)
+                        state["process_image_used"] = True
+                    else:
+                        tool_result = await self.tools_by_name[tool_call["name"]].ainvoke(tool_call["args"])
+                if "code" in tool_call["name"]:
+                    content = str(tool_result)
+                elif isinstance(tool_result, str):
+                    content = tool_result
+                else:
+                    content = json.dumps(tool_result)
+                if not uses_image:
+                    self.tool_cache.set(tool_call["name"], tool_call["args"], content, sources, index_version)
+        except Exception as e:
+            logger.error(f'Error executing tool {tool_call["name"]}: {str(e)}', exc_info=True)
+            content = f"Error executing tool '{tool_call['name']}': {str(e)}"
+            status = "error"
+        
+        await stream_callback({'type': 'tool_end', 'data': tool_call["name"], 'duration_ms': _elapsed_ms(started)})
+
+        return ToolMessage(
+            content=content,
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+            status=status,
+        )
+
+    async def generate(self, state: State, config: RunnableConfig) -> Dict[str, Any]:
         """Generate AI response using the current model.
         
         Args:
             state: Current graph state
+            config: LangGraph run configuration carrying the per-query stream callback
             
         Returns:
             Updated state with new AI message
         """
-        messages = convert_langgraph_messages_to_openai(state.get("messages", []))
+        stream_callback = self._get_stream_callback(config)
+        started = time.perf_counter()
+        context = self.context_window.trim(state.get("messages", []))
+        messages = convert_langgraph_messages_to_openai(context.messages)
         logger.debug({
             "message": "GRAPH: ENTERING NODE - generate",
             "chat_id": state.get("chat_id"),
             "iterations": state.get("iterations", 0),
             "current_model": self.current_model,
-            "message_count": len(state.get("messages", []))
+            "message_count": len(state.get("messages", [])),
+            "prompt_tokens": context.prompt_tokens,
+            "dropped_tokens": context.dropped_tokens
         })
-        await self.stream_callback({'type': 'node_start', 'data': 'generate'})
+        await stream_callback({'type': 'node_start', 'data': 'generate'})
+        if context.dropped_messages:
+            logger.info({
+                "message": "Trimmed conversation history to fit context budget",
+                "chat_id": state.get("chat_id"),
+                "dropped_messages": context.dropped_messages,
+                "dropped_tokens": context.dropped_tokens,
+                "prompt_tokens": context.prompt_tokens,
+                "max_tokens": self.context_window.max_tokens
+            })
+            await stream_callback({
+                'type': 'context_trimmed',
+                'data': {
+                    'dropped_messages': context.dropped_messages,
+                    'dropped_tokens': context.dropped_tokens,
+                    'prompt_tokens': context.prompt_tokens,
+                }
+            })
 
-        # OpenAI models (gpt-4, gpt-4-turbo, gpt-3.5-turbo) all support tool calling
-        # NVIDIA local models also support tool calling
-        supports_tools = (
-            self.current_model.startswith("gpt-") or  # All OpenAI GPT models
-            self.current_model in {"gpt-oss-20b", "gpt-oss-120b"}  # NVIDIA local models
-        )
-        has_tools = supports_tools and self.openai_tools and len(self.openai_tools) > 0
+        has_tools = self.tools_enabled()
         
         logger.debug({
             "message": "Tool calling debug info",
             "chat_id": state.get("chat_id"),
             "current_model": self.current_model,
-            "supports_tools": supports_tools,
             "openai_tools_count": len(self.openai_tools) if self.openai_tools else 0,
             "openai_tools": self.openai_tools,
             "has_tools": has_tools
         })
         
         tool_params = {}
+        turn_stats = self._get_turn_stats(config)
         if has_tools:
-            tool_params = {
-                "tools": self.openai_tools,
-                "tool_choice": "auto"
-            }
+            tools = self.openai_tools
+            if self.tool_selector is not None:
+                selection = await self.tool_selector.select(tools, state.get("messages", []), state.get("image_data"))
+                tools = selection.tools
+                if turn_stats is not None:
+                    turn_stats.record_tool_selection(len(tools), selection.schema_tokens, selection.saved_tokens)
+            if tools:
+                tool_params = {
+                    "tools": tools,
+                    "tool_choice": "auto"
+                }
         
-        stream = await self.model_client.chat.completions.create(
-            model=self.current_model,
-            messages=messages,
-            temperature=0,
-            top_p=1,
-            stream=True,
-            **tool_params
-        )
+        on_tool_call_ready = None
+        eager_tasks = self._get_eager_tool_tasks(config)
+        if eager_tasks is not None and has_tools:
+            def on_tool_call_ready(index: int, item: Dict[str, str]) -> None:
+                tool_call = self._build_tool_call(index, item)
+                task = asyncio.create_task(self._execute_tool_call(tool_call, index, None, state, stream_callback))
+                eager_tasks[tool_call["id"]] = (tool_call, task)
+
+        partial_response = self._get_partial_response(config)
+        output_buffer = None
+        if partial_response is not None:
+            partial_response["message_count"] = len(state.get("messages", []))
+            partial_response["tokens"] = output_buffer = []
 
-        llm_output_buffer, tool_calls_buffer = await self._stream_response(stream, self.stream_callback)
+        # The admission slot is held until the response has been fully streamed
+        async with self._admitted(AGENT_FLOW, getattr(self.model_client, "base_url", None), stream_callback):
+            stream = await self.stream_hedger.open(lambda: self.model_client.chat.completions.create(
+                model=self.current_model,
+                messages=messages,
+                temperature=0,
+                top_p=1,
+                stream=True,
+                **tool_params
+            ))
+            llm_output_buffer, tool_calls_buffer = await self._stream_response(
+                stream, stream_callback, on_tool_call_ready, output_buffer
+            )
         tool_calls = self._format_tool_calls(tool_calls_buffer)
         raw_output = "".join(llm_output_buffer)
+        pending_route = self._get_intent_route(config)
+        if pending_route and "route" in pending_route:
+            self.intent_router.record_outcome(pending_route.pop("route"), tool_calls)
         
         logger.debug({
             "message": "Tool call generation results",
@@ -356,7 +666,9 @@ class ChatAgent:
             "tool_calls_names": [tc["name"] for tc in tool_calls] if tool_calls else [],
             "next_step": "→ should_continue decision"
         })
-        await self.stream_callback({'type': 'node_end', 'data': 'generate'})
+        if turn_stats is not None:
+            turn_stats.record_generation(context.prompt_tokens, self.context_window.count_message_tokens(response))
+        await stream_callback({'type': 'node_end', 'data': 'generate', 'duration_ms': _elapsed_ms(started)})
         return {"messages": state.get("messages", []) + [response]}
 
     def _build_graph(self) -> StateGraph:
@@ -369,7 +681,19 @@ class ChatAgent:
 
         workflow.add_node("generate", self.generate)
         workflow.add_node("action", self.tool_node)
-        workflow.add_edge(START, "generate")
+        if self.intent_router is not None:
+            workflow.add_node("route", self.route)
+            workflow.add_edge(START, "route")
+            workflow.add_conditional_edges(
+                "route",
+                self.after_route,
+                {
+                    "action": "action",
+                    "generate": "generate",
+                },
+            )
+        else:
+            workflow.add_edge(START, "generate")
         workflow.add_conditional_edges(
             "generate",
             self.should_continue,
@@ -378,9 +702,16 @@ class ChatAgent:
                 "end": END,
             },
         )
-        workflow.add_edge("action", "generate")
+        workflow.add_conditional_edges(
+            "action",
+            self.after_action,
+            {
+                "generate": "generate",
+                "end": END,
+            },
+        )
 
-        return workflow.compile(checkpointer=memory)
+        return workflow.compile(checkpointer=self.checkpointer)
 
     def _format_tool_calls(self, tool_calls_buffer: Dict[int, Dict[str, str]]) -> List[ToolCall]:
         """Parse streamed tool call buffer into ToolCall objects.
@@ -394,79 +725,121 @@ class ChatAgent:
         if not tool_calls_buffer:
             return []
 
-        tool_calls = []
-        for i in sorted(tool_calls_buffer):
-            item = tool_calls_buffer[i]
-            try:
-                parsed_args = json.loads(item["arguments"] or "{}")
-            except json.JSONDecodeError:
-                parsed_args = {}
-                
-            tool_calls.append(
-                ToolCall(
-                    name=item["name"],
-                    args=parsed_args,
-                    id=item["id"] or f"call_{i}",
-                )
-            )
-        return tool_calls
+        return [self._build_tool_call(i, tool_calls_buffer[i]) for i in sorted(tool_calls_buffer)]
+
+    def _build_tool_call(self, index: int, item: Dict[str, str]) -> ToolCall:
+        """Parse one streamed tool call buffer entry into a ToolCall.
+        
+        Args:
+            index: Index of the tool call in the stream
+            item: Accumulated id, name and JSON arguments
+            
+        Returns:
+            ToolCall with parsed arguments
+        """
+        try:
+            parsed_args = json.loads(item["arguments"] or "{}")
+        except json.JSONDecodeError:
+            parsed_args = {}
+            
+        return ToolCall(
+            name=item["name"],
+            args=parsed_args,
+            id=item["id"] or f"call_{index}",
+        )
 
-    async def _stream_response(self, stream, stream_callback: StreamCallback) -> tuple[List[str], Dict[int, Dict[str, str]]]:
+    async def _stream_response(
+        self,
+        stream,
+        stream_callback: StreamCallback,
+        on_tool_call_ready: Optional[Callable[[int, Dict[str, str]], None]] = None,
+        llm_output_buffer: Optional[List[str]] = None
+    ) -> tuple[List[str], Dict[int, Dict[str, str]]]:
         """Process streaming LLM response and extract content and tool calls.
         
         Args:
             stream: Async stream from LLM
             stream_callback: Callback for streaming events
+            on_tool_call_ready: Optional callback invoked once per tool call as soon as its
+                arguments are complete, i.e. they parse as a JSON object or the model moved on
+                to the next tool call index
+            llm_output_buffer: Optional list that content tokens are appended to as they arrive
             
         Returns:
             Tuple of (content_buffer, tool_calls_buffer)
         """
-        llm_output_buffer = []
+        if llm_output_buffer is None:
+            llm_output_buffer = []
         tool_calls_buffer = {}
+        ready_tool_calls = set()
         saw_tool_finish = False
 
-        async for chunk in stream:
-            for choice in getattr(chunk, "choices", []) or []:
-                delta = getattr(choice, "delta", None)
-                if not delta:
-                    continue
-
-                content = getattr(delta, "content", None)
-                if content:
-                    await stream_callback({"type": "token", "data": content})
-                    llm_output_buffer.append(content)
-                for tc in getattr(delta, "tool_calls", []) or []:
-                    idx = getattr(tc, "index", None)
-                    if idx is None:
-                        idx = 0 if not tool_calls_buffer else max(tool_calls_buffer) + 1
-                    entry = tool_calls_buffer.setdefault(idx, {"id": None, "name": None, "arguments": ""})
-
-                    if getattr(tc, "id", None):
-                        entry["id"] = tc.id
-
-                    fn = getattr(tc, "function", None)
-                    if fn:
-                        if getattr(fn, "name", None):
-                            entry["name"] = fn.name
-                        if getattr(fn, "arguments", None):
-                            entry["arguments"] += fn.arguments
-
-                finish_reason = getattr(choice, "finish_reason", None)
-                if finish_reason == "tool_calls":
-                    saw_tool_finish = True
-                    break
+        def mark_ready(index: int) -> None:
+            entry = tool_calls_buffer[index]
+            if index in ready_tool_calls or not entry["id"] or not entry["name"]:
+                return
+            ready_tool_calls.add(index)
+            on_tool_call_ready(index, entry)
+
+        try:
+            async for chunk in stream:
+                for choice in getattr(chunk, "choices", []) or []:
+                    delta = getattr(choice, "delta", None)
+                    if not delta:
+                        continue
+
+                    content = getattr(delta, "content", None)
+                    if content:
+                        await stream_callback({"type": "token", "data": content})
+                        llm_output_buffer.append(content)
+                    for tc in getattr(delta, "tool_calls", []) or []:
+                        idx = getattr(tc, "index", None)
+                        if idx is None:
+                            idx = 0 if not tool_calls_buffer else max(tool_calls_buffer) + 1
+                        if on_tool_call_ready and idx not in tool_calls_buffer:
+                            for previous in list(tool_calls_buffer):
+                                mark_ready(previous)
+                        entry = tool_calls_buffer.setdefault(idx, {"id": None, "name": None, "arguments": ""})
+
+                        if getattr(tc, "id", None):
+                            entry["id"] = tc.id
+
+                        fn = getattr(tc, "function", None)
+                        if fn:
+                            if getattr(fn, "name", None):
+                                entry["name"] = fn.name
+                            if getattr(fn, "arguments", None):
+                                entry["arguments"] += fn.arguments
+
+                        if on_tool_call_ready and idx not in ready_tool_calls and entry["arguments"].rstrip().endswith("}"):
+                            try:
+                                json.loads(entry["arguments"])
+                            except json.JSONDecodeError:
+                                pass
+                            else:
+                                mark_ready(idx)
+
+                    finish_reason = getattr(choice, "finish_reason", None)
+                    if finish_reason == "tool_calls":
+                        saw_tool_finish = True
+                        break
                     
-            if saw_tool_finish:
-                break
+                if saw_tool_finish:
+                    break
+        finally:
+            # Release the upstream connection when the stream is abandoned early, e.g. after a
+            # tool_calls finish or when the run is cancelled
+            await close_stream(stream)
 
         return llm_output_buffer, tool_calls_buffer
 
-    async def query(self, query_text: str, chat_id: str, image_data: str = None) -> AsyncIterator[Dict[str, Any]]:
+    async def query(self, query_text: str, chat_id: str, image_data: Optional[StoredImage] = None) -> AsyncIterator[Dict[str, Any]]:
         """Process user query and stream response tokens.
         
         Args:
             query_text: User's input text
             chat_id: Unique chat identifier
+            image_data: Image uploaded with the query, if any
             
         Yields:
             Streaming events and tokens
@@ -478,10 +851,10 @@ class ChatAgent:
             "graph_flow": "START → generate → should_continue → action → generate → END"
         })
 
-        config = {"configurable": {"thread_id": chat_id}}
-
+        turn_stats = TurnStats()
         try:
-            existing_messages = await self.conversation_store.get_messages(chat_id, limit=1)
+            existing_messages = await self.conversation_store.get_messages(chat_id)
+            turn_stats.history_load_ms = turn_stats.elapsed_ms()
             
             base_system_prompt = self.system_prompt
             if image_data:
@@ -522,44 +895,201 @@ class ChatAgent:
                 }
             })
 
-            self.last_state = None
-            token_q: asyncio.Queue[Any] = asyncio.Queue()
-            self.stream_callback = lambda event: self._queue_writer(event, token_q)
-            runner = asyncio.create_task(self._run_graph(initial_state, config, chat_id, token_q))
+            cache_namespace = cache_vector = None
+            # Cached answers are keyed by the question alone, so follow-ups in a conversation never use them
+            context_free = not any(isinstance(msg, (HumanMessage, AIMessage)) for msg in existing_messages or [])
+            if self.semantic_cache and not image_data and context_free:
+                cache_namespace = self.semantic_cache.namespace(self.current_model, self.config_manager.get_selected_sources())
+                cache_vector = await self.semantic_cache.embed(query_text)
+                cached = self.semantic_cache.lookup(cache_namespace, cache_vector) if cache_vector is not None else None
+                if cached:
+                    answer, similarity = cached
+                    logger.info({"message": "Semantic cache hit", "chat_id": chat_id, "similarity": similarity})
+                    async for event in self._replay_cached_answer(chat_id, messages_to_process, answer, similarity):
+                        yield event
+                    return
+
+            token_q = EventQueue(metrics=self.stream_metrics)
+            config = {
+                "configurable": {
+                    "thread_id": chat_id,
+                    "stream_callback": lambda event: self._queue_writer(turn_stats.observe(event), token_q),
+                    "turn_stats": turn_stats,
+                    "eager_tool_tasks": {} if self.eager_tool_dispatch else None,
+                    "partial_response": {"message_count": 0, "tokens": []},
+                    "intent_route": {} if self.intent_router is not None else None,
+                }
+            }
+            # Turns that cannot call tools always end after one generate step, so they skip the graph
+            run = self._run_direct if self.fast_path and not self.tools_enabled() else self._run_graph
+            runner = asyncio.create_task(run(initial_state, config, chat_id, token_q))
+            final_state = None
+            completed = False
 
             try:
                 while True:
                     item = await token_q.get()
                     if item is SENTINEL:
+                        completed = True
                         break
                     yield item
             except Exception as stream_error:
                 logger.error({"message": "Error in streaming", "error": str(stream_error)}, exc_info=True)
             finally:
+                if not completed:
+                    # The consumer went away (generator closed or cancelled): stop the LLM stream
+                    # and pending tool calls instead of running the turn to completion
+                    runner.cancel()
                 with contextlib.suppress(asyncio.CancelledError):
-                    await runner
+                    final_state = await runner
+                self.stream_metrics.finish(token_q)
+                if token_q.overflows:
+                    logger.info({"message": "Slow stream consumer", "chat_id": chat_id, **token_q.stats()})
 
                 logger.debug({
                     "message": "GRAPH: EXECUTION COMPLETED",
                     "chat_id": chat_id,
-                    "final_iterations": self.last_state.get("iterations", 0) if self.last_state else 0
+                    "final_iterations": final_state.get("iterations", 0) if final_state else 0
                 })
 
+                if cache_vector is not None and final_state and final_state.get("messages"):
+                    final_msg = final_state["messages"][-1]
+                    cache_ttl = self._semantic_cache_ttl(final_state["messages"][len(messages_to_process):])
+                    if isinstance(final_msg, AIMessage) and final_msg.content and not final_msg.tool_calls and cache_ttl:
+                        self.semantic_cache.store(cache_namespace, cache_vector, query_text, final_msg.content, ttl=cache_ttl)
+
+            if completed:
+                self.latency_metrics.observe_turn(turn_stats)
+                summary = turn_stats.summary()
+                logger.debug({"message": "Turn completed", "chat_id": chat_id, **summary})
+                yield {"type": "turn_stats", "data": summary}
+
         except Exception as e:
             logger.error({"message": "GRAPH: EXECUTION FAILED", "error": str(e), "chat_id": chat_id}, exc_info=True)
             yield {"type": "error", "data": f"Error performing query: {str(e)}"}
 
+    def _semantic_cache_ttl(self, turn_messages: List[AnyMessage]) -> Optional[float]:
+        """Return how long the answer of a turn may be reused, or None if it must not be cached.
 
-    async def _queue_writer(self, event: Dict[str, Any], token_q: asyncio.Queue) -> None:
-        """Write events to the streaming queue.
+        An answer is only as fresh as the tool results it was built from: turns that
+        called a tool whose results are never cached (e.g. browsing) are not stored,
+        and otherwise the shortest TTL of the tools called applies.
+        """
+        ttl = self.semantic_cache.ttl
+        for msg in turn_messages:
+            if isinstance(msg, ToolMessage):
+                tool_ttl = self.tool_cache.ttl(msg.name)
+                if tool_ttl <= 0:
+                    return None
+                ttl = min(ttl, tool_ttl)
+        return ttl
+
+    async def _replay_cached_answer(self, chat_id: str, messages: List[AnyMessage], answer: str, similarity: float) -> AsyncIterator[Any]:
+        """Stream a semantically cached answer using the regular event protocol and persist the turn.
+        
+        Args:
+            chat_id: Chat identifier
+            messages: System prompt, history and the new user message
+            answer: Cached assistant answer
+            similarity: Cosine similarity between the cached and the current question
+            
+        Yields:
+            The same events a graph run without tool calls produces
+        """
+        yield {'type': 'semantic_cache_hit', 'data': {'similarity': round(similarity, 4)}}
+        yield {'type': 'node_start', 'data': 'generate'}
+        yield {'type': 'token', 'data': answer}
+        yield {'type': 'node_end', 'data': 'generate'}
+        try:
+            await self.conversation_store.save_messages(chat_id, messages + [AIMessage(content=answer)])
+        except Exception as save_err:
+            logger.warning({"message": "Failed to persist conversation", "chat_id": chat_id, "error": str(save_err)})
+        yield answer
+
+    def _get_stream_callback(self, config: Optional[RunnableConfig]) -> StreamCallback:
+        """Return the stream callback registered for the current graph run.
+        
+        The callback lives in the run config rather than on the agent so that a
+        single ChatAgent can serve many concurrent queries.
+        
+        Args:
+            config: LangGraph run configuration
+            
+        Returns:
+            The per-query stream callback, or a no-op if none was provided
+        """
+        callback = ((config or {}).get("configurable") or {}).get("stream_callback")
+        return callback if callback is not None else _discard_event
+
+    def _get_eager_tool_tasks(self, config: Optional[RunnableConfig]) -> Optional[Dict[str, Any]]:
+        """Return the per-run registry of eagerly dispatched tool calls.
+        
+        Args:
+            config: LangGraph run configuration
+            
+        Returns:
+            Mapping of tool_call_id to (ToolCall, Task), or None when eager dispatch is off
+        """
+        return ((config or {}).get("configurable") or {}).get("eager_tool_tasks")
+
+    def _get_partial_response(self, config: Optional[RunnableConfig]) -> Optional[Dict[str, Any]]:
+        """Return the per-run record of the response currently being streamed.
+        
+        Args:
+            config: LangGraph run configuration
+            
+        Returns:
+            Dict with the streamed ``tokens`` of the current generate step and the
+            ``message_count`` of the state it started from, or None if not tracked
+        """
+        return ((config or {}).get("configurable") or {}).get("partial_response")
+
+    def _get_intent_route(self, config: Optional[RunnableConfig]) -> Optional[Dict[str, Any]]:
+        """Return the per-run slot holding the router prediction that ``generate`` should score."""
+        return ((config or {}).get("configurable") or {}).get("intent_route")
+
+    def _get_turn_stats(self, config: Optional[RunnableConfig]) -> Optional[TurnStats]:
+        """Return the timings collector of the current turn, if the run has one."""
+        return ((config or {}).get("configurable") or {}).get("turn_stats")
+
+    def _close_cancelled_turn(self, messages: List[AnyMessage], partial_response: Optional[Dict[str, Any]]) -> List[AnyMessage]:
+        """Complete the history of a cancelled turn so it can be persisted and replayed.
+        
+        The text streamed so far is kept as the assistant's answer, and tool calls
+        that never received a result are answered with a cancellation notice so the
+        next request to the model is still a valid conversation.
+        
+        Args:
+            messages: Messages of the last state the graph reached
+            partial_response: Partial response record of the run
+            
+        Returns:
+            Messages to persist for the cancelled turn
+        """
+        messages = list(messages)
+        if partial_response and partial_response["tokens"] and len(messages) == partial_response["message_count"]:
+            messages.append(AIMessage(content="".join(partial_response["tokens"])))
+
+        last_message = messages[-1] if messages else None
+        if isinstance(last_message, AIMessage) and last_message.tool_calls:
+            for tool_call in last_message.tool_calls:
+                messages.append(ToolMessage(
+                    content="Tool call cancelled by the user.",
+                    tool_call_id=tool_call["id"],
+                    name=tool_call["name"]
+                ))
+        return messages
+
+    async def _queue_writer(self, event: Dict[str, Any], token_q: EventQueue) -> None:
+        """Write events to the streaming queue, waiting or coalescing when the consumer lags.
         
         Args:
             event: Event data to queue
             token_q: Queue for streaming events
         """
-        await token_q.put(event)
+        await token_q.put_event(event)
 
-    async def _run_graph(self, initial_state: Dict[str, Any], config: Dict[str, Any], chat_id: str, token_q: asyncio.Queue) -> None:
+    async def _run_graph(self, initial_state: Dict[str, Any], config: Dict[str, Any], chat_id: str, token_q: EventQueue) -> Optional[Dict[str, Any]]:
         """Run the graph execution in background task.
         
         Args:
@@ -567,7 +1097,12 @@ class ChatAgent:
             config: LangGraph configuration
             chat_id: Chat identifier
             token_q: Queue for streaming events
+            
+        Returns:
+            The final graph state of this run, or None if the graph produced no state
         """
+        last_state = None
+        cancelled = False
         try:
             async for final_state in self.graph.astream(
                 initial_state,
@@ -575,19 +1110,67 @@ class ChatAgent:
                 stream_mode="values",
                 stream_writer=lambda event: self._queue_writer(event, token_q)
             ):
-                self.last_state = final_state
+                last_state = final_state
+        except asyncio.CancelledError:
+            cancelled = True
+            logger.info({"message": "GRAPH: EXECUTION CANCELLED", "chat_id": chat_id})
+            raise
         finally:
-            try:
-                if self.last_state and self.last_state.get("messages"):
-                    final_msg = self.last_state["messages"][-1]
-                    try:
-                        logger.debug(f'Saving messages to conversation store for chat: {chat_id}')
-                        await self.conversation_store.save_messages(chat_id, self.last_state["messages"])
-                    except Exception as save_err:
-                        logger.warning({"message": "Failed to persist conversation", "chat_id": chat_id, "error": str(save_err)})
-
-                    content = getattr(final_msg, "content", None)
-                    if content:
-                        await token_q.put(content)
-            finally:
-                await token_q.put(SENTINEL)
+            for _, task in (self._get_eager_tool_tasks(config) or {}).values():
+                task.cancel()
+            await self._finish_run(last_state, cancelled, config, chat_id, token_q)
+        return last_state
+
+    async def _run_direct(self, initial_state: Dict[str, Any], config: Dict[str, Any], chat_id: str, token_q: EventQueue) -> Optional[Dict[str, Any]]:
+        """Run a tool-less turn by calling ``generate`` directly, bypassing the graph and checkpointer.
+        
+        Emits the same events and persists the same messages as ``_run_graph`` would
+        for a turn that ends after a single generate step.
+        
+        Args:
+            initial_state: Starting state of the turn
+            config: Run configuration carrying the per-query callbacks
+            chat_id: Chat identifier
+            token_q: Queue for streaming events
+            
+        Returns:
+            The state after the generate step
+        """
+        last_state = initial_state
+        cancelled = False
+        try:
+            last_state = {**initial_state, **await self.generate(initial_state, config)}
+        except asyncio.CancelledError:
+            cancelled = True
+            logger.info({"message": "FAST PATH: EXECUTION CANCELLED", "chat_id": chat_id})
+            raise
+        finally:
+            await self._finish_run(last_state, cancelled, config, chat_id, token_q)
+        return last_state
+
+    async def _finish_run(self, last_state: Optional[Dict[str, Any]], cancelled: bool, config: Dict[str, Any], chat_id: str, token_q: EventQueue) -> None:
+        """Persist the messages of a finished or cancelled run and terminate its event stream.
+        
+        Args:
+            last_state: Last state the run reached
+            cancelled: Whether the run was cancelled before completing
+            config: Run configuration
+            chat_id: Chat identifier
+            token_q: Queue for streaming events
+        """
+        try:
+            if last_state and last_state.get("messages"):
+                messages = last_state["messages"]
+                if cancelled:
+                    messages = self._close_cancelled_turn(messages, self._get_partial_response(config))
+                try:
+                    logger.debug(f'Saving messages to conversation store for chat: {chat_id}')
+                    await self.conversation_store.save_messages(chat_id, messages)
+                except Exception as save_err:
+                    logger.warning({"message": "Failed to persist conversation", "chat_id": chat_id, "error": str(save_err)})
+
+                content = getattr(messages[-1], "content", None)
+                if content and not cancelled:
+                    await token_q.put(content)
+        finally:
+            await token_q.put(SENTINEL)
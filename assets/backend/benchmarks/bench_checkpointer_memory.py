@@ -0,0 +1,88 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Measure memory retained by the LangGraph checkpointer after many chats.
+
+Runs the same number of single-turn chats through a stub agent for each
+checkpointer and reports the Python heap still allocated once the stub
+conversation storage has been emptied, i.e. what the checkpointer keeps.
+
+Usage:
+    $ python benchmarks/bench_checkpointer_memory.py --chats 10000
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from stubs import build_stub_agent
+from checkpointing import BoundedMemorySaver
+
+
+def make_checkpointer(backend: str, max_threads: int):
+    if backend == "none":
+        return None
+    if backend == "unbounded":
+        return InMemorySaver()
+    return BoundedMemorySaver(max_threads=max_threads)
+
+
+async def run_backend(backend: str, chats: int, tokens: int, max_threads: int) -> None:
+    agent = build_stub_agent(tokens_per_reply=tokens)
+    agent.checkpointer = make_checkpointer(backend, max_threads)
+    agent.graph = agent._build_graph()
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for i in range(chats):
+        async for _ in agent.query(query_text=f"question {i}", chat_id=f"chat-{i}"):
+            pass
+    elapsed = time.perf_counter() - start
+
+    agent.conversation_store._messages.clear()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    if agent.checkpointer is not None:
+        # Guards against turns bypassing the graph, which would leave nothing to measure
+        threads = len(agent.checkpointer.storage)
+        assert threads > 0, f"{backend} checkpointer holds no threads after {chats} chats"
+    stats = agent.checkpointer.stats() if hasattr(agent.checkpointer, "stats") else {}
+    print(f"{backend:>10}: retained={retained / 1024 / 1024:8.2f} MiB  "
+          f"per-chat={retained / chats:8.0f} B  elapsed={elapsed:6.2f}s  {stats}")
+
+
+async def main(backends, chats: int, tokens: int, max_threads: int) -> None:
+    print(f"chats={chats} tokens/reply={tokens} max_threads={max_threads}")
+    for backend in backends:
+        await run_backend(backend, chats, tokens, max_threads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=10000, help="number of simulated chats")
+    parser.add_argument("--tokens", type=int, default=20, help="tokens streamed per reply")
+    parser.add_argument("--max-threads", type=int, default=1000, help="thread cap of the bounded saver")
+    parser.add_argument("--backends", nargs="+", default=["none", "unbounded", "memory"],
+                        choices=["none", "unbounded", "memory"], help="checkpointers to compare")
+    args = parser.parse_args()
+    asyncio.run(main(args.backends, args.chats, args.tokens, args.max_threads))
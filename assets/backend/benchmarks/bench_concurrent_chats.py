@@ -0,0 +1,62 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Drive N simultaneous chats through one ChatAgent against a stub LLM.
+
+Verifies that every chat receives only its own tokens and reports the
+aggregate token throughput of the shared agent.
+
+Usage:
+    $ python benchmarks/bench_concurrent_chats.py --chats 64 --tokens 200
+"""
+import argparse
+import asyncio
+import time
+
+from stubs import build_stub_agent
+
+
+async def run_chat(agent, chat_id: str) -> int:
+    """Run one turn and return the number of tokens received for it."""
+    tokens = 0
+    async for event in agent.query(query_text=chat_id, chat_id=chat_id):
+        if isinstance(event, dict) and event.get("type") == "token":
+            assert event["data"].startswith(f"<{chat_id}:"), f"{chat_id} received foreign token {event['data']!r}"
+            tokens += 1
+    return tokens
+
+
+async def main(chats: int, tokens: int, token_delay: float) -> None:
+    agent = build_stub_agent(tokens_per_reply=tokens, token_delay=token_delay)
+    chat_ids = [f"chat-{i}" for i in range(chats)]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_chat(agent, chat_id) for chat_id in chat_ids))
+    elapsed = time.perf_counter() - start
+
+    assert all(count == tokens for count in results), f"token counts differ from {tokens}: {results}"
+    total = sum(results)
+    print(f"chats={chats} tokens/chat={tokens} elapsed={elapsed:.3f}s")
+    print(f"aggregate throughput: {total / elapsed:,.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=32, help="number of simultaneous chats")
+    parser.add_argument("--tokens", type=int, default=100, help="tokens streamed per reply")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between stub tokens")
+    args = parser.parse_args()
+    asyncio.run(main(args.chats, args.tokens, args.token_delay))
@@ -0,0 +1,152 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Write cost of saving a turn: whole-conversation JSONB upsert versus per-message rows.
+
+For each history size, a chat is prefilled with that many messages and then
+grows by one turn (a user and an assistant message) at a time. The legacy
+strategy upserts the whole conversation as one JSONB array into a scratch
+table, the append strategy saves through PostgreSQLConversationStorage.
+Reported per turn: latency, WAL bytes generated and bytes sent to the server.
+
+Requires a PostgreSQL server (10+); the benchmark works in its own database,
+which it creates if needed.
+
+Usage:
+    $ python benchmarks/bench_conversation_writes.py --host localhost --sizes 10 100 1000 --turns 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from postgres_storage import PostgreSQLConversationStorage
+
+
+def make_messages(start: int, count: int, chars: int) -> list:
+    filler = ("lorem ipsum dolor sit amet " * (chars // 27 + 1))[:chars]
+    return [
+        HumanMessage(content=f"question {i}: {filler}") if i % 2 == 0 else AIMessage(content=f"answer {i}: {filler}")
+        for i in range(start, start + count)
+    ]
+
+
+async def wal_lsn(conn) -> str:
+    return await conn.fetchval("SELECT pg_current_wal_lsn()::text")
+
+
+async def wal_bytes_since(conn, lsn: str) -> int:
+    return int(await conn.fetchval("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), $1::pg_lsn)", lsn))
+
+
+async def run_legacy(storage: PostgreSQLConversationStorage, size: int, turns: int, chars: int) -> dict:
+    chat_id = f"bench-legacy-{size}"
+    messages = make_messages(0, size, chars)
+    durations, wal, sent = [], [], []
+    async with storage.pool.acquire() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS bench_legacy_conversations (
+                chat_id VARCHAR(255) PRIMARY KEY,
+                messages JSONB NOT NULL,
+                message_count INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        await conn.execute("DELETE FROM bench_legacy_conversations WHERE chat_id = $1", chat_id)
+
+        async def save() -> int:
+            payload = json.dumps([storage._message_to_dict(message) for message in messages])
+            await conn.execute("""
+                INSERT INTO bench_legacy_conversations (chat_id, messages, message_count)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (chat_id)
+                DO UPDATE SET
+                    messages = EXCLUDED.messages,
+                    message_count = EXCLUDED.message_count,
+                    updated_at = CURRENT_TIMESTAMP
+            """, chat_id, payload, len(messages))
+            return len(payload.encode())
+
+        await save()
+        for turn in range(turns):
+            messages.extend(make_messages(size + 2 * turn, 2, chars))
+            lsn = await wal_lsn(conn)
+            start = time.perf_counter()
+            sent.append(await save())
+            durations.append((time.perf_counter() - start) * 1000)
+            wal.append(await wal_bytes_since(conn, lsn))
+        await conn.execute("DELETE FROM bench_legacy_conversations WHERE chat_id = $1", chat_id)
+    return {"durations": durations, "wal": wal, "sent": sent}
+
+
+async def run_append(storage: PostgreSQLConversationStorage, size: int, turns: int, chars: int) -> dict:
+    chat_id = f"bench-append-{size}"
+    await storage.delete_conversation(chat_id)
+    messages = make_messages(0, size, chars)
+    await storage.save_messages_immediate(chat_id, messages)
+    durations, wal, sent = [], [], []
+    async with storage.pool.acquire() as conn:
+        for turn in range(turns):
+            new_messages = make_messages(size + 2 * turn, 2, chars)
+            messages = messages + new_messages
+            lsn = await wal_lsn(conn)
+            start = time.perf_counter()
+            await storage.save_messages_immediate(chat_id, messages)
+            durations.append((time.perf_counter() - start) * 1000)
+            wal.append(await wal_bytes_since(conn, lsn))
+            sent.append(sum(len(json.dumps(storage._message_to_dict(message)).encode()) for message in new_messages))
+    await storage.delete_conversation(chat_id)
+    return {"durations": durations, "wal": wal, "sent": sent}
+
+
+async def main(args: argparse.Namespace) -> None:
+    storage = PostgreSQLConversationStorage(
+        host=args.host, port=args.port, database=args.database, user=args.user, password=args.password
+    )
+    await storage.init_pool()
+    try:
+        print(f"turns={args.turns} message_chars={args.message_chars}")
+        print(f"{'history':>8} {'strategy':>8} {'mean ms':>9} {'p50 ms':>8} {'WAL B/turn':>11} {'sent B/turn':>12}")
+        for size in args.sizes:
+            for label, run in (("legacy", run_legacy), ("append", run_append)):
+                result = await run(storage, size, args.turns, args.message_chars)
+                print(f"{size:>8} {label:>8} {statistics.mean(result['durations']):>9.2f} "
+                      f"{statistics.median(result['durations']):>8.2f} {statistics.mean(result['wal']):>11.0f} "
+                      f"{statistics.mean(result['sent']):>12.0f}")
+    finally:
+        await storage.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("POSTGRES_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("POSTGRES_PORT", 5432)))
+    parser.add_argument("--database", default="chatbot_bench", help="scratch database, created if missing")
+    parser.add_argument("--user", default=os.getenv("POSTGRES_USER", "chatbot_user"))
+    parser.add_argument("--password", default=os.getenv("POSTGRES_PASSWORD", "chatbot_password"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="messages per chat before the measured turns")
+    parser.add_argument("--turns", type=int, default=20, help="measured turns per size and strategy")
+    parser.add_argument("--message-chars", type=int, default=400, help="characters per message")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,68 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Per-turn overhead of the LangGraph path versus the direct fast path.
+
+Runs the same tool-less turns against an unthrottled stub LLM with the fast
+path disabled and enabled, so that the difference is the cost of the graph,
+its checkpointer and state handling.
+
+Usage:
+    $ python benchmarks/bench_fast_path.py --turns 500 --tokens 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from stubs import build_stub_agent
+
+
+async def measure(fast_path: bool, turns: int, tokens: int, history: int) -> list:
+    agent = build_stub_agent(tokens_per_reply=tokens)
+    agent.fast_path = fast_path
+    durations = []
+    for i in range(turns):
+        chat_id = f"chat-{i % history}" if history else f"chat-{i}"
+        start = time.perf_counter()
+        async for _ in agent.query(query_text=f"turn {i}", chat_id=chat_id):
+            pass
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+async def main(turns: int, tokens: int, history: int, warmup: int) -> None:
+    print(f"turns={turns} tokens/reply={tokens} chats={history or turns}")
+    results = {}
+    for label, fast_path in (("graph", False), ("fast path", True)):
+        await measure(fast_path, warmup, tokens, history)
+        durations = await measure(fast_path, turns, tokens, history)
+        results[label] = statistics.mean(durations)
+        ordered = sorted(durations)
+        print(f"{label:>10}: mean={results[label]:.3f} ms  p50={ordered[len(ordered) // 2]:.3f} ms  "
+              f"p99={ordered[int(len(ordered) * 0.99) - 1]:.3f} ms")
+    saved = results["graph"] - results["fast path"]
+    print(f"overhead saved per turn: {saved:.3f} ms ({saved / results['graph'] * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=500, help="measured turns per path")
+    parser.add_argument("--tokens", type=int, default=20, help="tokens streamed per reply")
+    parser.add_argument("--chats", type=int, default=50, help="distinct chats the turns rotate over (0 = one chat per turn)")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured turns per path")
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.tokens, args.chats, args.warmup))
@@ -0,0 +1,84 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Microbenchmark for LangGraph -> OpenAI message conversion on long histories.
+
+Simulates the generate/tool loop: each iteration appends an AI tool call and
+its ToolMessage, then converts the whole history again. Compares converting
+every message from scratch with the memoized converter in utils.
+
+Usage:
+    $ python benchmarks/bench_message_conversion.py --messages 500 --iterations 6
+"""
+import argparse
+import time
+
+import stubs  # noqa: F401 - puts the backend on sys.path
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from utils import _convert_message_to_openai, convert_langgraph_messages_to_openai
+
+
+def build_history(size: int) -> list:
+    """Build a history of user turns, tool calls and tool results."""
+    history = []
+    for i in range(size // 4):
+        call_id = f"call_{i}"
+        history.append(HumanMessage(content=f"Question {i}: " + "lorem ipsum " * 20))
+        history.append(AIMessage(content="", tool_calls=[{
+            "name": "search_documents",
+            "args": {"query": f"query {i}", "filters": {"sources": ["a.pdf", "b.pdf"], "k": 8}},
+            "id": call_id,
+        }]))
+        history.append(ToolMessage(content="result " * 100, tool_call_id=call_id, name="search_documents"))
+        history.append(AIMessage(content="answer " * 60))
+    return history
+
+
+def uncached(messages: list) -> list:
+    return [converted for converted in map(_convert_message_to_openai, messages) if converted is not None]
+
+
+def run(convert, history: list, iterations: int) -> float:
+    messages = list(history)
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_id = f"iter_{i}"
+        messages.append(AIMessage(content="", tool_calls=[{"name": "get_weather", "args": {"location": "SF"}, "id": call_id}]))
+        messages.append(ToolMessage(content="sunny", tool_call_id=call_id, name="get_weather"))
+        convert(messages)
+    return time.perf_counter() - start
+
+
+def main(size: int, iterations: int, repeats: int) -> None:
+    history = build_history(size)
+    assert uncached(history) == convert_langgraph_messages_to_openai(history)
+
+    baseline = min(run(uncached, history, iterations) for _ in range(repeats))
+    memoized = min(run(convert_langgraph_messages_to_openai, history, iterations) for _ in range(repeats))
+
+    print(f"history={len(history)} messages, {iterations} iterations per turn, best of {repeats}")
+    print(f"full conversion:     {baseline * 1000:8.2f} ms/turn")
+    print(f"memoized conversion: {memoized * 1000:8.2f} ms/turn  ({baseline / memoized:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500, help="history length")
+    parser.add_argument("--iterations", type=int, default=6, help="generate iterations per turn")
+    parser.add_argument("--repeats", type=int, default=5, help="repetitions; the best run is reported")
+    args = parser.parse_args()
+    main(args.messages, args.iterations, args.repeats)
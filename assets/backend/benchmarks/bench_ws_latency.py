@@ -0,0 +1,108 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""End-to-end latency of chat turns over ``/ws/chat/{chat_id}``.
+
+Drives a running backend, typically one pointed at benchmarks/stub_openai_server.py
+through OPENAI_BASE_URL, and reports p50/p95/p99 of time to first token,
+inter-token latency and full turn latency (message sent until the
+``history_delta`` event that ends the turn).
+
+Usage:
+    $ python benchmarks/stub_openai_server.py --ttft-ms 200 --tokens-per-second 50 &
+    $ python benchmarks/bench_ws_latency.py --url ws://localhost:8000 --chats 8 --turns 5
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, List
+
+import websockets
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+# Events that end a turn: the delta, or the full history sent when the delta cannot apply
+TURN_END_EVENTS = ("history_delta", "history")
+
+
+async def run_chat(url: str, stream_mode: str, turns: int, message: str, timeout: float, samples: Dict[str, List[float]]) -> None:
+    chat_id = str(uuid.uuid4())
+    async with websockets.connect(f"{url}/ws/chat/{chat_id}?stream_mode={stream_mode}", max_size=None) as ws:
+        json.loads(await asyncio.wait_for(ws.recv(), timeout))  # initial history
+
+        for turn in range(turns):
+            sent = time.perf_counter()
+            await ws.send(json.dumps({"message": f"{message} ({turn})"}))
+            first_token = last_token = None
+
+            while True:
+                try:
+                    event = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                except asyncio.TimeoutError:
+                    # The turn never ended; the rest of this chat's turns would be out of step
+                    samples["errors"].append(1)
+                    return
+                now = time.perf_counter()
+                if not isinstance(event, dict):
+                    continue
+                if event.get("type") == "token":
+                    if first_token is None:
+                        first_token = now
+                        samples["ttft"].append(now - sent)
+                    else:
+                        samples["inter_token"].append(now - last_token)
+                    last_token = now
+                elif event.get("type") == "error":
+                    samples["errors"].append(1)
+                elif event.get("type") in TURN_END_EVENTS:
+                    samples["turn"].append(now - sent)
+                    break
+
+
+async def main(args) -> None:
+    samples: Dict[str, List[float]] = {"ttft": [], "inter_token": [], "turn": [], "errors": []}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_chat(args.url, args.stream_mode, args.turns, args.message, args.timeout, samples) for _ in range(args.chats)
+    ))
+    elapsed = time.perf_counter() - start
+
+    print(f"chats={args.chats} turns/chat={args.turns} stream_mode={args.stream_mode} elapsed={elapsed:.2f}s errors={len(samples['errors'])}")
+    print(f"{'metric':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in ("ttft", "inter_token", "turn"):
+        values = samples[name]
+        print(f"{name:<14}{len(values):>8}" + "".join(f"{percentile(values, p) * 1000:>10.1f}" for p in (50, 95, 99)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8000", help="backend WebSocket base URL")
+    parser.add_argument("--chats", type=int, default=4, help="concurrent chat connections")
+    parser.add_argument("--turns", type=int, default=5, help="turns per chat")
+    parser.add_argument("--message", default="Tell me a story", help="user message; include a scripted keyword to trigger tool calls")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for each event before failing the chat")
+    parser.add_argument("--stream-mode", default="token", choices=["token", "coalesced"])
+    asyncio.run(main(parser.parse_args()))
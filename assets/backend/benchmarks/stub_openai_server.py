@@ -0,0 +1,210 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Local OpenAI-compatible stand-in for measuring the backend's own overhead.
+
+Serves ``/v1/chat/completions`` (streaming and non-streaming, including tool
+calls), ``/v1/embeddings`` and ``/v1/models`` with a configurable time to first
+token and token rate. Point the backend and MCP servers at it through
+OPENAI_BASE_URL.
+
+Tool calls are scripted with a JSON file holding a list of rules such as
+``{"match": "weather", "tool": "get_weather", "arguments": {"location": "Paris"}}``.
+When the latest user message contains ``match`` (case-insensitive) and the
+request offers ``tool``, the stub streams that tool call. After the tool
+result arrives it streams a plain answer.
+
+Usage:
+    $ python benchmarks/stub_openai_server.py --port 9100 --ttft-ms 250 --tokens-per-second 50
+    $ OPENAI_BASE_URL=http://localhost:9100/v1 OPENAI_API_KEY=stub uvicorn main:app --port 8000
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def _reply_tokens(settings: SimpleNamespace, messages: List[Dict[str, Any]], rule: Optional[Dict[str, Any]]) -> List[str]:
+    """Build the token sequence of a plain-text answer."""
+    last = messages[-1] if messages else {}
+    if last.get("role") == "tool":
+        text = (rule or {}).get("reply") or f"Based on the tool result: {str(last.get('content', ''))[:200]}"
+        words = text.split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+    return [f"token{i} " for i in range(settings.reply_tokens)]
+
+
+def _match_rule(settings: SimpleNamespace, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Return the script rule for the latest user message, if any."""
+    user_text = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "") or ""
+    if isinstance(user_text, list):
+        user_text = " ".join(part.get("text", "") for part in user_text if isinstance(part, dict))
+    offered = {tool.get("function", {}).get("name") for tool in tools or []}
+    for rule in settings.script:
+        if rule.get("match", "").lower() in user_text.lower() and (not rule.get("tool") or rule["tool"] in offered):
+            return rule
+    return None
+
+
+def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_app(settings: SimpleNamespace) -> FastAPI:
+    app = FastAPI(title="Stub OpenAI-compatible server")
+
+    async def first_token_delay() -> None:
+        jitter = random.uniform(-settings.ttft_jitter_ms, settings.ttft_jitter_ms) if settings.ttft_jitter_ms else 0
+        await asyncio.sleep(max(0.0, settings.ttft_ms + jitter) / 1000)
+
+    async def token_delay() -> None:
+        if settings.tokens_per_second > 0:
+            await asyncio.sleep(1 / settings.tokens_per_second)
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": name, "object": "model", "owned_by": "stub"} for name in settings.models]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        messages = body.get("messages", [])
+        rule = _match_rule(settings, messages, body.get("tools"))
+        wants_tool_call = rule is not None and rule.get("tool") and messages and messages[-1].get("role") == "user"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if not body.get("stream"):
+            await first_token_delay()
+            if wants_tool_call:
+                message = {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {"name": rule["tool"], "arguments": json.dumps(rule.get("arguments", {}))},
+                    }],
+                }
+                finish_reason = "tool_calls"
+            else:
+                tokens = _reply_tokens(settings, messages, rule)
+                if settings.tokens_per_second > 0:
+                    await asyncio.sleep(len(tokens) / settings.tokens_per_second)
+                message = {"role": "assistant", "content": "".join(tokens)}
+                finish_reason = "stop"
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+
+        async def stream():
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            await first_token_delay()
+            if wants_tool_call:
+                arguments = json.dumps(rule.get("arguments", {}))
+                pieces = [arguments[i:i + 8] for i in range(0, len(arguments), 8)] or [""]
+                call_id = f"call_{uuid.uuid4().hex[:12]}"
+                yield _chunk(completion_id, model, {"tool_calls": [{
+                    "index": 0, "id": call_id, "type": "function",
+                    "function": {"name": rule["tool"], "arguments": ""},
+                }]})
+                for piece in pieces:
+                    await token_delay()
+                    yield _chunk(completion_id, model, {"tool_calls": [{"index": 0, "function": {"arguments": piece}}]})
+                yield _chunk(completion_id, model, {}, "tool_calls")
+            else:
+                for i, token in enumerate(_reply_tokens(settings, messages, rule)):
+                    if i:
+                        await token_delay()
+                    yield _chunk(completion_id, model, {"content": token})
+                yield _chunk(completion_id, model, {}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or settings.embedding_dim
+        if settings.embedding_latency_ms:
+            await asyncio.sleep(settings.embedding_latency_ms / 1000)
+
+        data = []
+        for index, item in enumerate(inputs):
+            seed = int.from_bytes(hashlib.sha256(json.dumps(item).encode()).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "stub-embedding"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--ttft-ms", type=float, default=200, help="delay before the first token")
+    parser.add_argument("--ttft-jitter-ms", type=float, default=0, help="uniform +/- jitter added to the TTFT")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="token rate after the first token (0 = unthrottled)")
+    parser.add_argument("--reply-tokens", type=int, default=64, help="tokens in a plain answer")
+    parser.add_argument("--embedding-dim", type=int, default=3072, help="embedding size when the request sets no dimensions")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0)
+    parser.add_argument("--models", nargs="+", default=["gpt-oss-20b", "gpt-oss-120b"], help="model ids listed by /v1/models")
+    parser.add_argument("--script", help="JSON file with scripted tool-call rules")
+    args = parser.parse_args()
+
+    script = []
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    settings = SimpleNamespace(**{**vars(args), "script": script})
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
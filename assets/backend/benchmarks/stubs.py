@@ -0,0 +1,130 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""In-process stand-ins used by the backend benchmarks.
+
+These stubs let a real ChatAgent run without an LLM endpoint, PostgreSQL or
+MCP servers so that the benchmarks measure only the backend's own overhead.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from langchain_core.messages import BaseMessage
+
+from agent import ChatAgent
+
+
+STUB_MODEL = "gpt-stub"
+
+
+def _chunk(content: Optional[str] = None, tool_calls: Optional[List[Any]] = None, finish_reason: Optional[str] = None):
+    """Build an object shaped like an OpenAI streaming chunk."""
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+
+class StubCompletions:
+    """Streams a deterministic reply derived from the last user message.
+
+    Every token is prefixed with the last user message so a consumer can
+    verify that it only received tokens generated for its own chat.
+    """
+
+    def __init__(self, tokens_per_reply: int = 50, token_delay: float = 0.0):
+        self.tokens_per_reply = tokens_per_reply
+        self.token_delay = token_delay
+        self.requests = 0
+
+    async def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, **kwargs):
+        self.requests += 1
+        tag = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        return self._stream(tag)
+
+    async def _stream(self, tag: str):
+        for i in range(self.tokens_per_reply):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            else:
+                await asyncio.sleep(0)
+            yield _chunk(content=f"<{tag}:{i}>")
+        yield _chunk(finish_reason="stop")
+
+
+class StubModelClient:
+    """Minimal AsyncOpenAI look-alike exposing ``chat.completions.create``."""
+
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=StubCompletions(**kwargs))
+
+
+class InMemoryConversationStorage:
+    """Dict-backed replacement for PostgreSQLConversationStorage."""
+
+    def __init__(self):
+        self._messages: Dict[str, List[BaseMessage]] = {}
+
+    async def get_messages(self, chat_id: str, limit: Optional[int] = None) -> List[BaseMessage]:
+        messages = self._messages.get(chat_id, [])
+        return messages[-limit:] if limit else list(messages)
+
+    async def save_messages(self, chat_id: str, messages: List[BaseMessage]) -> None:
+        self._messages[chat_id] = list(messages)
+
+
+class StubConfigManager:
+    """ConfigManager replacement with a single fixed model and no sources."""
+
+    def __init__(self, model: str = STUB_MODEL):
+        self.model = model
+
+    def read_config(self):
+        return SimpleNamespace(sources=[], selected_sources=[], models=[self.model], selected_model=self.model)
+
+    def get_selected_model(self) -> str:
+        return self.model
+
+    def get_available_models(self) -> List[str]:
+        return [self.model]
+
+    def get_selected_sources(self) -> List[str]:
+        return []
+
+
+def build_stub_agent(tokens_per_reply: int = 50, token_delay: float = 0.0, fast_path: bool = False) -> ChatAgent:
+    """Create a ChatAgent wired to the in-process stubs, with no MCP tools.
+
+    The agent has no tools, so with the fast path enabled it would bypass the
+    graph and the checkpointer entirely; it is off unless a benchmark asks for it.
+    """
+    agent = ChatAgent(
+        vector_store=None,
+        config_manager=StubConfigManager(),
+        postgres_storage=InMemoryConversationStorage(),
+    )
+    agent.tools_by_name = {}
+    agent.openai_tools = []
+    agent.system_prompt = "You are a benchmark assistant."
+    agent.current_model = STUB_MODEL
+    agent.model_client = StubModelClient(tokens_per_reply=tokens_per_reply, token_delay=token_delay)
+    agent.fast_path = fast_path
+    return agent
@@ -0,0 +1,171 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Size-aware LRU cache with TTL expiry shared by the backend's in-process caches."""
+
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by a cached value in bytes.
+
+    Strings and bytes are measured exactly; containers are summed one level deep,
+    which is sufficient for the JSON-like values kept in the backend caches.
+    """
+    if isinstance(value, (str, bytes, bytearray)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by total bytes, with per-entry TTL.
+
+    Expired entries are removed when read and by ``purge_expired``; the least
+    recently used entries are evicted whenever an insert exceeds ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        default_ttl: Optional[float] = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+        name: str = "cache"
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Byte budget for all entries; 0 or less disables caching
+            default_ttl: Seconds an entry stays valid, None for no expiry
+            sizeof: Function estimating the size of a value in bytes
+            name: Label used in statistics
+        """
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sizeof = sizeof
+        self.name = name
+
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._is_expired(entry)
+
+    def keys(self) -> Iterator[Hashable]:
+        """Iterate over a snapshot of the cached keys, least recently used first."""
+        return iter(list(self._entries))
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
+
+    @staticmethod
+    def _is_expired(entry: Tuple[Any, Optional[float], int]) -> bool:
+        expires_at = entry[1]
+        return expires_at is not None and time.monotonic() >= expires_at
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value and mark it as recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if self._is_expired(entry):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> None:
+        """Insert or replace a value, evicting least recently used entries to stay within budget.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Seconds until expiry, defaults to ``default_ttl``
+            size: Size of the value in bytes, estimated when omitted
+        """
+        if key in self._entries:
+            self._remove(key)
+
+        size = self.sizeof(value) if size is None else size
+        if self.max_bytes <= 0 or size > self.max_bytes:
+            return
+
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry[0]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def purge_expired(self) -> int:
+        """Remove all expired entries and return how many were dropped."""
+        expired = [key for key, entry in self._entries.items() if self._is_expired(entry)]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Return usage and effectiveness counters."""
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "bytes_used": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,407 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Bounded LangGraph checkpointers for the chat agent.
+
+The backend selected by CHECKPOINTER_BACKEND is one of:
+- ``none``: no checkpointing; every query already carries the full conversation state
+- ``memory``: in-process store with LRU/TTL eviction of threads and a per-thread checkpoint cap
+- ``postgres``: checkpoints stored through the PostgreSQLConversationStorage connection pool
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from logger import logger
+
+
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "memory").lower()
+CHECKPOINTER_MAX_THREADS = int(os.getenv("CHECKPOINTER_MAX_THREADS", "1000"))
+CHECKPOINTER_TTL = float(os.getenv("CHECKPOINTER_TTL", "3600"))
+# Each query rebuilds the state from conversation storage, so only the latest checkpoint and its parent are read
+CHECKPOINTER_MAX_CHECKPOINTS_PER_THREAD = int(os.getenv("CHECKPOINTER_MAX_CHECKPOINTS_PER_THREAD", "2"))
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """InMemorySaver that bounds how many threads and checkpoints it retains.
+
+    Threads are evicted least-recently-used first once ``max_threads`` is exceeded
+    or when idle for longer than ``ttl`` seconds. Within a thread only the newest
+    ``max_checkpoints_per_thread`` checkpoints and the blobs they reference are kept.
+    The writes and blobs of a thread are located through its retained checkpoints,
+    so apart from the LRU order no per-thread bookkeeping is stored.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = CHECKPOINTER_MAX_THREADS,
+        ttl: Optional[float] = CHECKPOINTER_TTL,
+        max_checkpoints_per_thread: int = CHECKPOINTER_MAX_CHECKPOINTS_PER_THREAD
+    ):
+        """Initialize the bounded saver.
+
+        Args:
+            max_threads: Maximum number of threads retained
+            ttl: Seconds a thread may stay idle before eviction, None or 0 to disable
+            max_checkpoints_per_thread: Newest checkpoints kept per thread (at least 2)
+        """
+        super().__init__()
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.max_checkpoints_per_thread = max(2, max_checkpoints_per_thread)
+        self.evictions = 0
+
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        # The parent implementation indexes a defaultdict, which would recreate evicted threads
+        if config["configurable"]["thread_id"] not in self.storage:
+            return None
+        return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        self._prune_checkpoints(thread_id, config["configurable"]["checkpoint_ns"])
+        self._touch(thread_id)
+        self._evict()
+        return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        super().put_writes(config, writes, task_id, task_path)
+        self._touch(config["configurable"]["thread_id"])
+
+    def delete_thread(self, thread_id: str) -> None:
+        # Writes and blobs are keyed by checkpoints of the thread, avoiding the parent's full scans
+        for checkpoint_ns, checkpoints in (self.storage.pop(thread_id, None) or {}).items():
+            for checkpoint_id, (saved_checkpoint, _, _) in checkpoints.items():
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+                for key in self._referenced_blobs(thread_id, checkpoint_ns, saved_checkpoint):
+                    self.blobs.pop(key, None)
+        self._last_used.pop(thread_id, None)
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_used[thread_id] = time.monotonic()
+        self._last_used.move_to_end(thread_id)
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.ttl if self.ttl else None
+        while self._last_used:
+            thread_id, last_used = next(iter(self._last_used.items()))
+            if len(self._last_used) <= self.max_threads and (cutoff is None or last_used >= cutoff):
+                break
+            self.delete_thread(thread_id)
+            self.evictions += 1
+
+    def _referenced_blobs(self, thread_id: str, checkpoint_ns: str, saved_checkpoint: Tuple[str, bytes]) -> Set[Tuple]:
+        """Keys of the blobs holding the channel values of a stored checkpoint."""
+        channel_versions = self.serde.loads_typed(saved_checkpoint)["channel_versions"]
+        return {(thread_id, checkpoint_ns, k, v) for k, v in channel_versions.items()}
+
+    def _prune_checkpoints(self, thread_id: str, checkpoint_ns: str) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.max_checkpoints_per_thread:
+            return
+
+        candidates = set()
+        for checkpoint_id in sorted(checkpoints)[:-self.max_checkpoints_per_thread]:
+            saved_checkpoint, _, _ = checkpoints.pop(checkpoint_id)
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            candidates |= self._referenced_blobs(thread_id, checkpoint_ns, saved_checkpoint)
+
+        # Unchanged channels of the retained checkpoints still point at older blob versions
+        for saved_checkpoint, _, _ in checkpoints.values():
+            candidates -= self._referenced_blobs(thread_id, checkpoint_ns, saved_checkpoint)
+        for key in candidates:
+            self.blobs.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "threads": len(self._last_used),
+            "max_threads": self.max_threads,
+            "max_checkpoints_per_thread": self.max_checkpoints_per_thread,
+            "blobs": len(self.blobs),
+            "evictions": self.evictions,
+        }
+
+
+class PostgresCheckpointSaver(BaseCheckpointSaver):
+    """Async checkpointer persisting graph state through the conversation storage pool.
+
+    Each checkpoint is stored whole (including channel values) and only the newest
+    ``max_checkpoints_per_thread`` checkpoints of a thread are retained. Only the
+    async interface is implemented, which is all the agent's ``astream`` uses.
+    """
+
+    def __init__(self, storage, max_checkpoints_per_thread: int = CHECKPOINTER_MAX_CHECKPOINTS_PER_THREAD):
+        """Initialize the saver.
+
+        Args:
+            storage: PostgreSQLConversationStorage whose pool is reused
+            max_checkpoints_per_thread: Newest checkpoints kept per thread (at least 2)
+        """
+        super().__init__()
+        self.storage = storage
+        self.max_checkpoints_per_thread = max(2, max_checkpoints_per_thread)
+
+    async def setup(self) -> None:
+        """Create the checkpoint tables if they don't exist."""
+        async with self.storage.pool.acquire() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS graph_checkpoints (
+                    thread_id VARCHAR(255) NOT NULL,
+                    checkpoint_ns VARCHAR(255) NOT NULL DEFAULT '',
+                    checkpoint_id VARCHAR(255) NOT NULL,
+                    parent_checkpoint_id VARCHAR(255),
+                    checkpoint_type VARCHAR(64) NOT NULL,
+                    checkpoint BYTEA NOT NULL,
+                    metadata_type VARCHAR(64) NOT NULL,
+                    metadata BYTEA NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS graph_checkpoint_writes (
+                    thread_id VARCHAR(255) NOT NULL,
+                    checkpoint_ns VARCHAR(255) NOT NULL DEFAULT '',
+                    checkpoint_id VARCHAR(255) NOT NULL,
+                    task_id VARCHAR(255) NOT NULL,
+                    idx INTEGER NOT NULL,
+                    channel VARCHAR(255) NOT NULL,
+                    value_type VARCHAR(64) NOT NULL,
+                    value BYTEA NOT NULL,
+                    task_path TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                )
+            """)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        async with self.storage.pool.acquire() as conn:
+            if checkpoint_id:
+                row = await conn.fetchrow("""
+                    SELECT * FROM graph_checkpoints
+                    WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+                """, thread_id, checkpoint_ns, checkpoint_id)
+            else:
+                row = await conn.fetchrow("""
+                    SELECT * FROM graph_checkpoints
+                    WHERE thread_id = $1 AND checkpoint_ns = $2
+                    ORDER BY checkpoint_id DESC LIMIT 1
+                """, thread_id, checkpoint_ns)
+            if not row:
+                return None
+            return await self._row_to_tuple(conn, row)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        clauses, args = [], []
+        if config:
+            args.append(config["configurable"]["thread_id"])
+            clauses.append(f"thread_id = ${len(args)}")
+            if "checkpoint_ns" in config["configurable"]:
+                args.append(config["configurable"]["checkpoint_ns"])
+                clauses.append(f"checkpoint_ns = ${len(args)}")
+        if before and get_checkpoint_id(before):
+            args.append(get_checkpoint_id(before))
+            clauses.append(f"checkpoint_id < ${len(args)}")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        async with self.storage.pool.acquire() as conn:
+            rows = await conn.fetch(f"SELECT * FROM graph_checkpoints {where} ORDER BY checkpoint_id DESC", *args)
+            yielded = 0
+            for row in rows:
+                if limit is not None and yielded >= limit:
+                    break
+                checkpoint_tuple = await self._row_to_tuple(conn, row)
+                if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+                    continue
+                yielded += 1
+                yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        async with self.storage.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                    INSERT INTO graph_checkpoints
+                        (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                         checkpoint_type, checkpoint, metadata_type, metadata)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                    ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id)
+                    DO UPDATE SET
+                        checkpoint_type = EXCLUDED.checkpoint_type,
+                        checkpoint = EXCLUDED.checkpoint,
+                        metadata_type = EXCLUDED.metadata_type,
+                        metadata = EXCLUDED.metadata
+                """, thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                    checkpoint_type, checkpoint_blob, metadata_type, metadata_blob)
+
+                oldest_kept = await conn.fetchval("""
+                    SELECT checkpoint_id FROM graph_checkpoints
+                    WHERE thread_id = $1 AND checkpoint_ns = $2
+                    ORDER BY checkpoint_id DESC OFFSET $3 LIMIT 1
+                """, thread_id, checkpoint_ns, self.max_checkpoints_per_thread - 1)
+                if oldest_kept:
+                    for table in ("graph_checkpoints", "graph_checkpoint_writes"):
+                        await conn.execute(f"""
+                            DELETE FROM {table}
+                            WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id < $3
+                        """, thread_id, checkpoint_ns, oldest_kept)
+            self.storage._db_operations += 1
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, value_type, value_blob, task_path))
+
+        async with self.storage.pool.acquire() as conn:
+            # Regular writes are idempotent; special writes (negative idx) replace earlier ones
+            await conn.executemany("""
+                INSERT INTO graph_checkpoint_writes
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                DO UPDATE SET
+                    channel = EXCLUDED.channel,
+                    value_type = EXCLUDED.value_type,
+                    value = EXCLUDED.value
+                WHERE graph_checkpoint_writes.idx < 0
+            """, rows)
+            self.storage._db_operations += 1
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self.storage.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM graph_checkpoint_writes WHERE thread_id = $1", thread_id)
+                await conn.execute("DELETE FROM graph_checkpoints WHERE thread_id = $1", thread_id)
+            self.storage._db_operations += 1
+
+    async def _row_to_tuple(self, conn, row) -> CheckpointTuple:
+        writes = await conn.fetch("""
+            SELECT task_id, channel, value_type, value FROM graph_checkpoint_writes
+            WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = $3
+            ORDER BY task_id, idx
+        """, row["thread_id"], row["checkpoint_ns"], row["checkpoint_id"])
+        configurable = {
+            "thread_id": row["thread_id"],
+            "checkpoint_ns": row["checkpoint_ns"],
+        }
+        return CheckpointTuple(
+            config={"configurable": {**configurable, "checkpoint_id": row["checkpoint_id"]}},
+            checkpoint=self.serde.loads_typed((row["checkpoint_type"], bytes(row["checkpoint"]))),
+            metadata=self.serde.loads_typed((row["metadata_type"], bytes(row["metadata"]))),
+            pending_writes=[
+                (w["task_id"], w["channel"], self.serde.loads_typed((w["value_type"], bytes(w["value"]))))
+                for w in writes
+            ],
+            parent_config=(
+                {"configurable": {**configurable, "checkpoint_id": row["parent_checkpoint_id"]}}
+                if row["parent_checkpoint_id"]
+                else None
+            ),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "postgres", "max_checkpoints_per_thread": self.max_checkpoints_per_thread}
+
+
+def create_checkpointer(postgres_storage=None, backend: str = CHECKPOINTER_BACKEND) -> Optional[BaseCheckpointSaver]:
+    """Create the checkpointer selected by CHECKPOINTER_BACKEND.
+
+    Args:
+        postgres_storage: Conversation storage whose pool backs the postgres checkpointer
+        backend: One of "none", "memory" or "postgres"
+
+    Returns:
+        Checkpoint saver, or None when checkpointing is disabled
+    """
+    if backend == "none":
+        return None
+    if backend == "postgres":
+        if postgres_storage is None:
+            raise ValueError("The postgres checkpointer requires a PostgreSQLConversationStorage")
+        return PostgresCheckpointSaver(postgres_storage)
+    if backend != "memory":
+        logger.warning(f"Unknown CHECKPOINTER_BACKEND '{backend}', falling back to memory")
+    return BoundedMemorySaver()
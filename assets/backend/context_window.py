@@ -0,0 +1,162 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Token-budgeted context window management for model requests."""
+
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from logger import logger
+
+
+DEFAULT_CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "16000"))
+TOKENS_PER_MESSAGE = 4
+CHARS_PER_TOKEN = 4
+
+
+def _load_token_encoder() -> Optional[Callable[[str], int]]:
+    """Return a tiktoken-based counter, or None when tiktoken or its BPE files are unavailable."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(os.getenv("CONTEXT_TOKEN_ENCODING", "cl100k_base"))
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning({"message": "tiktoken unavailable, estimating tokens from character count", "error": str(e)})
+        return None
+
+
+@dataclass
+class TrimResult:
+    """Outcome of fitting a message list into the token budget."""
+    messages: List[BaseMessage]
+    prompt_tokens: int
+    dropped_messages: int = 0
+    dropped_tokens: int = 0
+
+
+class ContextWindowManager:
+    """Trims conversation history to a token budget before it is sent to the model.
+
+    The leading system prompt and the latest user turn (the last HumanMessage and
+    everything after it) are always kept. Older history is dropped oldest-first in
+    whole units, so an AIMessage with tool calls is never separated from its
+    ToolMessages.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_CONTEXT_MAX_TOKENS):
+        """Initialize the context window manager.
+
+        Args:
+            max_tokens: Prompt token budget; 0 or less disables trimming
+        """
+        self.max_tokens = max_tokens
+        encoder = _load_token_encoder()
+        self._count_text_tokens = lru_cache(maxsize=8192)(encoder or self._estimate_tokens)
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def count_text_tokens(self, text: str) -> int:
+        """Count the tokens of a plain string."""
+        return self._count_text_tokens(text)
+
+    def count_message_tokens(self, message: BaseMessage) -> int:
+        """Count the tokens a message contributes to the prompt.
+
+        Args:
+            message: LangChain message
+
+        Returns:
+            Approximate token count including per-message overhead
+        """
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        tokens = TOKENS_PER_MESSAGE + self._count_text_tokens(content)
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            tokens += self._count_text_tokens(tool_call["name"]) + self._count_text_tokens(json.dumps(tool_call["args"]))
+        return tokens
+
+    def count_tokens(self, messages: List[BaseMessage]) -> int:
+        """Count the tokens of a whole message list."""
+        return sum(self.count_message_tokens(msg) for msg in messages)
+
+    def trim(self, messages: List[BaseMessage]) -> TrimResult:
+        """Fit messages into the token budget.
+
+        Args:
+            messages: Full message list, system prompt first
+
+        Returns:
+            TrimResult with the kept messages and how much was dropped
+        """
+        head_end = 0
+        while head_end < len(messages) and isinstance(messages[head_end], SystemMessage):
+            head_end += 1
+
+        tail_start = len(messages)
+        for i in range(len(messages) - 1, head_end - 1, -1):
+            if isinstance(messages[i], HumanMessage):
+                tail_start = i
+                break
+
+        units: List[List[BaseMessage]] = []
+        for msg in messages[head_end:tail_start]:
+            if isinstance(msg, ToolMessage) and units:
+                units[-1].append(msg)
+            else:
+                units.append([msg])
+
+        unit_tokens = [self.count_tokens(unit) for unit in units]
+        fixed_tokens = self.count_tokens(messages[:head_end]) + self.count_tokens(messages[tail_start:])
+        total_tokens = fixed_tokens + sum(unit_tokens)
+
+        dropped_messages = dropped_tokens = 0
+        first_kept = 0
+        while first_kept < len(units) and (
+            (self.max_tokens > 0 and total_tokens > self.max_tokens)
+            or isinstance(units[first_kept][0], ToolMessage)
+        ):
+            # Drop oldest units first; a unit starting with an orphaned ToolMessage is never valid to send
+            dropped_messages += len(units[first_kept])
+            dropped_tokens += unit_tokens[first_kept]
+            total_tokens -= unit_tokens[first_kept]
+            first_kept += 1
+
+        if dropped_messages == 0:
+            return TrimResult(messages=messages, prompt_tokens=total_tokens)
+
+        if self.max_tokens > 0 and total_tokens > self.max_tokens:
+            logger.warning({
+                "message": "Context still exceeds budget after trimming history",
+                "prompt_tokens": total_tokens,
+                "max_tokens": self.max_tokens
+            })
+
+        kept = list(messages[:head_end])
+        for unit in units[first_kept:]:
+            kept.extend(unit)
+        kept.extend(messages[tail_start:])
+        return TrimResult(
+            messages=kept,
+            prompt_tokens=total_tokens,
+            dropped_messages=dropped_messages,
+            dropped_tokens=dropped_tokens,
+        )
@@ -0,0 +1,244 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Hedged and retried opening of streaming LLM requests.
+
+A stream counts as started once it yields its first chunk carrying content,
+a tool call or a finish reason. Errors the OpenAI SDK would retry (connection
+errors, timeouts, 408, 409, 429 and 5xx responses) are retried before that
+point with jittered exponential backoff, or after the server's ``Retry-After``;
+clients passed in should have their own retries disabled. With hedging enabled a duplicate
+request is fired when the first one has not started within the hedge delay,
+and whichever starts first is kept while the other is cancelled.
+"""
+
+import asyncio
+import email.utils
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import openai
+
+from logger import logger
+
+
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+LLM_HEDGE_DELAY_MS = float(os.getenv("LLM_HEDGE_DELAY_MS", "1500"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.25"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "4"))
+
+# APIConnectionError covers APITimeoutError
+RETRYABLE_ERRORS = (openai.APIConnectionError, httpx.TransportError)
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+# Longest Retry-After honoured; longer waits fall back to the backoff, as in the SDK
+MAX_RETRY_AFTER = 60.0
+
+StreamFactory = Callable[[], Awaitable[Any]]
+
+
+async def close_stream(stream: Any) -> None:
+    """Close an OpenAI ``AsyncStream`` or async generator, releasing its connection."""
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is not None:
+        await close()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error before the first chunk is transient, following the OpenAI SDK's retry rules."""
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if not isinstance(error, openai.APIStatusError):
+        return False
+    should_retry = error.response.headers.get("x-should-retry")
+    if should_retry in ("true", "false"):
+        return should_retry == "true"
+    return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked to wait before retrying, from ``retry-after-ms`` or ``retry-after``."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        return float(headers["retry-after-ms"]) / 1000
+    except (KeyError, TypeError, ValueError):
+        pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        date = email.utils.parsedate_tz(value)
+        return email.utils.mktime_tz(date) - time.time() if date else None
+
+
+def _is_start_chunk(chunk: Any) -> bool:
+    for choice in getattr(chunk, "choices", []) or []:
+        delta = getattr(choice, "delta", None)
+        if getattr(delta, "content", None) or getattr(delta, "tool_calls", None) or getattr(choice, "finish_reason", None):
+            return True
+    return False
+
+
+class StartedStream:
+    """Stream whose leading chunks were already read while waiting for it to start."""
+
+    def __init__(self, stream: Any, iterator: Any, buffered: List[Any]):
+        self._stream = stream
+        self._iterator = iterator
+        self._buffered = buffered
+
+    async def __aiter__(self):
+        while self._buffered:
+            yield self._buffered.pop(0)
+        async for chunk in self._iterator:
+            yield chunk
+
+    async def close(self) -> None:
+        await close_stream(self._stream)
+
+
+class StreamHedger:
+    """Opens streaming completions with bounded retries and optional hedging."""
+
+    def __init__(
+        self,
+        hedging: bool = LLM_HEDGING_ENABLED,
+        hedge_delay_ms: float = LLM_HEDGE_DELAY_MS,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+        retry_max_delay: float = LLM_RETRY_MAX_DELAY
+    ):
+        """Initialize the hedger.
+
+        Args:
+            hedging: Fire a duplicate request when the first one is slow to start
+            hedge_delay_ms: Milliseconds to wait for the first chunk before hedging
+            max_retries: Retries of a request after transient errors before it started
+            retry_base_delay: Base of the exponential backoff in seconds
+            retry_max_delay: Upper bound of a single backoff in seconds
+        """
+        self.hedging = hedging
+        self.hedge_delay = hedge_delay_ms / 1000
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def open(self, create: StreamFactory) -> StartedStream:
+        """Open a streaming request and wait until it has started.
+
+        Args:
+            create: Coroutine factory issuing the request, e.g. a bound ``chat.completions.create``
+
+        Returns:
+            The started stream, replaying the chunks read so far
+
+        Raises:
+            Exception: The last error if every attempt failed
+        """
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        primary = asyncio.create_task(self._start(create))
+        attempts = [primary]
+        hedge_at = loop.time() + self.hedge_delay if self.hedging else None
+        last_error: Optional[BaseException] = None
+
+        try:
+            while attempts:
+                timeout = max(0.0, hedge_at - loop.time()) if hedge_at is not None else None
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_at = None
+                    self.hedged += 1
+                    logger.debug({"message": "Hedging slow LLM request", "hedge_delay_ms": self.hedge_delay * 1000})
+                    attempts.append(asyncio.create_task(self._start(create)))
+                    continue
+
+                for task in done:
+                    attempts.remove(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    if task is not primary:
+                        self.hedge_wins += 1
+                    for other in done:
+                        if other is not task and not other.exception():
+                            await other.result().close()
+                    return task.result()
+            self.failures += 1
+            raise last_error
+        finally:
+            for task in attempts:
+                task.cancel()
+            # An attempt may have started between the wait and the cancel; close its stream
+            for result in await asyncio.gather(*attempts, return_exceptions=True):
+                if isinstance(result, StartedStream):
+                    await result.close()
+
+    async def _start(self, create: StreamFactory) -> StartedStream:
+        """Issue one request, retrying transient errors, until its first meaningful chunk arrives."""
+        attempt = 0
+        while True:
+            stream = None
+            started = False
+            try:
+                stream = await create()
+                iterator = stream.__aiter__()
+                buffered = []
+                async for chunk in iterator:
+                    buffered.append(chunk)
+                    if _is_start_chunk(chunk):
+                        break
+                started = True
+                return StartedStream(stream, iterator, buffered)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                delay = retry_after(e)
+                if delay is None or not 0 <= delay <= MAX_RETRY_AFTER:
+                    delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                logger.warning({"message": "Retrying LLM request after transient error", "attempt": attempt, "delay_s": round(delay, 3), "error": str(e)})
+                await asyncio.sleep(delay)
+            finally:
+                if stream is not None and not started:
+                    await close_stream(stream)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedging": self.hedging,
+            "hedge_delay_ms": self.hedge_delay * 1000,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate_percent": round(self.hedge_wins / self.hedged * 100, 2) if self.hedged else 0,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
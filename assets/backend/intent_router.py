@@ -0,0 +1,221 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Rule-based routing of requests that obviously map to a single tool.
+
+When the router is confident, the agent emits the tool call itself instead of
+spending an LLM round-trip on the planning step. In ``shadow`` mode the router
+only predicts and its predictions are compared with the tool calls the model
+actually makes, which gives the precision used to tune the rules and the
+confidence threshold before switching to ``on``.
+"""
+
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolCall
+
+from logger import logger
+
+if TYPE_CHECKING:
+    from postgres_storage import StoredImage
+
+
+# off: disabled, shadow: predict and measure precision only, on: route confident requests
+INTENT_ROUTER_MODE = os.getenv("INTENT_ROUTER_MODE", "off").lower()
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.85"))
+
+_DOCUMENT_REQUEST_RE = re.compile(
+    r"\b(search|look\s+(up|through|in)|find|check|summari[sz]e|according\s+to|based\s+on|in|from)\b"
+    r"[^.?!]{0,40}?\b(my|the|these|those|uploaded|attached)\s+(\w+\s+)?"
+    r"(documents?|docs|files?|pdfs?|reports?|papers?|sources?)\b",
+    re.IGNORECASE,
+)
+_IMAGE_REQUEST_RE = re.compile(
+    r"\b(image|picture|photo|screenshot|diagram|chart|figure|this|describe|explain|what'?s?\s+(in|on|shown))\b",
+    re.IGNORECASE,
+)
+# Requests that need another tool as well, which the model should plan itself
+_OTHER_INTENT_RE = re.compile(
+    r"\b(code|script|program|implement|develop|build|website|app|function|class|html|css|javascript|python|react|"
+    r"weather|forecast|browse|url|https?://)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Route:
+    """Tool call the router predicts for a request."""
+    tool: str
+    args: Dict[str, Any]
+    confidence: float
+    rule: str
+    routed: bool = False
+
+    def to_message(self) -> AIMessage:
+        return AIMessage(
+            content="",
+            tool_calls=[ToolCall(name=self.tool, args=self.args, id=f"call_route_{uuid.uuid4().hex[:12]}")],
+        )
+
+
+@dataclass
+class _RuleStats:
+    predicted: int = 0
+    routed: int = 0
+    agreed: int = 0
+    disagreed: int = 0
+    confident_scored: int = 0
+    confident_agreed: int = 0
+    confidence_sum: float = 0.0
+
+
+class IntentRouter:
+    """Predicts the tool call of requests that clearly target a single tool."""
+
+    def __init__(self, mode: str = INTENT_ROUTER_MODE, min_confidence: float = INTENT_ROUTER_MIN_CONFIDENCE):
+        """Initialize the router.
+
+        Args:
+            mode: "shadow" to only measure precision, "on" to route confident requests
+            min_confidence: Confidence at or above which a prediction is routed
+        """
+        self.mode = mode
+        self.min_confidence = min_confidence
+        self.missed = 0
+        self._rules: Dict[str, _RuleStats] = {}
+
+    @property
+    def routing(self) -> bool:
+        return self.mode == "on"
+
+    def predict(self, messages: List[AnyMessage], image_data: Optional["StoredImage"], available_tools: Iterable[str]) -> Optional[Route]:
+        """Predict the tool call for the current turn.
+
+        Only the planning step of a turn is predicted, i.e. when the last message
+        is the user's.
+
+        Args:
+            messages: Conversation so far, ending with the current turn
+            image_data: Image attached to the current turn, if any
+            available_tools: Names of the tools offered to the model
+
+        Returns:
+            The predicted route, or None when no rule applies
+        """
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            return None
+        text = messages[-1].content if isinstance(messages[-1].content, str) else ""
+        text = text.strip()
+        available = set(available_tools)
+        other_intent = bool(_OTHER_INTENT_RE.search(text))
+
+        if image_data and "explain_image" in available:
+            # The system prompt requires explain_image for every uploaded image
+            if not text or (_IMAGE_REQUEST_RE.search(text) and not other_intent):
+                confidence = 0.95
+            else:
+                confidence = 0.6
+            return Route("explain_image", {"query": text or "Describe this image."}, confidence, "image_upload")
+
+        if "search_documents" in available and text and _DOCUMENT_REQUEST_RE.search(text):
+            # The system prompt asks for the user's words as the query, without additions
+            confidence = 0.5 if other_intent else 0.9
+            return Route("search_documents", {"query": text}, confidence, "document_search")
+
+        return None
+
+    def decide(self, messages: List[AnyMessage], image_data: Optional["StoredImage"], available_tools: Iterable[str]) -> Optional[Route]:
+        """Predict the current turn and decide whether to skip the model for it.
+
+        Args:
+            messages: Conversation so far, ending with the current turn
+            image_data: Image attached to the current turn, if any
+            available_tools: Names of the tools offered to the model
+
+        Returns:
+            The prediction, with ``routed`` set when the router is on and confident
+            enough; None when no rule applies
+        """
+        route = self.predict(messages, image_data, available_tools)
+        if route is None:
+            return None
+        stats = self._rules.setdefault(route.rule, _RuleStats())
+        stats.predicted += 1
+        stats.confidence_sum += route.confidence
+        route.routed = self.routing and route.confidence >= self.min_confidence
+        if route.routed:
+            stats.routed += 1
+            logger.info({"message": "Intent router emitted tool call", "rule": route.rule, "tool": route.tool, "confidence": route.confidence})
+        return route
+
+    def record_outcome(self, route: Optional[Route], tool_calls: List[ToolCall]) -> None:
+        """Compare a prediction that was not routed with the tool calls the model made instead.
+
+        A prediction counts as correct when the model called exactly the predicted
+        tool. Predictions below the threshold are scored too, so the threshold can
+        be tuned from the per-confidence results in the log.
+
+        Args:
+            route: Prediction of the router, or None if no rule applied
+            tool_calls: Tool calls emitted by the model
+        """
+        called = [tool_call["name"] for tool_call in tool_calls]
+        if route is None:
+            if called:
+                self.missed += 1
+            return
+        stats = self._rules.setdefault(route.rule, _RuleStats())
+        agreed = called == [route.tool]
+        if agreed:
+            stats.agreed += 1
+        else:
+            stats.disagreed += 1
+        if route.confidence >= self.min_confidence:
+            stats.confident_scored += 1
+            stats.confident_agreed += int(agreed)
+        logger.info({
+            "message": "Intent router prediction scored",
+            "rule": route.rule,
+            "predicted": route.tool,
+            "confidence": route.confidence,
+            "would_route": route.confidence >= self.min_confidence,
+            "model_tool_calls": called,
+            "agreed": agreed,
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        rules = {}
+        for rule, stats in self._rules.items():
+            scored = stats.agreed + stats.disagreed
+            rules[rule] = {
+                "predicted": stats.predicted,
+                "routed": stats.routed,
+                "scored": scored,
+                "precision": round(stats.agreed / scored, 4) if scored else None,
+                # Precision of the predictions confident enough to be routed
+                "precision_at_threshold": round(stats.confident_agreed / stats.confident_scored, 4) if stats.confident_scored else None,
+                "avg_confidence": round(stats.confidence_sum / stats.predicted, 3) if stats.predicted else 0,
+            }
+        return {
+            "mode": self.mode,
+            "min_confidence": self.min_confidence,
+            "missed_tool_calls": self.missed,
+            "rules": rules,
+        }
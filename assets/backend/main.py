@@ -24,21 +24,25 @@ This module provides the main HTTP API endpoints and WebSocket connections for:
 - Vector store operations
 """
 
-import base64
+import asyncio
+import contextlib
 import json
 import os
 import uuid
 from contextlib import asynccontextmanager
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 
 from fastapi import FastAPI, File, Form, UploadFile, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
+from admission import admission_stats
 from agent import ChatAgent
 from config import ConfigManager
 from logger import logger, log_request, log_response, log_error
+from openai_clients import close_openai_clients
 from models import ChatIdRequest, ChatRenameRequest, SelectedModelRequest
-from postgres_storage import PostgreSQLConversationStorage
+from postgres_storage import MessagePage, PostgreSQLConversationStorage
+from streaming import coalesce_token_events
 from utils import process_and_ingest_files_background
 from vector_store import create_vector_store_with_config
 
@@ -48,6 +52,9 @@ POSTGRES_DB = os.getenv("POSTGRES_DB", "chatbot")
 POSTGRES_USER = os.getenv("POSTGRES_USER", "chatbot_user")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "chatbot_password")
 
+# Messages sent with the chat history on connect and per "load_more" request
+WS_HISTORY_PAGE_SIZE = int(os.getenv("WS_HISTORY_PAGE_SIZE", "50"))
+
 config_manager = ConfigManager("./config.json")
 
 postgres_storage = PostgreSQLConversationStorage(
@@ -98,6 +105,19 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error closing PostgreSQL storage: {e}")
 
+    try:
+        await close_openai_clients()
+    except Exception as e:
+        logger.error(f"Error closing OpenAI clients: {e}")
+
+
+def invalidate_index_dependent_caches() -> None:
+    """Drop cached results that depend on the document index or the selected sources."""
+    if agent:
+        agent.tool_cache.invalidate_index()
+        if agent.semantic_cache:
+            agent.semantic_cache.clear()
+
 
 app = FastAPI(
     title="Chatbot API",
@@ -115,49 +135,222 @@ app.add_middleware(
 )
 
 
+async def _read_client_messages(websocket: WebSocket, incoming: asyncio.Queue) -> None:
+    """Forward client messages to a queue so they can arrive while a response is streaming.
+
+    A ``None`` item signals that the client disconnected.
+    """
+    try:
+        while True:
+            data = await websocket.receive_text()
+            try:
+                await incoming.put(json.loads(data))
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring malformed WebSocket message: {data[:100]}")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await incoming.put(None)
+
+
+async def _send_events(websocket: WebSocket, events) -> None:
+    """Send agent events to the client, closing the event stream however sending ends."""
+    try:
+        async for event in events:
+            await websocket.send_json(event)
+    finally:
+        await events.aclose()
+
+
+def _history_event(event_type: str, page: MessagePage) -> Dict[str, Any]:
+    """Build a history event from a page of messages, leaving out the system prompt stored at seq 0."""
+    return {
+        "type": event_type,
+        "messages": [
+            postgres_storage._message_to_dict(msg)
+            for seq, msg in enumerate(page.messages, page.start_seq) if seq != 0
+        ],
+        "first_seq": page.start_seq,
+        "total": page.total,
+        "has_more": page.has_more,
+    }
+
+
+def _history_delta_event(page: MessagePage, from_seq: int) -> Dict[str, Any]:
+    """Build the event carrying the messages a turn appended, each tagged with its sequence number.
+
+    Clients apply it only if ``from_seq`` equals the message count they hold and
+    otherwise ask for a ``resync``.
+    """
+    return {
+        "type": "history_delta",
+        "from_seq": from_seq,
+        "messages": [
+            {**postgres_storage._message_to_dict(msg), "seq": seq}
+            for seq, msg in enumerate(page.messages, page.start_seq) if seq != 0
+        ],
+        "total": page.total,
+    }
+
+
+async def _send_latest_history(websocket: WebSocket, chat_id: str) -> MessagePage:
+    """Send the last WS_HISTORY_PAGE_SIZE messages of a chat as a ``history`` event."""
+    page = await postgres_storage.get_message_page(chat_id, limit=WS_HISTORY_PAGE_SIZE)
+    await websocket.send_json(_history_event("history", page))
+    return page
+
+
+async def _send_history_page(websocket: WebSocket, chat_id: str, request: Dict[str, Any], loaded_from: int) -> int:
+    """Answer a ``load_more`` request with the page of messages preceding the client's oldest one.
+
+    Args:
+        websocket: WebSocket connection
+        chat_id: Chat identifier
+        request: Client message, optionally carrying the ``before`` cursor
+        loaded_from: Sequence number of the oldest message sent so far
+
+    Returns:
+        Sequence number of the oldest message sent after this page
+    """
+    before = request.get("before")
+    if not isinstance(before, int) or before < 0:
+        before = loaded_from
+    page = await postgres_storage.get_message_page(chat_id, limit=WS_HISTORY_PAGE_SIZE, before=before)
+    await websocket.send_json(_history_event("history_page", page))
+    return min(loaded_from, page.start_seq)
+
+
 @app.websocket("/ws/chat/{chat_id}")
-async def websocket_endpoint(websocket: WebSocket, chat_id: str):
+async def websocket_endpoint(websocket: WebSocket, chat_id: str, stream_mode: str = "coalesced"):
     """WebSocket endpoint for real-time chat communication.
     
+    While a response is streaming the client may send ``{"type": "cancel"}`` to stop
+    it; sending a new message or disconnecting also cancels the in-flight response.
+    A cancelled turn is persisted with the text generated so far and answered by a
+    ``{"type": "cancelled"}`` event.
+    
+    On connect only the last WS_HISTORY_PAGE_SIZE messages are sent; older pages
+    are requested with ``{"type": "load_more", "before": <first_seq>}`` and
+    answered with ``history_page`` events. After each turn a ``history_delta``
+    event carries only the messages the turn appended; a client that detects a
+    gap sends ``{"type": "resync"}`` and receives the ``history`` again.
+    
     Args:
         websocket: WebSocket connection
         chat_id: Unique chat identifier
+        stream_mode: "coalesced" (default) merges token events over a short window;
+            "token" sends one event per model delta
     """
     logger.debug(f"WebSocket connection attempt for chat_id: {chat_id}")
+    incoming: asyncio.Queue = asyncio.Queue()
+    reader = None
     try:
         await websocket.accept()
         logger.debug(f"WebSocket connection accepted for chat_id: {chat_id}")
         
-        history_messages = await postgres_storage.get_messages(chat_id)
-        history = [postgres_storage._message_to_dict(msg) for i, msg in enumerate(history_messages) if i != 0]
-        await websocket.send_json({"type": "history", "messages": history})
+        page = await _send_latest_history(websocket, chat_id)
+        loaded_from = page.start_seq
+        # Number of messages the client is known to hold up to, i.e. the next sequence number it expects
+        synced_seq = page.total
+
+        reader = asyncio.create_task(_read_client_messages(websocket, incoming))
+        next_message = None
         
         while True:
-            data = await websocket.receive_text()
-            client_message = json.loads(data)
+            client_message = next_message or await incoming.get()
+            next_message = None
+            if client_message is None:
+                break
+            if client_message.get("type") == "cancel":
+                continue
+            if client_message.get("type") == "load_more":
+                loaded_from = await _send_history_page(websocket, chat_id, client_message, loaded_from)
+                continue
+            if client_message.get("type") == "resync":
+                page = await _send_latest_history(websocket, chat_id)
+                loaded_from, synced_seq = page.start_seq, page.total
+                continue
+
             new_message = client_message.get("message")
             image_id = client_message.get("image_id")
             
             image_data = None
             if image_id:
                 image_data = await postgres_storage.get_image(image_id)
-                logger.debug(f"Retrieved image data for image_id: {image_id}, data length: {len(image_data) if image_data else 0}")
+                logger.debug(f"Retrieved image data for image_id: {image_id}, size: {image_data.size if image_data else 0} bytes")
             
-            try:
-                async for event in agent.query(query_text=new_message, chat_id=chat_id, image_data=image_data):
-                    await websocket.send_json(event)
-            except Exception as query_error:
-                logger.error(f"Error in agent.query: {str(query_error)}", exc_info=True)
-                await websocket.send_json({"type": "error", "content": f"Error processing request: {str(query_error)}"})
+            events = agent.query(query_text=new_message, chat_id=chat_id, image_data=image_data)
+            if stream_mode != "token":
+                events = coalesce_token_events(events)
+            sender = asyncio.create_task(_send_events(websocket, events))
+
+            cancel_reason = None
+            # History pages requested while streaming are sent once the turn is over
+            deferred_requests = []
+            while not sender.done():
+                receiver = asyncio.ensure_future(incoming.get())
+                await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if not receiver.done():
+                    receiver.cancel()
+                    continue
+                pending_message = receiver.result()
+                if pending_message is not None and pending_message.get("type") in ("load_more", "resync"):
+                    deferred_requests.append(pending_message)
+                    continue
+                if pending_message is None:
+                    cancel_reason = "disconnect"
+                elif pending_message.get("type") == "cancel":
+                    cancel_reason = "cancel"
+                else:
+                    cancel_reason = "new_message"
+                    next_message = pending_message
+                if sender.done():
+                    break
+                logger.info({"message": "Cancelling in-flight response", "chat_id": chat_id, "reason": cancel_reason})
+                # Cancelling the sender closes the agent's event stream, which stops the run
+                # and waits for the partial turn to be persisted
+                sender.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await sender
+                break
+
+            if cancel_reason == "disconnect":
+                break
+            if not sender.cancelled():
+                try:
+                    sender.result()
+                except WebSocketDisconnect:
+                    break
+                except Exception as query_error:
+                    logger.error(f"Error in agent.query: {str(query_error)}", exc_info=True)
+                    await websocket.send_json({"type": "error", "content": f"Error processing request: {str(query_error)}"})
+            else:
+                await websocket.send_json({"type": "cancelled", "reason": cancel_reason})
         
-            final_messages = await postgres_storage.get_messages(chat_id)
-            final_history = [postgres_storage._message_to_dict(msg) for i, msg in enumerate(final_messages) if i != 0]
-            await websocket.send_json({"type": "history", "messages": final_history})
+            # Send only the messages this turn appended; if earlier messages were removed the
+            # client's copy cannot be patched and gets the loaded range again
+            delta = await postgres_storage.get_message_page(chat_id, since=synced_seq)
+            if delta.total >= synced_seq:
+                await websocket.send_json(_history_delta_event(delta, synced_seq))
+            else:
+                final_page = await postgres_storage.get_message_page(chat_id, since=loaded_from)
+                await websocket.send_json(_history_event("history", final_page))
+                loaded_from = final_page.start_seq
+            synced_seq = delta.total
+            for request in deferred_requests:
+                if request.get("type") == "resync":
+                    page = await _send_latest_history(websocket, chat_id)
+                    loaded_from, synced_seq = page.start_seq, page.total
+                else:
+                    loaded_from = await _send_history_page(websocket, chat_id, request, loaded_from)
             
     except WebSocketDisconnect:
         logger.debug(f"Client disconnected from chat {chat_id}")
     except Exception as e:
         logger.error(f"WebSocket error for chat {chat_id}: {str(e)}", exc_info=True)
+    finally:
+        if reader is not None:
+            reader.cancel()
 
 
 @app.post("/upload-image")
@@ -172,10 +365,8 @@ async def upload_image(image: UploadFile = File(...), chat_id: str = Form(...)):
         Dictionary with generated image_id
     """
     image_data = await image.read()
-    image_base64 = base64.b64encode(image_data).decode('utf-8')
-    data_uri = f"data:{image.content_type};base64,{image_base64}"
     image_id = str(uuid.uuid4())
-    await postgres_storage.store_image(image_id, data_uri)
+    await postgres_storage.store_image(image_id, image_data, image.content_type or "image/jpeg")
     return {"image_id": image_id}
 
 
@@ -211,7 +402,8 @@ async def ingest_files(files: Optional[List[UploadFile]] = File(None), backgroun
             vector_store,
             config_manager,
             task_id,
-            indexing_tasks
+            indexing_tasks,
+            on_indexed=invalidate_index_dependent_caches
         )
         
         response = {
@@ -277,6 +469,7 @@ async def update_selected_sources(selected_sources: List[str]):
     """
     try:
         config_manager.updated_selected_sources(selected_sources)
+        invalidate_index_dependent_caches()
         return {"status": "success", "message": "Selected sources updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating selected sources: {str(e)}")
@@ -317,6 +510,50 @@ async def get_available_models():
         raise HTTPException(status_code=500, detail=f"Error getting available models: {str(e)}")
 
 
+@app.get("/admission/stats")
+async def get_admission_stats():
+    """Get queue wait times per model endpoint and hedging/retry counters of the agent's LLM requests."""
+    return {
+        "endpoints": admission_stats(),
+        "hedging": agent.stream_hedger.stats() if agent else None,
+    }
+
+
+@app.get("/metrics/latency")
+async def get_latency_metrics():
+    """Get histograms of turn, time-to-first-token, history loading, node and tool latencies."""
+    return agent.latency_metrics.snapshot() if agent else {}
+
+
+@app.get("/router/stats")
+async def get_router_stats():
+    """Get the intent router's predictions, routed requests and precision per rule."""
+    return agent.intent_router.stats() if agent and agent.intent_router else {"mode": "off"}
+
+
+@app.get("/tools/selection/stats")
+async def get_tool_selection_stats():
+    """Get how many tool schemas were sent per request and the prompt tokens saved by pruning."""
+    return agent.tool_selector.stats() if agent and agent.tool_selector else {"enabled": False}
+
+
+@app.get("/stream/stats")
+async def get_stream_stats():
+    """Get depth and overflow counters of the agent's event queues, to spot slow consumers."""
+    return agent.stream_metrics.stats() if agent else {}
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get hit/miss statistics of the backend caches."""
+    return {
+        "conversation_storage": postgres_storage.get_cache_stats(),
+        "tool_results": agent.tool_cache.stats() if agent else None,
+        "semantic_responses": agent.semantic_cache.stats() if agent and agent.semantic_cache else None,
+        "checkpoints": agent.checkpointer.stats() if agent and agent.checkpointer else None,
+    }
+
+
 @app.get("/chats")
 async def list_chats():
     """Get list of all chat conversations."""
@@ -450,6 +687,7 @@ async def delete_chat(chat_id: str):
     """
     try:
         success = await postgres_storage.delete_conversation(chat_id)
+        await agent.forget_chat(chat_id)
         
         if success:
             return {
@@ -478,6 +716,7 @@ async def clear_all_chats():
         for chat_id in chat_ids:
             if await postgres_storage.delete_conversation(chat_id):
                 cleared_count += 1
+            await agent.forget_chat(chat_id)
         
         new_chat_id = str(uuid.uuid4())
         await postgres_storage.save_messages_immediate(new_chat_id, [])
@@ -508,6 +747,7 @@ async def delete_collection(collection_name: str):
     try:
         success = vector_store.delete_collection(collection_name)
         if success:
+            invalidate_index_dependent_caches()
             return {"status": "success", "message": f"Collection '{collection_name}' deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found or could not be deleted")
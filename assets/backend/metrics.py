@@ -0,0 +1,166 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Per-turn latency breakdown and process-wide latency histograms."""
+
+import bisect
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+# Upper bounds in milliseconds of the histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate percentiles."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> float:
+        """Return the upper bound of the bucket holding the p-th percentile (the max for the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count, 2) if self.count else 0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": round(self.max, 2),
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+class LatencyMetrics:
+    """Histograms of turn, TTFT, node and tool latencies across all chats."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.turns = 0
+
+    def observe(self, name: str, value_ms: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value_ms)
+
+    def observe_turn(self, stats: "TurnStats") -> None:
+        """Feed the durations of a completed turn into the histograms."""
+        self.turns += 1
+        summary = stats.summary()
+        self.observe("turn_ms", summary["total_ms"])
+        self.observe("history_load_ms", summary["history_load_ms"])
+        if summary["ttft_ms"] is not None:
+            self.observe("ttft_ms", summary["ttft_ms"])
+        for node, durations in stats.node_durations.items():
+            for duration in durations:
+                self.observe(f"node.{node}_ms", duration)
+        for tool, durations in stats.tool_durations.items():
+            for duration in durations:
+                self.observe(f"tool.{tool}_ms", duration)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "histograms_ms": {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())},
+        }
+
+
+class TurnStats:
+    """Monotonic timings and sizes of one chat turn.
+
+    Every streamed event passes through ``observe``, which stamps it with
+    ``t_ms`` (milliseconds since the turn started) and picks up the time to
+    first token and the ``duration_ms`` reported by ``node_end``/``tool_end``.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.history_load_ms = 0.0
+        self.ttft_ms: Optional[float] = None
+        self.token_events = 0
+        self.prompt_tokens: List[int] = []
+        self.completion_tokens = 0
+        self.tools_sent: List[int] = []
+        self.tool_schema_tokens = 0
+        self.tool_schema_tokens_saved = 0
+        self.node_durations: Dict[str, List[float]] = {}
+        self.tool_durations: Dict[str, List[float]] = {}
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def observe(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Stamp a streamed event and record the timings it carries."""
+        event["t_ms"] = self.elapsed_ms()
+        event_type = event.get("type")
+        if event_type == "token":
+            self.token_events += 1
+            if self.ttft_ms is None:
+                self.ttft_ms = event["t_ms"]
+        elif event_type == "node_end" and "duration_ms" in event:
+            self.node_durations.setdefault(event["data"], []).append(event["duration_ms"])
+        elif event_type == "tool_end" and "duration_ms" in event:
+            self.tool_durations.setdefault(event["data"], []).append(event["duration_ms"])
+        return event
+
+    def record_generation(self, prompt_tokens: int, completion_tokens: int) -> None:
+        self.prompt_tokens.append(prompt_tokens)
+        self.completion_tokens += completion_tokens
+
+    def record_tool_selection(self, tools_sent: int, schema_tokens: int, saved_tokens: int) -> None:
+        self.tools_sent.append(tools_sent)
+        self.tool_schema_tokens += schema_tokens
+        self.tool_schema_tokens_saved += saved_tokens
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_ms": self.elapsed_ms(),
+            "history_load_ms": self.history_load_ms,
+            "ttft_ms": self.ttft_ms,
+            "iterations": len(self.prompt_tokens),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "token_events": self.token_events,
+            "tools_sent": self.tools_sent,
+            "tool_schema_tokens": self.tool_schema_tokens,
+            "tool_schema_tokens_saved": self.tool_schema_tokens_saved,
+            "nodes_ms": self.node_durations,
+            "tools_ms": self.tool_durations,
+        }
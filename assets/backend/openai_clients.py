@@ -0,0 +1,99 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Process-wide pooled clients for OpenAI-compatible endpoints.
+
+Every call site (the supervisor agent, MCP tool servers and embeddings) should
+obtain its client here so that connections, keep-alive and TLS sessions are
+reused across model switches and tool calls instead of being rebuilt each time.
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "600"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+
+_async_openai_clients: Dict[Tuple[str, Optional[str]], AsyncOpenAI] = {}
+_async_http_client: Optional[httpx.AsyncClient] = None
+_sync_http_client: Optional[httpx.Client] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the shared async HTTP connection pool used for OpenAI-compatible calls."""
+    global _async_http_client
+    if _async_http_client is None or _async_http_client.is_closed:
+        _async_http_client = httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+    return _async_http_client
+
+
+def get_sync_http_client() -> httpx.Client:
+    """Return the shared sync HTTP connection pool, for libraries that call the API synchronously."""
+    global _sync_http_client
+    if _sync_http_client is None or _sync_http_client.is_closed:
+        _sync_http_client = httpx.Client(limits=_limits(), timeout=_timeout())
+    return _sync_http_client
+
+
+def get_async_openai_client(base_url: Optional[str] = None, api_key: Optional[str] = None) -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client for an endpoint.
+
+    Args:
+        base_url: API base URL, defaults to OPENAI_BASE_URL
+        api_key: API key, defaults to OPENAI_API_KEY
+
+    Returns:
+        AsyncOpenAI client sharing the pooled HTTP transport
+    """
+    base_url = base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    key = (base_url, api_key)
+
+    client = _async_openai_clients.get(key)
+    if client is None or client.is_closed():
+        client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=get_async_http_client())
+        _async_openai_clients[key] = client
+    return client
+
+
+async def close_openai_clients() -> None:
+    """Close the pooled connections, typically on application shutdown."""
+    global _async_http_client, _sync_http_client
+    _async_openai_clients.clear()
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+    if _sync_http_client is not None:
+        _sync_http_client.close()
+        _sync_http_client = None
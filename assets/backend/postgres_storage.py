@@ -14,9 +14,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-"""PostgreSQL-based conversation storage with caching and I/O optimization."""
+"""PostgreSQL-based conversation storage with caching and I/O optimization.
 
+Messages are stored one row per message in the ``messages`` table, keyed by
+``(chat_id, seq)``, so saving a turn only writes the messages it appended
+instead of rewriting the whole conversation. ``conversations`` keeps one
+header row per chat; its legacy ``messages`` JSONB column is migrated into
+the ``messages`` table on startup.
+
+Uploaded images are stored as raw bytes in ``image_blobs``, keyed by the
+SHA-256 of their content so repeated uploads share one row. ``images`` maps
+each upload's ``image_id`` to its blob until it expires.
+"""
+
+import base64
+import hashlib
 import json
+import os
+import sys
 import time
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
@@ -25,9 +40,30 @@ import asyncio
 import asyncpg
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, BaseMessage, ToolMessage
 
+from caching import LRUCache, estimate_size
 from logger import logger
 
 
+# Byte budgets of the in-process caches
+STORAGE_MESSAGE_CACHE_MAX_BYTES = int(os.getenv("STORAGE_MESSAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Snapshots of each chat's stored messages that let a write touch only the changed rows
+STORAGE_PERSISTED_CACHE_MAX_BYTES = int(os.getenv("STORAGE_PERSISTED_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+STORAGE_METADATA_CACHE_MAX_BYTES = int(os.getenv("STORAGE_METADATA_CACHE_MAX_BYTES", str(1024 * 1024)))
+STORAGE_IMAGE_CACHE_MAX_BYTES = int(os.getenv("STORAGE_IMAGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Images are only read right after upload, when the message referencing them is sent
+STORAGE_IMAGE_CACHE_TTL = float(os.getenv("STORAGE_IMAGE_CACHE_TTL", "300"))
+# Seconds between sweeps removing expired cache entries and expired image rows
+STORAGE_CACHE_PURGE_INTERVAL = float(os.getenv("STORAGE_CACHE_PURGE_INTERVAL", "60"))
+
+
+def estimate_messages_size(messages: List[BaseMessage]) -> int:
+    """Approximate the memory held by a list of messages in bytes."""
+    return sys.getsizeof(messages) + sum(
+        sys.getsizeof(message) + estimate_size(message.content) + estimate_size(getattr(message, "tool_calls", None) or [])
+        for message in messages
+    )
+
+
 @dataclass
 class CacheEntry:
     """Cache entry with TTL support."""
@@ -39,6 +75,47 @@ class CacheEntry:
         return time.time() - self.timestamp > self.ttl
 
 
+@dataclass(frozen=True)
+class StoredImage:
+    """Raw bytes of an uploaded image, addressed by their SHA-256."""
+    sha256: str
+    mime_type: str
+    data: bytes
+
+    @classmethod
+    def from_bytes(cls, data: bytes, mime_type: str) -> "StoredImage":
+        return cls(hashlib.sha256(data).hexdigest(), mime_type, data)
+
+    @classmethod
+    def from_data_uri(cls, data_uri: str) -> "StoredImage":
+        """Decode a ``data:<mime>;base64,<payload>`` URI, as stored by earlier versions."""
+        header, payload = data_uri.split(",", 1)
+        if not header.startswith("data:") or not header.endswith(";base64"):
+            raise ValueError(f"Unsupported image data URI header: {header[:64]}")
+        return cls.from_bytes(base64.b64decode(payload), header[len("data:"):-len(";base64")] or "image/jpeg")
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def to_data_uri(self) -> str:
+        """Encode the image for a model request; built on demand and never stored."""
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+@dataclass
+class MessagePage:
+    """A contiguous range of a chat's messages."""
+    messages: List[BaseMessage]
+    start_seq: int
+    total: int
+
+    @property
+    def has_more(self) -> bool:
+        """Whether older messages exist before this page, apart from the system prompt at seq 0."""
+        return self.start_seq > 1
+
+
 class PostgreSQLConversationStorage:
     """PostgreSQL-based conversation storage with intelligent caching and I/O optimization."""
     
@@ -50,7 +127,11 @@ class PostgreSQLConversationStorage:
         user: str = 'chatbot_user', 
         password: str = 'chatbot_password',
         pool_size: int = 10,
-        cache_ttl: int = 300
+        cache_ttl: int = 300,
+        message_cache_bytes: int = STORAGE_MESSAGE_CACHE_MAX_BYTES,
+        persisted_cache_bytes: int = STORAGE_PERSISTED_CACHE_MAX_BYTES,
+        metadata_cache_bytes: int = STORAGE_METADATA_CACHE_MAX_BYTES,
+        image_cache_bytes: int = STORAGE_IMAGE_CACHE_MAX_BYTES
     ):
         """Initialize PostgreSQL connection pool and caching.
         
@@ -62,6 +143,10 @@ class PostgreSQLConversationStorage:
             password: Database password
             pool_size: Connection pool size
             cache_ttl: Cache TTL in seconds
+            message_cache_bytes: Memory budget for cached conversations
+            persisted_cache_bytes: Memory budget for snapshots of the messages stored per chat
+            metadata_cache_bytes: Memory budget for cached chat metadata
+            image_cache_bytes: Memory budget for cached images
         """
         self.host = host
         self.port = port
@@ -73,18 +158,29 @@ class PostgreSQLConversationStorage:
         
         self.pool: Optional[asyncpg.Pool] = None
         
-        self._message_cache: Dict[str, CacheEntry] = {}
-        self._metadata_cache: Dict[str, CacheEntry] = {}
-        self._image_cache: Dict[str, CacheEntry] = {}
+        self._message_cache = LRUCache(message_cache_bytes, default_ttl=cache_ttl, sizeof=estimate_messages_size, name="messages")
+        self._metadata_cache = LRUCache(metadata_cache_bytes, default_ttl=cache_ttl, name="metadata")
+        # Images are cached by content like their blobs; uploads map their image_id to the SHA-256
+        self._image_cache = LRUCache(image_cache_bytes, default_ttl=STORAGE_IMAGE_CACHE_TTL, name="images")
+        self._image_ids = LRUCache(metadata_cache_bytes, default_ttl=STORAGE_IMAGE_CACHE_TTL, name="image_ids")
         self._chat_list_cache: Optional[CacheEntry] = None
         
         self._pending_saves: Dict[str, List[BaseMessage]] = {}
         self._save_lock = asyncio.Lock()
+        # Serializes database writes so each chat's persisted snapshot matches its rows
+        self._write_lock = asyncio.Lock()
+        # Messages currently stored per chat, as of the last read or committed write; a chat
+        # evicted from it is read back from its rows on the next write
+        self._persisted = LRUCache(persisted_cache_bytes, sizeof=estimate_messages_size, name="persisted_messages")
         self._batch_save_task: Optional[asyncio.Task] = None
+        self._cache_purge_task: Optional[asyncio.Task] = None
         
         self._cache_hits = 0
         self._cache_misses = 0
         self._db_operations = 0
+        self._rows_written = 0
+        self._rows_unchanged = 0
+        self._images_deduplicated = 0
 
     async def init_pool(self) -> None:
         """Initialize the connection pool and create tables."""
@@ -103,9 +199,12 @@ class PostgreSQLConversationStorage:
             )
             
             await self._create_tables()
+            await self._migrate_legacy_messages()
+            await self._migrate_legacy_images()
             logger.debug("PostgreSQL connection pool initialized successfully")
             
             self._batch_save_task = asyncio.create_task(self._batch_save_worker())
+            self._cache_purge_task = asyncio.create_task(self._cache_purge_worker())
             
         except Exception as e:
             logger.error(f"Failed to initialize PostgreSQL pool: {e}")
@@ -143,12 +242,13 @@ class PostgreSQLConversationStorage:
 
     async def close(self) -> None:
         """Close the connection pool and cleanup."""
-        if self._batch_save_task:
-            self._batch_save_task.cancel()
-            try:
-                await self._batch_save_task
-            except asyncio.CancelledError:
-                pass
+        for task in (self._batch_save_task, self._cache_purge_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
         
         if self.pool:
             await self.pool.close()
@@ -160,12 +260,25 @@ class PostgreSQLConversationStorage:
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS conversations (
                     chat_id VARCHAR(255) PRIMARY KEY,
-                    messages JSONB NOT NULL,
+                    messages JSONB,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     message_count INTEGER DEFAULT 0
                 )
             """)
+            # Legacy column, only read by the migration; earlier versions declared it NOT NULL
+            await conn.execute("ALTER TABLE conversations ALTER COLUMN messages DROP NOT NULL")
+
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    chat_id VARCHAR(255) NOT NULL,
+                    seq INTEGER NOT NULL,
+                    message JSONB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (chat_id, seq),
+                    FOREIGN KEY (chat_id) REFERENCES conversations(chat_id) ON DELETE CASCADE
+                )
+            """)
             
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS chat_metadata (
@@ -177,10 +290,22 @@ class PostgreSQLConversationStorage:
                 )
             """)
             
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS image_blobs (
+                    sha256 CHAR(64) PRIMARY KEY,
+                    mime_type VARCHAR(255) NOT NULL,
+                    data BYTEA NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Payloads are already compressed image formats; skip TOAST compression
+            await conn.execute("ALTER TABLE image_blobs ALTER COLUMN data SET STORAGE EXTERNAL")
+
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS images (
                     image_id VARCHAR(255) PRIMARY KEY,
-                    image_data TEXT NOT NULL,
+                    sha256 CHAR(64) NOT NULL REFERENCES image_blobs(sha256),
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     expires_at TIMESTAMP DEFAULT (CURRENT_TIMESTAMP + INTERVAL '1 hour')
                 )
@@ -209,6 +334,80 @@ class PostgreSQLConversationStorage:
                     EXECUTE FUNCTION update_updated_at_column()
             """)
 
+    async def _migrate_legacy_messages(self) -> None:
+        """Move conversations stored as one JSONB array into per-message rows.
+
+        Runs in a single transaction and is idempotent: chats are copied once and
+        their legacy column is cleared, so later startups find nothing to migrate.
+        The updated_at trigger is disabled meanwhile to keep the chat order.
+        """
+        async with self.pool.acquire() as conn:
+            pending = await conn.fetchval("SELECT count(*) FROM conversations WHERE messages IS NOT NULL")
+            if not pending:
+                return
+            async with conn.transaction():
+                await conn.execute("ALTER TABLE conversations DISABLE TRIGGER update_conversations_updated_at")
+                await conn.execute("""
+                    INSERT INTO messages (chat_id, seq, message)
+                    SELECT c.chat_id, m.ordinality - 1, m.value
+                    FROM conversations c, jsonb_array_elements(c.messages) WITH ORDINALITY AS m(value, ordinality)
+                    WHERE c.messages IS NOT NULL
+                    ON CONFLICT (chat_id, seq) DO NOTHING
+                """)
+                await conn.execute("""
+                    UPDATE conversations
+                    SET message_count = jsonb_array_length(messages), messages = NULL
+                    WHERE messages IS NOT NULL
+                """)
+                await conn.execute("ALTER TABLE conversations ENABLE TRIGGER update_conversations_updated_at")
+            self._db_operations += 1
+            logger.info({"message": "Migrated conversations to per-message rows", "conversations": pending})
+
+    async def _migrate_legacy_images(self) -> None:
+        """Move images stored as base64 data URIs in ``images.image_data`` into ``image_blobs``.
+
+        Expired rows are dropped rather than converted. Runs in a single
+        transaction, after which the legacy column no longer exists.
+        """
+        async with self.pool.acquire() as conn:
+            legacy = await conn.fetchval("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'images' AND column_name = 'image_data'
+            """)
+            if legacy:
+                await self._convert_legacy_images(conn)
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_images_sha256 ON images(sha256)")
+
+    async def _convert_legacy_images(self, conn: asyncpg.Connection) -> None:
+        """Convert the rows of a legacy ``images`` table in place."""
+        migrated = 0
+        async with conn.transaction():
+            await conn.execute("DELETE FROM images WHERE expires_at <= CURRENT_TIMESTAMP")
+            await conn.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS sha256 CHAR(64)")
+            rows = await conn.fetch("SELECT image_id, image_data FROM images")
+            for row in rows:
+                try:
+                    image = StoredImage.from_data_uri(row['image_data'])
+                except ValueError as e:
+                    logger.warning({"message": "Dropping undecodable legacy image", "image_id": row['image_id'], "error": str(e)})
+                    await conn.execute("DELETE FROM images WHERE image_id = $1", row['image_id'])
+                    continue
+                await conn.execute("""
+                    INSERT INTO image_blobs (sha256, mime_type, data, size_bytes)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (sha256) DO NOTHING
+                """, image.sha256, image.mime_type, image.data, image.size)
+                await conn.execute("UPDATE images SET sha256 = $2 WHERE image_id = $1", row['image_id'], image.sha256)
+                migrated += 1
+            await conn.execute("ALTER TABLE images DROP COLUMN image_data")
+            await conn.execute("ALTER TABLE images ALTER COLUMN sha256 SET NOT NULL")
+            await conn.execute("""
+                ALTER TABLE images ADD CONSTRAINT images_sha256_fkey
+                FOREIGN KEY (sha256) REFERENCES image_blobs(sha256)
+            """)
+        self._db_operations += 1
+        logger.info({"message": "Migrated images to content-addressed blobs", "images": migrated})
+
     def _message_to_dict(self, message: BaseMessage) -> Dict:
         """Convert a message object to a dictionary for storage."""
         result = {
@@ -250,26 +449,26 @@ class PostgreSQLConversationStorage:
 
     def _get_cached_messages(self, chat_id: str) -> Optional[List[BaseMessage]]:
         """Get messages from cache if available and not expired."""
-        cache_entry = self._message_cache.get(chat_id)
-        if cache_entry and not cache_entry.is_expired():
+        # Saves not yet written by the batch worker must win even if the cache evicted them
+        messages = self._pending_saves.get(chat_id)
+        if messages is None:
+            messages = self._message_cache.get(chat_id)
+        if messages is not None:
             self._cache_hits += 1
-            return cache_entry.data
+            return messages
         
         self._cache_misses += 1
         return None
 
     def _cache_messages(self, chat_id: str, messages: List[BaseMessage]) -> None:
         """Cache messages with TTL."""
-        self._message_cache[chat_id] = CacheEntry(
-            data=messages.copy(),
-            timestamp=time.time(),
-            ttl=self.cache_ttl
-        )
+        self._message_cache.set(chat_id, messages.copy())
 
     def _invalidate_cache(self, chat_id: str) -> None:
         """Invalidate cache entries for a chat."""
         self._message_cache.pop(chat_id, None)
         self._metadata_cache.pop(chat_id, None)
+        self._persisted.pop(chat_id, None)
         self._chat_list_cache = None
 
     async def exists(self, chat_id: str) -> bool:
@@ -286,30 +485,149 @@ class PostgreSQLConversationStorage:
             self._db_operations += 1
             return result
 
-    async def get_messages(self, chat_id: str, limit: Optional[int] = None) -> List[BaseMessage]:
-        """Retrieve messages for a chat session with caching."""
+    async def get_messages(
+        self,
+        chat_id: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        before: Optional[int] = None
+    ) -> List[BaseMessage]:
+        """Retrieve messages for a chat session with caching.
+        
+        Without arguments the whole conversation is loaded and cached; a range
+        of a conversation that is not cached is read with a bounded SQL query.
+        
+        Args:
+            chat_id: Chat identifier
+            limit: Return at most this many messages, the newest of the range
+            offset: Skip this many of the newest messages of the range
+            before: Cursor; only messages with a sequence number below it
+            
+        Returns:
+            Messages in conversation order
+        """
+        if limit is None and not offset and before is None:
+            return await self._get_all_messages(chat_id)
+        return (await self.get_message_page(chat_id, limit, offset, before)).messages
+
+    async def get_message_page(
+        self,
+        chat_id: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        before: Optional[int] = None,
+        since: Optional[int] = None
+    ) -> MessagePage:
+        """Retrieve a range of a chat's messages together with its position.
+        
+        Args:
+            chat_id: Chat identifier
+            limit: Return at most this many messages, the newest of the range
+            offset: Skip this many of the newest messages of the range
+            before: Only messages with a sequence number below this cursor
+            since: Only messages with a sequence number at or above this one
+            
+        Returns:
+            The page, with the sequence number of its first message and the chat's message count
+        """
         cached_messages = self._get_cached_messages(chat_id)
         if cached_messages is not None:
-            return cached_messages[-limit:] if limit else cached_messages
+            total = len(cached_messages)
+            end = total if before is None else max(0, min(before, total))
+            end = max(0, end - offset)
+            start = 0 if limit is None else max(0, end - limit)
+            if since is not None:
+                start = min(max(start, since), end)
+            return MessagePage(cached_messages[start:end], start, total)
+
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT seq, message FROM messages
+                WHERE chat_id = $1
+                    AND ($2::integer IS NULL OR seq < $2)
+                    AND ($3::integer IS NULL OR seq >= $3)
+                ORDER BY seq DESC
+                LIMIT $4 OFFSET $5
+            """, chat_id, before, since, limit, offset)
+            total = await conn.fetchval("SELECT message_count FROM conversations WHERE chat_id = $1", chat_id) or 0
+            self._db_operations += 1
+
+        rows = list(reversed(rows))
+        if rows:
+            start = rows[0]['seq']
+        else:
+            start = max(0, min(total if before is None else before, total) - offset)
+        return MessagePage([self._row_to_message(row) for row in rows], start, total)
+
+    async def _get_all_messages(self, chat_id: str) -> List[BaseMessage]:
+        cached_messages = self._get_cached_messages(chat_id)
+        if cached_messages is not None:
+            return cached_messages
         
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT messages FROM conversations WHERE chat_id = $1",
-                chat_id
-            )
+            messages = await self._fetch_messages(conn, chat_id)
             self._db_operations += 1
             
-            if not row:
+            if not messages:
                 return []
             
-            messages_data = row['messages']
-            if isinstance(messages_data, str):
-                messages_data = json.loads(messages_data)
-            messages = [self._dict_to_message(msg_data) for msg_data in messages_data]
-            
+            if chat_id not in self._persisted:
+                self._persisted.set(chat_id, list(messages))
             self._cache_messages(chat_id, messages)
             
-            return messages[-limit:] if limit else messages
+            return messages
+
+    async def _fetch_messages(self, conn: asyncpg.Connection, chat_id: str) -> List[BaseMessage]:
+        """Read the stored messages of a chat in sequence order."""
+        rows = await conn.fetch("SELECT message FROM messages WHERE chat_id = $1 ORDER BY seq", chat_id)
+        return [self._row_to_message(row) for row in rows]
+
+    def _row_to_message(self, row: asyncpg.Record) -> BaseMessage:
+        data = row['message']
+        if isinstance(data, str):
+            data = json.loads(data)
+        return self._dict_to_message(data)
+
+    async def _write_messages(self, conn: asyncpg.Connection, chat_id: str, messages: List[BaseMessage]) -> None:
+        """Bring the stored rows of a chat in line with ``messages``, writing only what changed.
+
+        Messages are compared with the persisted snapshot (by identity first, so
+        the unchanged history of a turn costs no serialization). New messages are
+        inserted, changed ones (e.g. the system prompt) are updated in place and
+        rows beyond the end of ``messages`` are deleted. Must run in a transaction
+        while holding ``_write_lock``; the caller commits the snapshot afterwards.
+        """
+        persisted = self._persisted.get(chat_id)
+        if persisted is None:
+            persisted = await self._fetch_messages(conn, chat_id)
+
+        rows = []
+        for seq, message in enumerate(messages):
+            if seq < len(persisted):
+                previous = persisted[seq]
+                if previous is message or self._message_to_dict(previous) == self._message_to_dict(message):
+                    continue
+            rows.append((chat_id, seq, json.dumps(self._message_to_dict(message))))
+        self._rows_unchanged += len(messages) - len(rows)
+        self._rows_written += len(rows)
+
+        await conn.execute("""
+            INSERT INTO conversations (chat_id, message_count)
+            VALUES ($1, $2)
+            ON CONFLICT (chat_id)
+            DO UPDATE SET 
+                message_count = EXCLUDED.message_count,
+                updated_at = CURRENT_TIMESTAMP
+        """, chat_id, len(messages))
+        if len(messages) < len(persisted):
+            await conn.execute("DELETE FROM messages WHERE chat_id = $1 AND seq >= $2", chat_id, len(messages))
+        if rows:
+            await conn.executemany("""
+                INSERT INTO messages (chat_id, seq, message)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (chat_id, seq)
+                DO UPDATE SET message = EXCLUDED.message
+            """, rows)
 
     async def save_messages(self, chat_id: str, messages: List[BaseMessage]) -> None:
         """Save messages with batching for performance."""
@@ -320,18 +638,10 @@ class PostgreSQLConversationStorage:
     
     async def save_messages_immediate(self, chat_id: str, messages: List[BaseMessage]) -> None:
         """Save messages immediately without batching - for critical operations."""
-        serialized_messages = [self._message_to_dict(msg) for msg in messages]
-        
-        async with self.pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO conversations (chat_id, messages, message_count)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (chat_id)
-                DO UPDATE SET 
-                    messages = EXCLUDED.messages,
-                    message_count = EXCLUDED.message_count,
-                    updated_at = CURRENT_TIMESTAMP
-            """, chat_id, json.dumps(serialized_messages), len(messages))
+        async with self._write_lock, self.pool.acquire() as conn:
+            async with conn.transaction():
+                await self._write_messages(conn, chat_id, messages)
+            self._persisted.set(chat_id, list(messages))
             self._db_operations += 1
         
         self._cache_messages(chat_id, messages)
@@ -343,27 +653,21 @@ class PostgreSQLConversationStorage:
             try:
                 await asyncio.sleep(1.0)
                 
-                async with self._save_lock:
-                    if not self._pending_saves:
-                        continue
+                # The batch is taken under the write lock so a deletion cannot fall between taking and writing it
+                async with self._write_lock:
+                    async with self._save_lock:
+                        if not self._pending_saves:
+                            continue
+                        
+                        saves_to_process = self._pending_saves.copy()
+                        self._pending_saves.clear()
                     
-                    saves_to_process = self._pending_saves.copy()
-                    self._pending_saves.clear()
-                
-                async with self.pool.acquire() as conn:
-                    async with conn.transaction():
+                    async with self.pool.acquire() as conn:
+                        async with conn.transaction():
+                            for chat_id, messages in saves_to_process.items():
+                                await self._write_messages(conn, chat_id, messages)
                         for chat_id, messages in saves_to_process.items():
-                            serialized_messages = [self._message_to_dict(msg) for msg in messages]
-                            
-                            await conn.execute("""
-                                INSERT INTO conversations (chat_id, messages, message_count)
-                                VALUES ($1, $2, $3)
-                                ON CONFLICT (chat_id)
-                                DO UPDATE SET 
-                                    messages = EXCLUDED.messages,
-                                    message_count = EXCLUDED.message_count,
-                                    updated_at = CURRENT_TIMESTAMP
-                            """, chat_id, json.dumps(serialized_messages), len(messages))
+                            self._persisted.set(chat_id, list(messages))
                 
                 self._db_operations += len(saves_to_process)
                 if saves_to_process:
@@ -385,7 +689,10 @@ class PostgreSQLConversationStorage:
     async def delete_conversation(self, chat_id: str) -> bool:
         """Delete a conversation by chat_id."""
         try:
-            async with self.pool.acquire() as conn:
+            async with self._write_lock, self.pool.acquire() as conn:
+                # A save still waiting for the batch worker would be read back and re-inserted
+                async with self._save_lock:
+                    self._pending_saves.pop(chat_id, None)
                 result = await conn.execute(
                     "DELETE FROM conversations WHERE chat_id = $1",
                     chat_id
@@ -422,58 +729,92 @@ class PostgreSQLConversationStorage:
             
             return chat_ids
 
-    async def store_image(self, image_id: str, image_base64: str) -> None:
-        """Store base64 image data with TTL."""
+    async def store_image(self, image_id: str, data: bytes, mime_type: str) -> StoredImage:
+        """Store an uploaded image under a new image_id with a one hour TTL.
+
+        The bytes are only sent to the database when no blob with the same
+        SHA-256 exists yet; otherwise the upload just references it.
+
+        Args:
+            image_id: Identifier the client sends back with its message
+            data: Raw image bytes
+            mime_type: MIME type of the image
+
+        Returns:
+            The stored image
+        """
+        image = StoredImage.from_bytes(data, mime_type)
         async with self.pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO images (image_id, image_data)
-                VALUES ($1, $2)
-                ON CONFLICT (image_id)
-                DO UPDATE SET 
-                    image_data = EXCLUDED.image_data,
-                    created_at = CURRENT_TIMESTAMP,
-                    expires_at = CURRENT_TIMESTAMP + INTERVAL '1 hour'
-            """, image_id, image_base64)
+            async with conn.transaction():
+                # The share lock keeps cleanup_expired_images from deleting the blob before it is referenced
+                exists = await conn.fetchval(
+                    "SELECT 1 FROM image_blobs WHERE sha256 = $1 FOR KEY SHARE", image.sha256
+                )
+                if exists:
+                    self._images_deduplicated += 1
+                else:
+                    await conn.execute("""
+                        INSERT INTO image_blobs (sha256, mime_type, data, size_bytes)
+                        VALUES ($1, $2, $3, $4)
+                        ON CONFLICT (sha256) DO NOTHING
+                    """, image.sha256, image.mime_type, image.data, image.size)
+                await conn.execute("""
+                    INSERT INTO images (image_id, sha256)
+                    VALUES ($1, $2)
+                    ON CONFLICT (image_id)
+                    DO UPDATE SET 
+                        sha256 = EXCLUDED.sha256,
+                        created_at = CURRENT_TIMESTAMP,
+                        expires_at = CURRENT_TIMESTAMP + INTERVAL '1 hour'
+                """, image_id, image.sha256)
             self._db_operations += 1
         
-        self._image_cache[image_id] = CacheEntry(
-            data=image_base64,
-            timestamp=time.time(),
-            ttl=3600
-        )
-
-    async def get_image(self, image_id: str) -> Optional[str]:
-        """Retrieve base64 image data with caching."""
-        cache_entry = self._image_cache.get(image_id)
-        if cache_entry and not cache_entry.is_expired():
+        self._image_ids.set(image_id, image.sha256)
+        if image.sha256 not in self._image_cache:
+            self._image_cache.set(image.sha256, image, size=image.size)
+        return image
+
+    async def get_image(self, image_id: str) -> Optional[StoredImage]:
+        """Retrieve an uploaded image with caching.
+
+        The image bytes are only fetched when no upload of the same content is cached.
+        """
+        sha256 = self._image_ids.get(image_id)
+        image = self._image_cache.get(sha256) if sha256 is not None else None
+        if image is not None:
             self._cache_hits += 1
-            return cache_entry.data
+            return image
         
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow("""
-                SELECT image_data FROM images 
-                WHERE image_id = $1 AND expires_at > CURRENT_TIMESTAMP
-            """, image_id)
-            self._db_operations += 1
-            
-            if row:
-                image_data = row['image_data']
-                self._image_cache[image_id] = CacheEntry(
-                    data=image_data,
-                    timestamp=time.time(),
-                    ttl=3600
+            if sha256 is None:
+                sha256 = await conn.fetchval(
+                    "SELECT sha256 FROM images WHERE image_id = $1 AND expires_at > CURRENT_TIMESTAMP",
+                    image_id
                 )
-                self._cache_misses += 1
-                return image_data
+                self._db_operations += 1
+                if sha256 is None:
+                    return None
+                self._image_ids.set(image_id, sha256)
+                image = self._image_cache.get(sha256)
+                if image is not None:
+                    self._cache_hits += 1
+                    return image
             
-            return None
+            row = await conn.fetchrow("SELECT mime_type, data FROM image_blobs WHERE sha256 = $1", sha256)
+            self._db_operations += 1
+            self._cache_misses += 1
+            if row is None:
+                return None
+            image = StoredImage(sha256, row['mime_type'], bytes(row['data']))
+            self._image_cache.set(sha256, image, size=image.size)
+            return image
 
     async def get_chat_metadata(self, chat_id: str) -> Optional[Dict]:
         """Get chat metadata with caching."""
-        cache_entry = self._metadata_cache.get(chat_id)
-        if cache_entry and not cache_entry.is_expired():
+        metadata = self._metadata_cache.get(chat_id)
+        if metadata is not None:
             self._cache_hits += 1
-            return cache_entry.data
+            return metadata
         
         async with self.pool.acquire() as conn:
             row = await conn.fetchrow(
@@ -490,11 +831,7 @@ class PostgreSQLConversationStorage:
             else:
                 metadata = {"name": f"Chat {chat_id[:8]}"}
             
-            self._metadata_cache[chat_id] = CacheEntry(
-                data=metadata,
-                timestamp=time.time(),
-                ttl=self.cache_ttl
-            )
+            self._metadata_cache.set(chat_id, metadata)
             self._cache_misses += 1
             
             return metadata
@@ -512,26 +849,30 @@ class PostgreSQLConversationStorage:
             """, chat_id, name)
             self._db_operations += 1
         
-        self._metadata_cache[chat_id] = CacheEntry(
-            data={"name": name},
-            timestamp=time.time(),
-            ttl=self.cache_ttl
-        )
+        self._metadata_cache.set(chat_id, {"name": name})
 
     async def cleanup_expired_images(self) -> int:
-        """Clean up expired images and return count of deleted images."""
+        """Clean up expired images and the blobs no image references anymore.
+
+        Returns:
+            Number of deleted images
+        """
         async with self.pool.acquire() as conn:
             result = await conn.execute(
                 "DELETE FROM images WHERE expires_at < CURRENT_TIMESTAMP"
             )
+            # Blobs locked by a concurrent store_image are about to be referenced again
+            await conn.execute("""
+                DELETE FROM image_blobs WHERE sha256 IN (
+                    SELECT b.sha256 FROM image_blobs b
+                    WHERE NOT EXISTS (SELECT 1 FROM images i WHERE i.sha256 = b.sha256)
+                    FOR UPDATE SKIP LOCKED
+                )
+            """)
             self._db_operations += 1
             
-            expired_keys = [
-                key for key, entry in self._image_cache.items()
-                if entry.is_expired()
-            ]
-            for key in expired_keys:
-                del self._image_cache[key]
+            self._image_cache.purge_expired()
+            self._image_ids.purge_expired()
             
             deleted_count = int(result.split()[-1]) if result else 0
             if deleted_count > 0:
@@ -549,11 +890,34 @@ class PostgreSQLConversationStorage:
             "cache_misses": self._cache_misses,
             "hit_rate_percent": round(hit_rate, 2),
             "db_operations": self._db_operations,
+            "message_rows_written": self._rows_written,
+            "message_rows_unchanged": self._rows_unchanged,
             "cached_conversations": len(self._message_cache),
             "cached_metadata": len(self._metadata_cache),
-            "cached_images": len(self._image_cache)
+            "cached_images": len(self._image_cache),
+            "images_deduplicated": self._images_deduplicated,
+            "cache_bytes": sum(cache.bytes_used for cache in self._caches()),
+            "cache_evictions": sum(cache.evictions for cache in self._caches()),
+            "caches": {cache.name: cache.stats() for cache in self._caches()},
         }
 
+    def _caches(self) -> List[LRUCache]:
+        return [self._message_cache, self._persisted, self._metadata_cache, self._image_cache, self._image_ids]
+
+    async def _cache_purge_worker(self) -> None:
+        """Background worker evicting expired cache entries and deleting expired images."""
+        while True:
+            try:
+                await asyncio.sleep(STORAGE_CACHE_PURGE_INTERVAL)
+                purged = sum(cache.purge_expired() for cache in self._caches())
+                deleted_images = await self.cleanup_expired_images()
+                if purged or deleted_images:
+                    logger.debug({"message": "Purged expired cache entries", "entries": purged, "images_deleted": deleted_images})
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in cache purge worker: {e}")
+
     def load_conversation_history(self, chat_id: str) -> List[Dict]:
         """Legacy method - converts to async call."""
         import asyncio
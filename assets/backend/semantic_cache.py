@@ -0,0 +1,165 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Semantic cache of final assistant answers keyed by embedded user questions.
+
+The key is the question alone, so the cache is only meant for turns that do not
+depend on earlier messages of the conversation; the agent skips it otherwise.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from logger import logger
+
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+
+
+@dataclass
+class _Namespace:
+    """Cached answers for one model and source selection."""
+    questions: List[str] = field(default_factory=list)
+    answers: List[str] = field(default_factory=list)
+    expires_at: List[float] = field(default_factory=list)
+    vectors: Optional[np.ndarray] = None
+
+
+class SemanticResponseCache:
+    """Looks up previous answers to questions that embed close to the current one.
+
+    Entries are partitioned by namespace (model name and selected sources) so an
+    answer is only reused under the same configuration it was produced with.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: float = SEMANTIC_CACHE_TTL
+    ):
+        """Initialize the semantic cache.
+
+        Args:
+            embeddings: LangChain embeddings model, typically ``VectorStore.embeddings``
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum answers kept per namespace, oldest evicted first
+            ttl: Seconds an answer stays reusable
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._namespaces: Dict[Hashable, _Namespace] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def namespace(model: str, sources: Optional[List[str]]) -> Tuple[str, Tuple[str, ...]]:
+        return model, tuple(sorted(sources or []))
+
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed a question as a unit vector, or return None if embedding fails."""
+        try:
+            vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        except Exception as e:
+            self.errors += 1
+            logger.warning({"message": "Semantic cache embedding failed", "error": str(e)})
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, namespace: Hashable, vector: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Return the best cached answer and its similarity, or None on a miss."""
+        ns = self._namespaces.get(namespace)
+        if ns is not None:
+            self._expire(ns)
+        if ns is None or ns.vectors is None or not len(ns.answers):
+            self.misses += 1
+            return None
+
+        similarities = ns.vectors @ vector
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return ns.answers[best], similarity
+
+    def store(self, namespace: Hashable, vector: np.ndarray, question: str, answer: str, ttl: Optional[float] = None) -> None:
+        """Cache the final answer given to a question.
+
+        Args:
+            namespace: Namespace returned by ``namespace``
+            vector: Embedded question
+            question: The question
+            answer: Final answer to the question
+            ttl: Seconds the answer stays reusable, capped at the cache's TTL
+        """
+        ns = self._namespaces.setdefault(namespace, _Namespace())
+        ns.questions.append(question)
+        ns.answers.append(answer)
+        ns.expires_at.append(time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl)))
+        ns.vectors = vector[None, :] if ns.vectors is None else np.vstack([ns.vectors, vector])
+
+        overflow = len(ns.answers) - self.max_entries
+        if overflow > 0:
+            self._drop_oldest(ns, overflow)
+
+    def _expire(self, ns: _Namespace) -> None:
+        now = time.monotonic()
+        keep = [i for i, expires_at in enumerate(ns.expires_at) if expires_at >= now]
+        if len(keep) == len(ns.expires_at):
+            return
+        ns.questions = [ns.questions[i] for i in keep]
+        ns.answers = [ns.answers[i] for i in keep]
+        ns.expires_at = [ns.expires_at[i] for i in keep]
+        ns.vectors = ns.vectors[keep] if keep else None
+
+    @staticmethod
+    def _drop_oldest(ns: _Namespace, count: int) -> None:
+        del ns.questions[:count]
+        del ns.answers[:count]
+        del ns.expires_at[:count]
+        ns.vectors = ns.vectors[count:] if ns.answers else None
+
+    def clear(self) -> None:
+        """Drop every cached answer, e.g. after the document index changed."""
+        self._namespaces.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of cached answers."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate_percent": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "entries": sum(len(ns.answers) for ns in self._namespaces.values()),
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,255 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Helpers for shaping the agent's event stream before it is sent to clients."""
+
+import asyncio
+import contextlib
+import os
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+TOKEN_COALESCE_WINDOW_MS = float(os.getenv("TOKEN_COALESCE_WINDOW_MS", "25"))
+TOKEN_COALESCE_MAX_BYTES = int(os.getenv("TOKEN_COALESCE_MAX_BYTES", "1024"))
+
+# Events buffered between a graph run and its consumer before the overflow policy applies
+STREAM_QUEUE_HIGH_WATER = int(os.getenv("STREAM_QUEUE_HIGH_WATER", "256"))
+# block: pause the producer; coalesce: merge tokens into the newest queued token, otherwise block;
+# drop: discard node events, otherwise block
+STREAM_QUEUE_POLICY = os.getenv("STREAM_QUEUE_POLICY", "block").lower()
+STREAM_QUEUE_POLICIES = ("block", "coalesce", "drop")
+DROPPABLE_EVENT_TYPES = frozenset({"node_start", "node_end"})
+
+
+def is_token_event(event: Any) -> bool:
+    return isinstance(event, dict) and event.get("type") == "token" and isinstance(event.get("data"), str)
+
+
+async def coalesce_token_events(
+    events: AsyncIterator[Any],
+    window_ms: float = TOKEN_COALESCE_WINDOW_MS,
+    max_bytes: int = TOKEN_COALESCE_MAX_BYTES
+) -> AsyncIterator[Any]:
+    """Merge consecutive ``token`` events into fewer, larger ones.
+
+    Buffered tokens are flushed as a single ``{"type": "token"}`` event when the
+    window since the first buffered token elapses, when the buffer reaches
+    ``max_bytes``, or before any other event so that ordering is preserved.
+
+    Args:
+        events: Event stream, typically from ``ChatAgent.query``
+        window_ms: Longest time a token may wait in the buffer
+        max_bytes: Buffered UTF-8 size that forces a flush
+
+    Yields:
+        The input events with runs of tokens concatenated
+    """
+    if window_ms <= 0:
+        async for event in events:
+            yield event
+        return
+
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    window = window_ms / 1000
+    buffer: List[str] = []
+    buffered_bytes = 0
+    deadline = 0.0
+    pending = None
+
+    def flush() -> dict:
+        nonlocal buffered_bytes
+        event = {"type": "token", "data": "".join(buffer)}
+        buffer.clear()
+        buffered_bytes = 0
+        return event
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            if buffer:
+                done, _ = await asyncio.wait({pending}, timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    yield flush()
+                    continue
+
+            try:
+                event = await pending
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if is_token_event(event):
+                if not buffer:
+                    deadline = loop.time() + window
+                buffer.append(event["data"])
+                buffered_bytes += len(event["data"].encode("utf-8"))
+                if buffered_bytes >= max_bytes:
+                    yield flush()
+            else:
+                if buffer:
+                    yield flush()
+                yield event
+
+        if buffer:
+            yield flush()
+    finally:
+        # Propagate early termination upstream and wait for its cleanup, so that e.g. a
+        # cancelled agent run has persisted its partial turn before the caller moves on
+        if pending is not None:
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await pending
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class StreamQueueMetrics:
+    """Aggregate depth and overflow counters across all event queues of an agent."""
+
+    def __init__(self):
+        self._queues: "weakref.WeakSet[EventQueue]" = weakref.WeakSet()
+        self.streams = 0
+        self.slow_streams = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def track(self, queue: "EventQueue") -> None:
+        self._queues.add(queue)
+        self.streams += 1
+
+    def finish(self, queue: "EventQueue") -> None:
+        """Account a finished stream; streams that hit the high-water mark count as slow."""
+        self._queues.discard(queue)
+        if queue.overflows:
+            self.slow_streams += 1
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [queue.qsize() for queue in self._queues]
+        return {
+            "active_streams": len(depths),
+            "current_depth": sum(depths),
+            "deepest_active_queue": max(depths, default=0),
+            "max_depth": self.max_depth,
+            "streams": self.streams,
+            "slow_streams": self.slow_streams,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "coalesced_events": self.coalesced,
+            "dropped_events": self.dropped,
+        }
+
+
+class EventQueue(asyncio.Queue):
+    """Queue between a graph run and its consumer with a high-water mark.
+
+    ``put_event`` applies the overflow policy once ``high_water`` items are queued.
+    Plain ``put``/``put_nowait`` never block and are meant for the few control
+    items (final answer, end-of-stream marker) that must always get through.
+    """
+
+    def __init__(
+        self,
+        high_water: int = STREAM_QUEUE_HIGH_WATER,
+        policy: str = STREAM_QUEUE_POLICY,
+        metrics: Optional[StreamQueueMetrics] = None
+    ):
+        """Initialize the queue.
+
+        Args:
+            high_water: Queued items at which the overflow policy applies, 0 for unbounded
+            policy: One of "block", "coalesce" or "drop"
+            metrics: Shared metrics to report depth and overflow counters to
+        """
+        super().__init__()
+        if policy not in STREAM_QUEUE_POLICIES:
+            raise ValueError(f"Unknown stream queue policy '{policy}', expected one of {STREAM_QUEUE_POLICIES}")
+        self.high_water = high_water
+        self.policy = policy
+        self.metrics = metrics
+        self.max_depth = 0
+        self.overflows = 0
+        self.blocked_seconds = 0.0
+        self.coalesced = 0
+        self.dropped = 0
+        self._below_high_water = asyncio.Event()
+        self._below_high_water.set()
+        if metrics is not None:
+            metrics.track(self)
+
+    def _over_high_water(self) -> bool:
+        return 0 < self.high_water <= self.qsize()
+
+    def _put(self, item: Any) -> None:
+        super()._put(item)
+        depth = self.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+            if self.metrics is not None and depth > self.metrics.max_depth:
+                self.metrics.max_depth = depth
+
+    def _get(self) -> Any:
+        item = super()._get()
+        if not self._over_high_water():
+            self._below_high_water.set()
+        return item
+
+    async def put_event(self, event: Any) -> None:
+        """Queue a streamed event, applying the overflow policy above the high-water mark."""
+        if not self._over_high_water():
+            self.put_nowait(event)
+            return
+
+        self.overflows += 1
+        if self.policy == "coalesce" and is_token_event(event) and self._queue and is_token_event(self._queue[-1]):
+            tail = self._queue[-1]
+            self._queue[-1] = {**tail, "data": tail["data"] + event["data"]}
+            self.coalesced += 1
+            if self.metrics is not None:
+                self.metrics.coalesced += 1
+            return
+        if self.policy == "drop" and isinstance(event, dict) and event.get("type") in DROPPABLE_EVENT_TYPES:
+            self.dropped += 1
+            if self.metrics is not None:
+                self.metrics.dropped += 1
+            return
+
+        start = time.monotonic()
+        try:
+            while self._over_high_water():
+                self._below_high_water.clear()
+                await self._below_high_water.wait()
+        finally:
+            blocked = time.monotonic() - start
+            self.blocked_seconds += blocked
+            if self.metrics is not None:
+                self.metrics.blocked_seconds += blocked
+        self.put_nowait(event)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.qsize(),
+            "max_depth": self.max_depth,
+            "overflows": self.overflows,
+            "blocked_ms": round(self.blocked_seconds * 1000, 1),
+            "coalesced_events": self.coalesced,
+            "dropped_events": self.dropped,
+        }
@@ -0,0 +1,151 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Tests of fair-share ordering and slot accounting in FairScheduler."""
+import asyncio
+
+import pytest
+
+from admission import FairScheduler
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def hold(scheduler, flow, release):
+    async with scheduler.slot(flow):
+        await release.wait()
+
+
+async def request(scheduler, flow, admitted):
+    async with scheduler.slot(flow):
+        admitted.append(flow)
+
+
+def test_backlogged_flows_are_admitted_in_proportion_to_weight():
+    async def run():
+        scheduler = FairScheduler("http://llm.test", max_concurrency=1, weights={"agent": 2, "tool": 1})
+        release = asyncio.Event()
+        blocker = asyncio.create_task(hold(scheduler, "blocker", release))
+        await settle()
+        admitted = []
+        tasks = []
+        for _ in range(4):
+            for flow in ("agent", "tool"):
+                tasks.append(asyncio.create_task(request(scheduler, flow, admitted)))
+                await settle()
+        assert scheduler.queue_length == 8 and scheduler.in_flight == 1
+        release.set()
+        await asyncio.gather(blocker, *tasks)
+        return scheduler, admitted
+
+    scheduler, admitted = asyncio.run(run())
+    # Finish tags: agent 0.5, 1, 1.5, 2 and tool 1, 2, 3, 4; ties go to the earlier request
+    assert admitted == ["agent", "tool", "agent", "agent", "tool", "agent", "tool", "tool"]
+    assert scheduler.in_flight == 0 and scheduler.queue_length == 0
+    assert scheduler.queued == 8 and scheduler.admitted == 9
+
+
+def test_waiters_are_told_their_queue_position():
+    async def run():
+        scheduler = FairScheduler("http://llm.test", max_concurrency=1, weights={})
+        release = asyncio.Event()
+        blocker = asyncio.create_task(hold(scheduler, "blocker", release))
+        await settle()
+        positions = []
+
+        async def on_position(position):
+            positions.append(position)
+
+        first = asyncio.create_task(hold(scheduler, "a", release))
+        await settle()
+        second = asyncio.create_task(request_with_position(scheduler, on_position))
+        await settle()
+        first.cancel()
+        await settle()
+        release.set()
+        await asyncio.gather(blocker, second)
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return positions
+
+    async def request_with_position(scheduler, on_position):
+        async with scheduler.slot("b", on_position=on_position):
+            pass
+
+    assert asyncio.run(run()) == [2, 1]
+
+
+def test_slot_is_released_when_the_block_raises():
+    async def run():
+        scheduler = FairScheduler("http://llm.test", max_concurrency=1)
+        with pytest.raises(ValueError):
+            async with scheduler.slot("agent"):
+                raise ValueError("upstream failed")
+        assert scheduler.in_flight == 0
+        admitted = []
+        await asyncio.wait_for(request(scheduler, "agent", admitted), timeout=5)
+        return scheduler, admitted
+
+    scheduler, admitted = asyncio.run(run())
+    assert admitted == ["agent"]
+    assert scheduler.in_flight == 0
+
+
+def test_slot_is_handed_on_when_the_holder_is_cancelled():
+    async def run():
+        scheduler = FairScheduler("http://llm.test", max_concurrency=1)
+        holder = asyncio.create_task(hold(scheduler, "agent", asyncio.Event()))
+        await settle()
+        admitted = []
+        waiter = asyncio.create_task(request(scheduler, "tool", admitted))
+        await settle()
+        assert scheduler.queue_length == 1
+        holder.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await holder
+        await asyncio.wait_for(waiter, timeout=5)
+        return scheduler, admitted
+
+    scheduler, admitted = asyncio.run(run())
+    assert admitted == ["tool"]
+    assert scheduler.in_flight == 0 and scheduler.queue_length == 0
+
+
+def test_cancelled_waiter_gives_up_its_place_without_taking_a_slot():
+    async def run():
+        scheduler = FairScheduler("http://llm.test", max_concurrency=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(scheduler, "agent", release))
+        await settle()
+        admitted = []
+        cancelled = asyncio.create_task(request(scheduler, "agent", admitted))
+        await settle()
+        waiter = asyncio.create_task(request(scheduler, "tool", admitted))
+        await settle()
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert scheduler.queue_length == 1 and scheduler.in_flight == 1
+        release.set()
+        await asyncio.wait_for(asyncio.gather(holder, waiter), timeout=5)
+        return scheduler, admitted
+
+    scheduler, admitted = asyncio.run(run())
+    assert admitted == ["tool"]
+    assert scheduler.in_flight == 0 and scheduler.queue_length == 0
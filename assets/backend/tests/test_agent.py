@@ -0,0 +1,77 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Tests of how the tool node joins or discards eagerly dispatched tool calls."""
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from stubs import build_stub_agent
+
+
+class SlowTool:
+    """Tool that records its calls and blocks until cancelled on the first one."""
+
+    def __init__(self):
+        self.calls = []
+        self.cancelled = False
+
+    async def ainvoke(self, args):
+        self.calls.append(args)
+        if len(self.calls) == 1:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+        return f"result for {args['query']}"
+
+
+def run_tool_node(eager_args, final_args):
+    agent = build_stub_agent()
+    tool = SlowTool()
+    agent.tools_by_name = {"search": tool}
+    events = []
+
+    async def stream_callback(event):
+        events.append(event)
+
+    async def run():
+        state = {"chat_id": "chat", "messages": [HumanMessage(content="hi")], "iterations": 0}
+        eager_call = {"name": "search", "args": eager_args, "id": "call_0", "type": "tool_call"}
+        task = asyncio.create_task(agent._execute_tool_call(eager_call, 0, None, state, stream_callback))
+        await asyncio.sleep(0.01)
+        eager_tasks = {"call_0": (eager_call, task)}
+        final_call = {**eager_call, "args": final_args}
+        state["messages"].append(AIMessage(content="", tool_calls=[final_call]))
+        config = {"configurable": {"stream_callback": stream_callback, "eager_tool_tasks": eager_tasks}}
+        result = await agent.tool_node(state, config)
+        return result, task, eager_tasks
+
+    result, task, eager_tasks = asyncio.run(run())
+    return tool, events, result, task, eager_tasks
+
+
+def test_mismatched_eager_call_is_cancelled_and_closed():
+    tool, events, result, task, eager_tasks = run_tool_node({"query": "a"}, {"query": "ab"})
+
+    assert task.cancelled() and tool.cancelled
+    assert not eager_tasks
+    assert tool.calls == [{"query": "a"}, {"query": "ab"}]
+    tool_events = [event for event in events if event["type"] in ("tool_start", "tool_end")]
+    assert [event["type"] for event in tool_events] == ["tool_start", "tool_end", "tool_start", "tool_end"]
+    assert tool_events[1]["status"] == "cancelled"
+    assert result["messages"][-1].content == "result for ab"
@@ -0,0 +1,97 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Tests of the retries StreamHedger makes before a stream has started."""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from hedging import StreamHedger, is_retryable, retry_after
+from stubs import StubCompletions, build_stub_agent
+
+
+def status_error(error_class, status_code: int, headers=None):
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return error_class(f"status {status_code}", response=response, body=None)
+
+
+class FlakyCompletions(StubCompletions):
+    """Fails the first requests with the given errors, then streams the stub reply."""
+
+    def __init__(self, errors, **kwargs):
+        super().__init__(**kwargs)
+        self.errors = list(errors)
+        self.attempts = 0
+
+    async def create(self, *args, **kwargs):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return await super().create(*args, **kwargs)
+
+
+@pytest.mark.parametrize("error,expected", [
+    (status_error(openai.RateLimitError, 429), True),
+    (status_error(openai.InternalServerError, 503), True),
+    (status_error(openai.APIStatusError, 408), True),
+    (status_error(openai.ConflictError, 409), True),
+    (openai.APITimeoutError(httpx.Request("POST", "http://llm.test")), True),
+    (status_error(openai.RateLimitError, 429, {"x-should-retry": "false"}), False),
+    (status_error(openai.BadRequestError, 400), False),
+    (status_error(openai.AuthenticationError, 401), False),
+    (ValueError("not an API error"), False),
+])
+def test_is_retryable_follows_sdk_rules(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_retry_after_reads_headers():
+    assert retry_after(status_error(openai.RateLimitError, 429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after(status_error(openai.RateLimitError, 429, {"retry-after": "2"})) == 2.0
+    assert retry_after(status_error(openai.RateLimitError, 429)) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_turn_completes_after_rate_limit():
+    agent = build_stub_agent(tokens_per_reply=3)
+    completions = FlakyCompletions([status_error(openai.RateLimitError, 429, {"retry-after-ms": "10"})], tokens_per_reply=3)
+    agent.model_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    agent.stream_hedger = StreamHedger(hedging=False, max_retries=2)
+
+    async def run():
+        return [event async for event in agent.query(query_text="hello", chat_id="chat")]
+
+    events = asyncio.run(run())
+
+    assert not [event for event in events if isinstance(event, dict) and event.get("type") == "error"]
+    tokens = [event["data"] for event in events if isinstance(event, dict) and event.get("type") == "token"]
+    assert "".join(tokens) == "<hello:0><hello:1><hello:2>"
+    assert completions.attempts == 2
+    assert agent.stream_hedger.retries == 1
+
+
+def test_non_retryable_error_is_raised_without_retrying():
+    completions = FlakyCompletions([status_error(openai.BadRequestError, 400)])
+    hedger = StreamHedger(hedging=False, max_retries=2)
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(hedger.open(lambda: completions.create(model="m", messages=[], stream=True)))
+    assert completions.attempts == 1
+    assert hedger.retries == 0
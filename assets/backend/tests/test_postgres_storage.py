@@ -0,0 +1,233 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Tests of PostgreSQLConversationStorage's per-message writes and paging, against an in-memory fake connection."""
+import asyncio
+import contextlib
+import json
+from typing import Dict, List, Optional
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from postgres_storage import PostgreSQLConversationStorage
+
+
+class FakeConnection:
+    """Executes the statements the storage issues for messages against in-memory tables."""
+
+    def __init__(self):
+        self.messages: Dict[str, Dict[int, str]] = {}
+        self.message_counts: Dict[str, int] = {}
+        self.upserted: List[tuple] = []
+        self.deleted_from: List[int] = []
+
+    def transaction(self):
+        return contextlib.nullcontext()
+
+    async def execute(self, query: str, *args):
+        query = " ".join(query.split())
+        if query.startswith("INSERT INTO conversations"):
+            chat_id, count = args
+            self.message_counts[chat_id] = count
+        elif query.startswith("DELETE FROM messages WHERE chat_id = $1 AND seq >= $2"):
+            chat_id, start = args
+            self.deleted_from.append(start)
+            rows = self.messages.get(chat_id, {})
+            for seq in [seq for seq in rows if seq >= start]:
+                del rows[seq]
+        else:
+            raise AssertionError(f"unexpected statement: {query}")
+
+    async def executemany(self, query: str, rows):
+        assert " ".join(query.split()).startswith("INSERT INTO messages")
+        for chat_id, seq, message in rows:
+            self.upserted.append((chat_id, seq))
+            self.messages.setdefault(chat_id, {})[seq] = message
+
+    async def fetch(self, query: str, *args):
+        query = " ".join(query.split())
+        if query.startswith("SELECT message FROM messages"):
+            (chat_id,) = args
+            rows = self.messages.get(chat_id, {})
+            return [{"message": rows[seq]} for seq in sorted(rows)]
+        if query.startswith("SELECT seq, message FROM messages"):
+            chat_id, before, since, limit, offset = args
+            seqs = sorted(
+                (seq for seq in self.messages.get(chat_id, {})
+                 if (before is None or seq < before) and (since is None or seq >= since)),
+                reverse=True,
+            )
+            seqs = seqs[offset:] if limit is None else seqs[offset:offset + limit]
+            return [{"seq": seq, "message": self.messages[chat_id][seq]} for seq in seqs]
+        raise AssertionError(f"unexpected query: {query}")
+
+    async def fetchval(self, query: str, *args):
+        query = " ".join(query.split())
+        if query.startswith("SELECT message_count FROM conversations"):
+            return self.message_counts.get(args[0])
+        raise AssertionError(f"unexpected query: {query}")
+
+    def stored(self, chat_id: str) -> List[str]:
+        rows = self.messages.get(chat_id, {})
+        assert sorted(rows) == list(range(len(rows))), "stored sequence numbers must be contiguous"
+        return [json.loads(rows[seq])["content"] for seq in sorted(rows)]
+
+
+class FakePool:
+    def __init__(self, conn: FakeConnection):
+        self.conn = conn
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+def make_conversation(turns: int, system_prompt: str = "system") -> list:
+    messages = [SystemMessage(content=system_prompt)]
+    for i in range(turns):
+        messages += [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+    return messages
+
+
+@pytest.fixture
+def storage():
+    storage = PostgreSQLConversationStorage()
+    storage.pool = FakePool(FakeConnection())
+    return storage
+
+
+def save(storage: PostgreSQLConversationStorage, chat_id: str, messages: list) -> None:
+    asyncio.run(storage.save_messages_immediate(chat_id, messages))
+
+
+def test_write_appends_only_new_messages(storage):
+    conn = storage.pool.conn
+    messages = make_conversation(2)
+    save(storage, "chat", messages)
+    assert conn.upserted == [("chat", seq) for seq in range(5)]
+
+    conn.upserted.clear()
+    messages = messages + [HumanMessage(content="question 2"), AIMessage(content="answer 2")]
+    save(storage, "chat", messages)
+
+    assert conn.upserted == [("chat", 5), ("chat", 6)]
+    assert conn.deleted_from == []
+    assert conn.message_counts["chat"] == 7
+    assert conn.stored("chat") == [message.content for message in messages]
+
+
+def test_write_updates_changed_system_prompt_in_place(storage):
+    conn = storage.pool.conn
+    messages = make_conversation(2)
+    save(storage, "chat", messages)
+
+    conn.upserted.clear()
+    # The agent rebuilds the system prompt each turn, e.g. with image context appended
+    updated = [SystemMessage(content="system with image context")] + [
+        type(message)(content=message.content) for message in messages[1:]
+    ]
+    save(storage, "chat", updated)
+
+    assert conn.upserted == [("chat", 0)]
+    assert conn.deleted_from == []
+    assert conn.stored("chat")[0] == "system with image context"
+
+
+def test_write_truncates_rows_beyond_the_new_end(storage):
+    conn = storage.pool.conn
+    messages = make_conversation(3)
+    save(storage, "chat", messages)
+
+    conn.upserted.clear()
+    save(storage, "chat", messages[:3])
+
+    assert conn.upserted == []
+    assert conn.deleted_from == [3]
+    assert conn.message_counts["chat"] == 3
+    assert conn.stored("chat") == [message.content for message in messages[:3]]
+
+
+def test_write_diffs_against_stored_rows_when_snapshot_is_evicted(storage):
+    conn = storage.pool.conn
+    messages = make_conversation(2)
+    save(storage, "chat", messages)
+    storage._persisted.pop("chat")
+
+    conn.upserted.clear()
+    messages = messages + [HumanMessage(content="question 2")]
+    save(storage, "chat", messages)
+
+    assert conn.upserted == [("chat", 5)]
+    assert conn.stored("chat") == [message.content for message in messages]
+
+
+PAGE_CASES = [
+    # limit, offset, before, since
+    (None, 0, None, None),
+    (3, 0, None, None),
+    (3, 2, None, None),
+    (3, 0, 4, None),
+    (3, 1, 4, None),
+    (4, 0, 2, None),
+    (20, 0, None, None),
+    (3, 0, 100, None),
+    (3, 20, None, None),
+    (0, 0, None, None),
+    (None, 0, None, 8),
+    (2, 0, None, 8),
+    (None, 0, None, 11),
+    (None, 0, None, 15),
+    (3, 0, 5, 3),
+]
+
+
+@pytest.mark.parametrize("limit,offset,before,since", PAGE_CASES)
+def test_cached_page_matches_sql_page(storage, limit: Optional[int], offset: int, before: Optional[int], since: Optional[int]):
+    messages = make_conversation(5)
+    save(storage, "chat", messages)
+    contents = [message.content for message in messages]
+
+    cached = asyncio.run(storage.get_message_page("chat", limit, offset, before, since))
+    storage._message_cache.pop("chat")
+    from_sql = asyncio.run(storage.get_message_page("chat", limit, offset, before, since))
+
+    end = len(contents) if before is None else min(before, len(contents))
+    expected = [(seq, content) for seq, content in enumerate(contents)
+                if seq < end and (since is None or seq >= since)][::-1][offset:]
+    if limit is not None:
+        expected = expected[:limit]
+    expected.reverse()
+
+    assert [message.content for message in cached.messages] == [content for _, content in expected]
+    assert [message.content for message in from_sql.messages] == [content for _, content in expected]
+    assert cached.total == from_sql.total == len(contents)
+    if expected:
+        assert cached.start_seq == from_sql.start_seq == expected[0][0]
+
+
+def test_page_walk_with_before_cursor_reaches_the_system_prompt(storage):
+    messages = make_conversation(5)
+    save(storage, "chat", messages)
+
+    page = asyncio.run(storage.get_message_page("chat", limit=4))
+    seen = list(page.messages)
+    while page.has_more:
+        page = asyncio.run(storage.get_message_page("chat", limit=4, before=page.start_seq))
+        seen = page.messages + seen
+
+    assert [message.content for message in seen] == [message.content for message in messages]
+    assert not asyncio.run(storage.get_message_page("chat", limit=10)).has_more
@@ -0,0 +1,187 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Tests of token coalescing and the overflow policies of EventQueue."""
+import asyncio
+
+import pytest
+
+from streaming import EventQueue, StreamQueueMetrics, coalesce_token_events
+
+
+def token(data):
+    return {"type": "token", "data": data}
+
+
+class Upstream:
+    """Async generator wrapper that records whether it was closed."""
+
+    def __init__(self, events, hang=False):
+        self.events = events
+        self.hang = hang
+        self.closed = False
+
+    async def __aiter__(self):
+        try:
+            for event in self.events:
+                await asyncio.sleep(0)
+                yield event
+            if self.hang:
+                await asyncio.sleep(60)
+        finally:
+            self.closed = True
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+def test_tokens_are_merged_and_flushed_before_other_events():
+    upstream = Upstream([token("a"), token("b"), {"type": "node_end"}, token("c")])
+
+    events = asyncio.run(collect(coalesce_token_events(upstream.__aiter__(), window_ms=1000)))
+
+    assert events == [token("ab"), {"type": "node_end"}, token("c")]
+    assert upstream.closed
+
+
+def test_buffer_is_flushed_when_max_bytes_is_reached():
+    upstream = Upstream([token("ab"), token("cd"), token("e")])
+
+    events = asyncio.run(collect(coalesce_token_events(upstream.__aiter__(), window_ms=1000, max_bytes=4)))
+
+    assert events == [token("abcd"), token("e")]
+
+
+def test_buffer_is_flushed_when_window_elapses_on_a_stalled_stream():
+    upstream = Upstream([token("a"), token("b")], hang=True)
+
+    async def run():
+        stream = coalesce_token_events(upstream.__aiter__(), window_ms=10)
+        first = await asyncio.wait_for(stream.__anext__(), timeout=5)
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(run()) == token("ab")
+    assert upstream.closed
+
+
+def test_closing_early_closes_upstream():
+    upstream = Upstream([{"type": "node_start"}, token("a")], hang=True)
+
+    async def run():
+        stream = coalesce_token_events(upstream.__aiter__(), window_ms=1000)
+        assert await stream.__anext__() == {"type": "node_start"}
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert upstream.closed
+
+
+def test_cancelling_consumer_closes_upstream():
+    upstream = Upstream([token("a")], hang=True)
+
+    async def run():
+        task = asyncio.create_task(collect(coalesce_token_events(upstream.__aiter__(), window_ms=1000)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert upstream.closed
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        EventQueue(policy="spill")
+
+
+def test_block_policy_waits_until_consumer_drains():
+    async def run():
+        metrics = StreamQueueMetrics()
+        queue = EventQueue(high_water=2, policy="block", metrics=metrics)
+        await queue.put_event(token("a"))
+        await queue.put_event(token("b"))
+        producer = asyncio.create_task(queue.put_event(token("c")))
+        await asyncio.sleep(0.01)
+        assert not producer.done() and queue.qsize() == 2
+        assert await queue.get() == token("a")
+        await asyncio.wait_for(producer, timeout=5)
+        return queue, metrics, [queue.get_nowait() for _ in range(queue.qsize())]
+
+    queue, metrics, rest = asyncio.run(run())
+    assert rest == [token("b"), token("c")]
+    assert queue.overflows == 1 and queue.blocked_seconds > 0
+    assert metrics.blocked_seconds == queue.blocked_seconds
+    assert metrics.max_depth == 2
+
+
+def test_coalesce_policy_merges_tokens_into_queued_tail():
+    async def run():
+        metrics = StreamQueueMetrics()
+        queue = EventQueue(high_water=2, policy="coalesce", metrics=metrics)
+        for data in "abcd":
+            await queue.put_event(token(data))
+        return queue, metrics, [queue.get_nowait() for _ in range(queue.qsize())]
+
+    queue, metrics, events = asyncio.run(run())
+    assert events == [token("a"), token("bcd")]
+    assert queue.coalesced == 2 and metrics.coalesced == 2
+    assert queue.blocked_seconds == 0
+
+
+def test_coalesce_policy_blocks_for_other_events():
+    async def run():
+        queue = EventQueue(high_water=1, policy="coalesce")
+        await queue.put_event(token("a"))
+        producer = asyncio.create_task(queue.put_event({"type": "tool_start", "data": "search"}))
+        await asyncio.sleep(0.01)
+        assert not producer.done()
+        await queue.get()
+        await asyncio.wait_for(producer, timeout=5)
+        return queue.get_nowait()
+
+    assert asyncio.run(run()) == {"type": "tool_start", "data": "search"}
+
+
+def test_drop_policy_discards_node_events_only():
+    async def run():
+        metrics = StreamQueueMetrics()
+        queue = EventQueue(high_water=1, policy="drop", metrics=metrics)
+        await queue.put_event(token("a"))
+        await queue.put_event({"type": "node_start", "data": "generate"})
+        await queue.put_event({"type": "node_end", "data": "generate"})
+        producer = asyncio.create_task(queue.put_event(token("b")))
+        await asyncio.sleep(0.01)
+        assert not producer.done()
+        await queue.get()
+        await asyncio.wait_for(producer, timeout=5)
+        return queue, metrics, queue.get_nowait()
+
+    queue, metrics, event = asyncio.run(run())
+    assert event == token("b")
+    assert queue.dropped == 2 and metrics.dropped == 2
+
+
+def test_control_items_bypass_the_high_water_mark():
+    async def run():
+        queue = EventQueue(high_water=1, policy="block")
+        await queue.put_event(token("a"))
+        queue.put_nowait(None)
+        return queue.qsize()
+
+    assert asyncio.run(run()) == 2
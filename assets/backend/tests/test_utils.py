@@ -0,0 +1,53 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Tests of the memoized LangGraph to OpenAI message conversion."""
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from utils import convert_langgraph_messages_to_openai
+
+
+def test_conversion_is_reused_for_unchanged_messages():
+    messages = [HumanMessage(content="hi"), AIMessage(content="hello")]
+
+    first = convert_langgraph_messages_to_openai(messages)
+    second = convert_langgraph_messages_to_openai(messages)
+
+    assert first == [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    assert all(a is b for a, b in zip(first, second))
+
+
+def test_tool_call_args_edited_in_place_are_reconverted():
+    message = AIMessage(content="", tool_calls=[{"name": "search", "args": {"query": "a"}, "id": "call_0"}])
+    convert_langgraph_messages_to_openai([message])
+
+    message.tool_calls[0]["args"]["query"] = "b"
+    converted = convert_langgraph_messages_to_openai([message])
+
+    assert json.loads(converted[0]["tool_calls"][0]["function"]["arguments"]) == {"query": "b"}
+
+
+def test_tool_call_appended_in_place_is_reconverted():
+    message = AIMessage(content="", tool_calls=[{"name": "search", "args": {"query": "a"}, "id": "call_0"}])
+    convert_langgraph_messages_to_openai([message])
+
+    message.tool_calls.append({"name": "search", "args": {"query": "b"}, "id": "call_1", "type": "tool_call"})
+    converted = convert_langgraph_messages_to_openai([message, ToolMessage(content="result", tool_call_id="call_0")])
+
+    assert [tc["id"] for tc in converted[0]["tool_calls"]] == ["call_0", "call_1"]
+    assert converted[1] == {"role": "tool", "content": "result", "tool_call_id": "call_0"}
@@ -0,0 +1,133 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Result cache for deterministic MCP tools.
+
+Results are keyed on tool name and canonicalized arguments. Tools that read the
+document index are additionally keyed on the selected sources and an index
+version that is bumped whenever new documents are indexed.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from caching import LRUCache
+from logger import logger
+from utils import parse_tool_settings
+
+
+TOOL_CACHE_TTLS = parse_tool_settings(
+    os.getenv("TOOL_CACHE_TTLS", "search_documents=300,get_weather=60,get_rain_forecast=60"),
+    cast=float,
+)
+TOOL_CACHE_INDEX_TOOLS = [
+    name.strip() for name in os.getenv("TOOL_CACHE_INDEX_TOOLS", "search_documents").split(",") if name.strip()
+]
+TOOL_CACHE_MAX_BYTES = int(os.getenv("TOOL_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+class ToolResultCache:
+    """Per-tool opt-in cache of tool outputs with TTL and a memory-bounded LRU.
+
+    Only tools with a configured TTL are cached. Any object exposing the same
+    ``get``/``set``/``ttl``/``invalidate_index``/``stats`` methods can be assigned to
+    ``ChatAgent.tool_cache`` to swap in a different backend.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        index_tools: Optional[Iterable[str]] = None,
+        max_bytes: int = TOOL_CACHE_MAX_BYTES
+    ):
+        """Initialize the tool result cache.
+
+        Args:
+            ttls: Mapping of tool name to TTL in seconds; tools not listed are never cached
+            index_tools: Tools whose results depend on the document index and selected sources
+            max_bytes: Memory budget for cached results
+        """
+        self.ttls = dict(TOOL_CACHE_TTLS if ttls is None else ttls)
+        self.index_tools = set(TOOL_CACHE_INDEX_TOOLS if index_tools is None else index_tools)
+        self.index_version = 0
+        self._cache = LRUCache(max_bytes=max_bytes, name="tool_results")
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return self.ttls.get(tool_name, 0) > 0
+
+    def ttl(self, tool_name: str) -> float:
+        """Seconds a result of the tool stays valid, 0 for tools that are never cached."""
+        return self.ttls.get(tool_name, 0)
+
+    def depends_on_index(self, tool_name: str) -> bool:
+        return tool_name in self.index_tools
+
+    def _key(self, tool_name: str, args: Dict[str, Any], sources: Optional[List[str]]) -> tuple:
+        canonical_args = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+        if self.depends_on_index(tool_name):
+            return (tool_name, canonical_args, tuple(sorted(sources or [])), self.index_version)
+        return (tool_name, canonical_args)
+
+    def get(self, tool_name: str, args: Dict[str, Any], sources: Optional[List[str]] = None) -> Optional[str]:
+        """Return the cached output of a tool call, or None on a miss.
+
+        Args:
+            tool_name: Name of the tool
+            args: Arguments of the call
+            sources: Selected document sources, used for index-dependent tools
+        """
+        if not self.is_cacheable(tool_name):
+            return None
+        return self._cache.get(self._key(tool_name, args, sources))
+
+    def set(
+        self,
+        tool_name: str,
+        args: Dict[str, Any],
+        content: str,
+        sources: Optional[List[str]] = None,
+        index_version: Optional[int] = None
+    ) -> None:
+        """Cache the output of a successful tool call.
+
+        Args:
+            tool_name: Name of the tool
+            args: Arguments of the call
+            content: Output of the call
+            sources: Selected document sources, used for index-dependent tools
+            index_version: ``index_version`` read before the call was made; results of
+                index-dependent calls that overlapped an invalidation are dropped
+        """
+        if not self.is_cacheable(tool_name):
+            return
+        if index_version is not None and index_version != self.index_version and self.depends_on_index(tool_name):
+            logger.debug({"message": "Dropped tool result computed against a stale index", "tool": tool_name})
+            return
+        self._cache.set(self._key(tool_name, args, sources), content, ttl=self.ttls[tool_name])
+
+    def invalidate_index(self) -> None:
+        """Drop results of index-dependent tools after the document index or source selection changed."""
+        self.index_version += 1
+        dropped = 0
+        for key in self._cache.keys():
+            if key[0] in self.index_tools:
+                self._cache.pop(key)
+                dropped += 1
+        logger.debug({"message": "Invalidated cached index-dependent tool results", "dropped": dropped, "index_version": self.index_version})
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "index_version": self.index_version}
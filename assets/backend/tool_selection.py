@@ -0,0 +1,222 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Per-request selection of the tool schemas sent to the model.
+
+Tools are scored against the latest user turn by IDF-weighted keyword overlap
+with their name, description and parameters, optionally combined with the
+cosine similarity of embeddings. Only the top-k are sent, together with tools
+already used in the conversation and ``explain_image`` when an image is attached.
+"""
+
+import json
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+import numpy as np
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+
+from logger import logger
+
+if TYPE_CHECKING:
+    from postgres_storage import StoredImage
+
+
+TOOL_SELECTION_ENABLED = os.getenv("TOOL_SELECTION_ENABLED", "false").lower() == "true"
+TOOL_SELECTION_TOP_K = int(os.getenv("TOOL_SELECTION_TOP_K", "3"))
+TOOL_SELECTION_EMBEDDINGS = os.getenv("TOOL_SELECTION_EMBEDDINGS", "false").lower() == "true"
+# Tools sent when nothing in the user turn matches any tool
+TOOL_SELECTION_DEFAULT = [
+    name.strip() for name in os.getenv("TOOL_SELECTION_DEFAULT", "search_documents").split(",") if name.strip()
+]
+IMAGE_TOOL = "explain_image"
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "you", "your", "can", "will",
+    "use", "using", "into", "about", "what", "how", "when", "which", "who", "does", "have", "has",
+    "not", "but", "all", "any", "its", "get", "tool", "please", "should", "must", "str", "string",
+})
+
+
+def _words(text: str) -> Set[str]:
+    return {word for word in _WORD_RE.findall(text.lower().replace("_", " ")) if len(word) > 2 and word not in _STOPWORDS}
+
+
+def _tool_name(tool: Dict[str, Any]) -> str:
+    return tool["function"]["name"]
+
+
+def _tool_text(tool: Dict[str, Any]) -> str:
+    function = tool["function"]
+    parameters = function.get("parameters", {}).get("properties", {})
+    parameter_text = " ".join(f"{name} {spec.get('description', '')}" for name, spec in parameters.items())
+    return f"{function['name']} {function.get('description', '')} {parameter_text}"
+
+
+@dataclass
+class ToolSelection:
+    """Tools chosen for a request and the schema tokens they cost."""
+    tools: List[Dict[str, Any]]
+    schema_tokens: int = 0
+    saved_tokens: int = 0
+
+
+class ToolSelector:
+    """Chooses which tool schemas to send to the model for a request."""
+
+    def __init__(
+        self,
+        top_k: int = TOOL_SELECTION_TOP_K,
+        embeddings=None,
+        default_tools: Optional[List[str]] = None,
+        count_tokens=None
+    ):
+        """Initialize the selector.
+
+        Args:
+            top_k: Number of best-scoring tools to send
+            embeddings: Optional LangChain embeddings model for semantic scoring
+            default_tools: Tools to send when no tool matches the user turn
+            count_tokens: Function counting the tokens of a text, used to report savings
+        """
+        self.top_k = top_k
+        self.embeddings = embeddings
+        self.default_tools = list(TOOL_SELECTION_DEFAULT if default_tools is None else default_tools)
+        self.count_tokens = count_tokens or (lambda text: len(text) // 4)
+
+        self._index_key = None
+        self._tool_words: Dict[str, Set[str]] = {}
+        self._idf: Dict[str, float] = {}
+        self._schema_tokens: Dict[str, int] = {}
+        self._tool_vectors: Dict[str, np.ndarray] = {}
+
+        self.requests = 0
+        self.tools_offered = 0
+        self.tools_sent = 0
+        self.schema_tokens_total = 0
+        self.schema_tokens_saved = 0
+
+    def _index(self, tools: List[Dict[str, Any]]) -> None:
+        """(Re)build keyword statistics and schema sizes when the tool list changes."""
+        key = tuple(_tool_name(tool) for tool in tools)
+        if key == self._index_key:
+            return
+        self._index_key = key
+        self._tool_words = {_tool_name(tool): _words(_tool_text(tool)) for tool in tools}
+        document_frequency: Dict[str, int] = {}
+        for words in self._tool_words.values():
+            for word in words:
+                document_frequency[word] = document_frequency.get(word, 0) + 1
+        self._idf = {word: math.log(1 + len(tools) / df) for word, df in document_frequency.items()}
+        self._schema_tokens = {_tool_name(tool): self.count_tokens(json.dumps(tool)) for tool in tools}
+        self._tool_vectors = {}
+
+    async def _embedding_scores(self, tools: List[Dict[str, Any]], text: str) -> Dict[str, float]:
+        try:
+            missing = [tool for tool in tools if _tool_name(tool) not in self._tool_vectors]
+            if missing:
+                vectors = await self.embeddings.aembed_documents([_tool_text(tool) for tool in missing])
+                for tool, vector in zip(missing, vectors):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    self._tool_vectors[_tool_name(tool)] = vector / (np.linalg.norm(vector) or 1)
+            query = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+            query /= np.linalg.norm(query) or 1
+        except Exception as e:
+            logger.warning({"message": "Tool selection embedding failed, using keywords only", "error": str(e)})
+            return {}
+        return {name: float(vector @ query) for name, vector in self._tool_vectors.items()}
+
+    async def select(self, tools: List[Dict[str, Any]], messages: List[AnyMessage], image_data: Optional["StoredImage"] = None) -> ToolSelection:
+        """Return the subset of tool schemas to send for this request.
+
+        Args:
+            tools: All available tools in OpenAI format
+            messages: Conversation so far, ending with the current turn
+            image_data: Image attached to the current turn, if any
+
+        Returns:
+            Selected tools in their original order, with their schema size and the tokens saved
+        """
+        tools = tools or []
+        self._index(tools)
+        if len(tools) <= self.top_k:
+            # Nothing to trim; still counted so the stats cover every request
+            return self._record(tools, tools)
+
+        user_text = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        user_text = user_text if isinstance(user_text, str) else json.dumps(user_text)
+        query_words = _words(user_text)
+        scores = {
+            name: sum(self._idf[word] for word in words & query_words)
+            for name, words in self._tool_words.items()
+        }
+        best = max(scores.values(), default=0)
+        if best:
+            scores = {name: score / best for name, score in scores.items()}
+        if self.embeddings is not None and user_text:
+            for name, similarity in (await self._embedding_scores(tools, user_text)).items():
+                scores[name] = scores.get(name, 0) + similarity
+
+        ranked = [name for name, score in sorted(scores.items(), key=lambda item: -item[1]) if score > 0]
+        selected = set(ranked[:self.top_k]) or set(self.default_tools)
+        selected |= self._used_tools(messages)
+        if image_data:
+            selected.add(IMAGE_TOOL)
+
+        chosen = [tool for tool in tools if _tool_name(tool) in selected]
+        selection = self._record(tools, chosen)
+        logger.debug({
+            "message": "Selected tools for request",
+            "selected": [_tool_name(tool) for tool in chosen],
+            "schema_tokens_saved": selection.saved_tokens,
+            "schema_tokens_total": selection.schema_tokens + selection.saved_tokens,
+        })
+        return selection
+
+    def _record(self, tools: List[Dict[str, Any]], chosen: List[Dict[str, Any]]) -> ToolSelection:
+        """Update the selection counters for one request and return its selection."""
+        total_tokens = sum(self._schema_tokens.values())
+        schema_tokens = sum(self._schema_tokens[_tool_name(tool)] for tool in chosen)
+        saved_tokens = total_tokens - schema_tokens
+        self.requests += 1
+        self.tools_offered += len(tools)
+        self.tools_sent += len(chosen)
+        self.schema_tokens_total += total_tokens
+        self.schema_tokens_saved += saved_tokens
+        return ToolSelection(chosen, schema_tokens, saved_tokens)
+
+    @staticmethod
+    def _used_tools(messages: List[AnyMessage]) -> Set[str]:
+        used = set()
+        for message in messages:
+            if isinstance(message, AIMessage):
+                used.update(tool_call["name"] for tool_call in message.tool_calls or [])
+            elif isinstance(message, ToolMessage) and message.name:
+                used.add(message.name)
+        return used
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "avg_tools_offered": round(self.tools_offered / self.requests, 2) if self.requests else 0,
+            "avg_tools_sent": round(self.tools_sent / self.requests, 2) if self.requests else 0,
+            "schema_tokens_saved": self.schema_tokens_saved,
+            "schema_tokens_saved_percent": round(self.schema_tokens_saved / self.schema_tokens_total * 100, 2) if self.schema_tokens_total else 0,
+        }
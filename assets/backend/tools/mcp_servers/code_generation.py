@@ -16,6 +16,7 @@
 #
 
 import asyncio
+import sys
 from typing import Type
 from pydantic import BaseModel, Field
 from pathlib import Path
@@ -23,14 +24,18 @@ from pathlib import Path
 from langchain_core.tools import BaseTool
 from langchain_core.messages import SystemMessage, HumanMessage
 from mcp.server.fastmcp import FastMCP
-from openai import AsyncOpenAI
 import os
 from dotenv import load_dotenv
 
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
 # Load environment variables from .env file in the backend directory
-env_path = Path(__file__).parent.parent.parent / ".env"
+env_path = project_root / ".env"
 load_dotenv(dotenv_path=env_path)
 
+from openai_clients import get_async_openai_client
+
 mcp = FastMCP("Code Generation")
 model_name = os.getenv("CODE_GEN_MODEL", "gpt-4-turbo")
 
@@ -46,11 +51,8 @@ async def write_code(query: str, programming_language: str):
     Returns:
         The generated code.
     """
-    # Use OpenAI API instead of local deepseek-coder container
-    model_client = AsyncOpenAI(
-        base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
+    # Use OpenAI API instead of local deepseek-coder container; the pooled client is reused across calls
+    model_client = get_async_openai_client()
     
     system_prompt = f"""You are an expert coder specializing in {programming_language}.
     Given a user request, generate clean, efficient {programming_language} code that accomplishes the specified task.
@@ -32,11 +32,11 @@ import time
 from langchain_core.tools import tool, Tool
 from langchain_mcp_adapters.tools import to_fastmcp
 from mcp.server.fastmcp import FastMCP
-from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
+from openai_clients import get_async_openai_client
 from postgres_storage import PostgreSQLConversationStorage
 
 # Load environment variables from .env file in the project root
@@ -49,10 +49,6 @@ mcp = FastMCP("image-understanding-server")
 
 # Use OpenAI Vision API instead of local Qwen2.5-VL container
 model_name = os.getenv("VISION_MODEL", "gpt-4-turbo")
-model_client = OpenAI(
-    base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-    api_key=os.getenv("OPENAI_API_KEY")
-)
 POSTGRES_HOST = os.getenv("POSTGRES_HOST", "postgres")
 POSTGRES_PORT = int(os.getenv("POSTGRES_PORT", 5432))
 POSTGRES_DB = os.getenv("POSTGRES_DB", "chatbot")
@@ -68,7 +64,7 @@ postgres_storage = PostgreSQLConversationStorage(
 )
 
 @mcp.tool()
-def explain_image(query: str, image: str):
+async def explain_image(query: str, image: str):
     """
     This tool is used to understand an image. It will respond to the user's query based on the image.
     ...
@@ -113,7 +109,7 @@ def explain_image(query: str, image: str):
     
     try:
         print(f"Sending request to vision model: {query}")
-        response = model_client.chat.completions.create(
+        response = await get_async_openai_client().chat.completions.create(
             model=model_name,
             messages=message,
             max_tokens=512,
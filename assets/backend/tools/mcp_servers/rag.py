@@ -39,7 +39,6 @@ from langchain_core.messages import AnyMessage, HumanMessage, AIMessage
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph, add_messages
 from mcp.server.fastmcp import FastMCP
-from openai import AsyncOpenAI
 from pypdf import PdfReader
 from dotenv import load_dotenv
 
@@ -51,6 +50,7 @@ env_path = project_root / ".env"
 load_dotenv(dotenv_path=env_path)
 
 from config import ConfigManager
+from openai_clients import get_async_openai_client
 from vector_store import VectorStore, create_vector_store_with_config
 
 
@@ -93,10 +93,7 @@ class RAGAgent:
         self.model_name = self.config_manager.get_selected_model()
 
         # Use OpenAI API instead of local model
-        self.model_client = AsyncOpenAI(
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self.model_client = get_async_openai_client()
 
         self.generation_prompt = self._get_generation_prompt()
         
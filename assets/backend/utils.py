@@ -19,7 +19,8 @@
 import json
 import os
 import time
-from typing import List, Dict, Any
+import weakref
+from typing import List, Dict, Any, Callable, Optional, Tuple
 
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, ToolCall
 
@@ -32,7 +33,8 @@ async def process_and_ingest_files_background(
     vector_store: VectorStore, 
     config_manager, 
     task_id: str, 
-    indexing_tasks: Dict[str, str]
+    indexing_tasks: Dict[str, str],
+    on_indexed: Optional[Callable[[], None]] = None
 ) -> None:
     """Process and ingest files in the background.
     
@@ -42,6 +44,7 @@ async def process_and_ingest_files_background(
         config_manager: ConfigManager instance for updating sources
         task_id: Unique identifier for this processing task
         indexing_tasks: Dictionary to track task status
+        on_indexed: Optional callback invoked once new documents are indexed
     """
     try:
         logger.debug({
@@ -116,6 +119,9 @@ async def process_and_ingest_files_background(
                         "sources": config.sources
                     })
             
+            if on_indexed:
+                on_indexed()
+            
             indexing_tasks[task_id] = "completed"
             logger.debug({
                 "message": "Background processing and indexing completed successfully",
@@ -138,9 +144,80 @@ async def process_and_ingest_files_background(
         }, exc_info=True)
 
 
+# id(message) -> (weakref to message, fingerprint, converted dict); entries are dropped when the message dies
+_converted_message_cache: Dict[int, Tuple[weakref.ref, Tuple, Optional[Dict[str, Any]]]] = {}
+
+
+def _message_fingerprint(msg) -> Tuple:
+    """Cheap fingerprint used to detect a cached message that was mutated in place.
+    
+    String hashes are cached by Python, so plain content stays O(1) for messages seen
+    before. Tool calls are hashed with their JSON-encoded arguments, which are small,
+    so that arguments edited in place are noticed too.
+    """
+    content = msg.content
+    content_hash = hash(content) if isinstance(content, str) else hash(json.dumps(content))
+    if isinstance(msg, AIMessage):
+        tool_calls_hash = hash(tuple(
+            (tc["name"], tc["id"], json.dumps(tc["args"], sort_keys=True)) for tc in msg.tool_calls
+        ))
+        return content_hash, tool_calls_hash
+    if isinstance(msg, ToolMessage):
+        return content_hash, msg.tool_call_id
+    return (content_hash,)
+
+
+def _convert_message_to_openai(msg) -> Optional[Dict[str, Any]]:
+    """Convert a single LangGraph message to OpenAI API format.
+    
+    Args:
+        msg: LangGraph message object
+        
+    Returns:
+        Dictionary in OpenAI API format, or None for unsupported message types
+    """
+    if isinstance(msg, HumanMessage):
+        return {
+            "role": "user", 
+            "content": msg.content
+        }
+    elif isinstance(msg, AIMessage):
+        openai_msg = {
+            "role": "assistant", 
+            "content": msg.content or ""
+        }
+        if hasattr(msg, 'tool_calls') and msg.tool_calls:
+            openai_msg["tool_calls"] = []
+            for tc in msg.tool_calls:
+                openai_msg["tool_calls"].append({
+                    "id": tc["id"],
+                    "type": "function",
+                    "function": {
+                        "name": tc["name"],
+                        "arguments": json.dumps(tc["args"])
+                    }
+                })
+        return openai_msg
+    elif isinstance(msg, ToolMessage):
+        return {
+            "role": "tool",
+            "content": msg.content,
+            "tool_call_id": msg.tool_call_id
+        }
+    return None
+
+
+def _forget_converted_message(key: int) -> Callable[[weakref.ref], None]:
+    return lambda _ref: _converted_message_cache.pop(key, None)
+
+
 def convert_langgraph_messages_to_openai(messages: List) -> List[Dict[str, Any]]:
     """Convert LangGraph message objects to OpenAI API format.
     
+    Conversions are memoized per message object, so repeated calls over a growing
+    history only convert the messages appended since the previous call. The returned
+    dictionaries are shared between calls and must be treated as read-only.
+    
     Args:
         messages: List of LangGraph message objects
         
@@ -150,33 +227,40 @@ def convert_langgraph_messages_to_openai(messages: List) -> List[Dict[str, Any]]
     openai_messages = []
     
     for msg in messages:
-        if isinstance(msg, HumanMessage):
-            openai_messages.append({
-                "role": "user", 
-                "content": msg.content
-            })
-        elif isinstance(msg, AIMessage):
-            openai_msg = {
-                "role": "assistant", 
-                "content": msg.content or ""
-            }
-            if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                openai_msg["tool_calls"] = []
-                for tc in msg.tool_calls:
-                    openai_msg["tool_calls"].append({
-                        "id": tc["id"],
-                        "type": "function",
-                        "function": {
-                            "name": tc["name"],
-                            "arguments": json.dumps(tc["args"])
-                        }
-                    })
-            openai_messages.append(openai_msg)
-        elif isinstance(msg, ToolMessage):
-            openai_messages.append({
-                "role": "tool",
-                "content": msg.content,
-                "tool_call_id": msg.tool_call_id
-            })
+        key = id(msg)
+        fingerprint = _message_fingerprint(msg)
+        cached = _converted_message_cache.get(key)
+        if cached is not None and cached[0]() is msg and cached[1] == fingerprint:
+            converted = cached[2]
+        else:
+            converted = _convert_message_to_openai(msg)
+            try:
+                _converted_message_cache[key] = (weakref.ref(msg, _forget_converted_message(key)), fingerprint, converted)
+            except TypeError:
+                pass
+        if converted is not None:
+            openai_messages.append(converted)
     
     return openai_messages
+
+
+def parse_tool_settings(raw: str, cast: Callable[[str], Any] = str) -> Dict[str, Any]:
+    """Parse a comma-separated ``name=value`` list into a per-tool settings mapping.
+    
+    Args:
+        raw: Setting string such as ``"search_documents=2,write_code=1"``
+        cast: Callable applied to each value
+        
+    Returns:
+        Dictionary mapping tool names to their cast values; malformed entries are skipped
+    """
+    settings = {}
+    for item in (raw or "").split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            settings[name.strip()] = cast(value.strip())
+        except ValueError:
+            logger.warning(f"Ignoring invalid tool setting: {item.strip()}")
+    return settings
@@ -25,6 +25,7 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_unstructured import UnstructuredLoader
 from dotenv import load_dotenv
 from logger import logger
+from openai_clients import get_async_http_client, get_sync_http_client
 from typing import Optional, Callable
 import requests
 
@@ -56,7 +57,9 @@ class VectorStore:
                 import os
                 self.embeddings = OpenAIEmbeddings(
                     model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-large"),
-                    openai_api_key=os.getenv("OPENAI_API_KEY")
+                    openai_api_key=os.getenv("OPENAI_API_KEY"),
+                    http_client=get_sync_http_client(),
+                    http_async_client=get_async_http_client()
                 )
             else:
                 self.embeddings = embeddings
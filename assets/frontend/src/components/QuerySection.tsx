@@ -196,6 +196,12 @@ export default function QuerySection({
   const [isToolContentVisible, setIsToolContentVisible] = useState(false);
   const [fadeIn, setFadeIn] = useState(false);
   const firstTokenReceived = useRef(false);
+  // Sequence number of the oldest loaded message, used as the cursor for "load_more"
+  const firstSeqRef = useRef<number | null>(null);
+  // Messages confirmed by the server at the start of the list, and the next sequence number expected
+  const confirmedCountRef = useRef(0);
+  const nextSeqRef = useRef(0);
+  const [hasMoreHistory, setHasMoreHistory] = useState(false);
   const hasAssistantContent = useRef(false);
   const fadeTimeoutRef = useRef<NodeJS.Timeout | null>(null);
 
@@ -252,9 +258,53 @@ export default function QuerySection({
                 // const filtered = msg.messages.filter(m => m.type !== "ToolMessage"); // TODO: add this back in
                 setResponse(JSON.stringify(msg.messages));
                 setIsStreaming(false);
+                firstSeqRef.current = msg.first_seq ?? null;
+                confirmedCountRef.current = msg.messages.length;
+                nextSeqRef.current = msg.total ?? 0;
+                setHasMoreHistory(Boolean(msg.has_more));
               }
               break;
             }
+            case "history_page": {
+              if (Array.isArray(msg.messages)) {
+                setResponse(prev => {
+                  try {
+                    const messages = JSON.parse(prev);
+                    return JSON.stringify([...msg.messages, ...(Array.isArray(messages) ? messages : [])]);
+                  } catch {
+                    return JSON.stringify(msg.messages);
+                  }
+                });
+                firstSeqRef.current = msg.first_seq ?? firstSeqRef.current;
+                confirmedCountRef.current += msg.messages.length;
+                setHasMoreHistory(Boolean(msg.has_more));
+              }
+              break;
+            }
+            case "history_delta": {
+              if (!Array.isArray(msg.messages)) break;
+              if (msg.from_seq !== nextSeqRef.current) {
+                // Missed an update: ask for the full history instead of patching a stale copy
+                ws.send(JSON.stringify({ type: "resync" }));
+                break;
+              }
+              const confirmed = confirmedCountRef.current;
+              setResponse(prev => {
+                let messages: any[] = [];
+                try {
+                  const parsed = JSON.parse(prev);
+                  messages = Array.isArray(parsed) ? parsed : [];
+                } catch {
+                  messages = [];
+                }
+                // Replace the optimistic user message and the streamed answer with the stored messages
+                return JSON.stringify([...messages.slice(0, confirmed), ...msg.messages]);
+              });
+              confirmedCountRef.current = confirmed + msg.messages.length;
+              nextSeqRef.current = msg.total;
+              setIsStreaming(false);
+              break;
+            }
             case "tool_token": {
               if (text !== undefined && text !== "undefined") {
                 setToolOutput(prev => prev + text);
@@ -294,6 +344,15 @@ export default function QuerySection({
               setGraphStatus(`calling tool: ${msg?.data}`);
               break;
             }
+            case "queue": {
+              const position = msg?.data?.position ?? 0;
+              setGraphStatus(position > 0 ? `Waiting for model (queue position ${position})` : "");
+              break;
+            }
+            case "cancelled": {
+              setGraphStatus("");
+              break;
+            }
             case "tool_end":
             case "node_end": {
               console.log(type, msg.data);
@@ -462,11 +521,16 @@ export default function QuerySection({
     }
   };
 
+  const handleLoadMore = () => {
+    if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN && firstSeqRef.current !== null) {
+      wsRef.current.send(JSON.stringify({ type: "load_more", before: firstSeqRef.current }));
+    }
+  };
+
   const handleCancelStream = () => {
-    if (wsRef.current) {
-      wsRef.current.close();
-      wsRef.current = null;
-      setIsStreaming(false);
+    if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+      // The server stops the response, keeps the partial answer and replies with the updated history
+      wsRef.current.send(JSON.stringify({ type: "cancel" }));
     }
   };
 
@@ -509,6 +573,11 @@ export default function QuerySection({
         </div>
       
       <div className={styles.messagesContainer} ref={chatContainerRef}>
+        {hasMoreHistory && (
+          <button type="button" className={styles.loadMoreButton} onClick={handleLoadMore}>
+            Load earlier messages
+          </button>
+        )}
         {parseMessages(response).map((message, index) => {
           const isHuman = message.type === "HumanMessage";
           const key = `${message.type}-${index}`;